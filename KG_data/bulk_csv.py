@@ -0,0 +1,155 @@
+"""
+离线批量导入：STIX bundle → neo4j-admin database import 使用的 CSV
+- 流式解析 bundle，一遍完成转换，节点 / 关系边解析边写入，内存中只保留技术 → 战术的 shortname 对
+  （多个 bundle 时先扫描一遍得到每个对象所属的领域，并记录已写出的 id 去重）
+- 每个节点标签、每种关系类型各一个数据文件 + 一个表头文件
+- 标签、属性与关系的映射与在线导入（proc.py）完全相同，都来自 utils/attack_schema.py：
+  值为 None 的属性写成不加引号的空字段（neo4j-admin 视为不存在），空字符串写成 ""，与在线导入 SET 的结果一致；
+  neo4j-admin 无法表示空数组，stix_to_properties 已不产出空列表属性，两种方式导入的节点上都没有该属性
+- 端点不在 bundle 中的关系由 --skip-bad-relationships 跳过，对应在线导入中 MATCH 不到端点的行
+"""
+import os
+import shlex
+
+from utils.attack_schema import (
+    NODE_PROPERTY_NAMES, PROPERTY_TYPES, STIX_TYPE_LABELS, object_relations, parse_bundles, stix_to_properties,
+    technique_tactic_refs
+)
+from utils.stix_stream import DomainIndex, iter_bundle_objects
+
+ARRAY_DELIMITER = ";"
+RELATIONSHIP_PROPERTY_NAMES = ["id", "description", "created", "modified", "order", "domains"]
+IMPORT_SCRIPT = "neo4j-admin-import.sh"
+
+
+def _header(columns, id_column=False):
+    """属性名 → 带类型的表头字段；节点的 id 同时作为 ID 空间（STIX id 全局唯一）"""
+    fields = []
+    for name in columns:
+        if id_column and name == "id":
+            fields.append("id:ID")
+        elif name in PROPERTY_TYPES:
+            fields.append(f"{name}:{PROPERTY_TYPES[name]}")
+        else:
+            fields.append(name)
+    return fields
+
+
+def _quote(text):
+    return '"' + str(text).replace('"', '""') + '"'
+
+
+def _field(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        # 空列表无法与 null 区分，按不存在处理（节点属性中的空列表已由 stix_to_properties 去除）
+        return _quote(ARRAY_DELIMITER.join(str(v) for v in value)) if value else ""
+    return _quote(value)
+
+
+class _CsvFiles:
+    """按名称惰性打开的 CSV 数据文件，首次写入时同时写出表头文件"""
+
+    def __init__(self, out_dir, prefix, leading, columns, id_column=False):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.header = ",".join(leading + _header(columns, id_column))
+        self.columns = columns
+        self.files = {}
+        self.counts = {}
+
+    def write(self, name, leading, properties):
+        """leading 为表头前缀列（关系的 :START_ID / :END_ID）的值"""
+        f = self.files.get(name)
+        if f is None:
+            header_path, data_path = self.paths(name)
+            with open(header_path, "w", encoding="utf-8", newline="") as header:
+                header.write(self.header + "\n")
+            f = self.files[name] = open(data_path, "w", encoding="utf-8", newline="")
+            self.counts[name] = 0
+        f.write(",".join([_quote(v) for v in leading] + [_field(properties.get(c)) for c in self.columns]) + "\n")
+        self.counts[name] += 1
+
+    def paths(self, name):
+        base = os.path.join(self.out_dir, f"{self.prefix}_{name}")
+        return f"{base}.header.csv", f"{base}.csv"
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def export_csv(bundles, out_dir, database="neo4j"):
+    """
+    转换一个或多个 bundle（见 parse_bundles）并生成导入脚本，
+    返回 {"nodes": {标签: 数量}, "relationships": {关系类型: 数量}, "script": 路径}
+    多个 bundle 时与在线导入相同：同一 STIX id 只写一行，domains 为其出现过的全部领域
+    """
+    bundles = parse_bundles(bundles)
+    os.makedirs(out_dir, exist_ok=True)
+    nodes = _CsvFiles(out_dir, "nodes", [], NODE_PROPERTY_NAMES, id_column=True)
+    relationships = _CsvFiles(out_dir, "rels", [":START_ID", ":END_ID"], RELATIONSHIP_PROPERTY_NAMES)
+    domain_index = DomainIndex(bundles)
+    seen = set()
+    tactic_ids = {}
+    tactic_refs = set()
+
+    try:
+        for _, obj in iter_bundle_objects(bundles):
+            obj_type = obj.get("type")
+            if obj_type not in STIX_TYPE_LABELS and obj_type != "relationship":
+                continue
+            if obj["id"] in seen:
+                continue
+            seen.add(obj["id"])
+            domains = sorted(domain_index.get(obj["id"]))
+
+            if obj_type in STIX_TYPE_LABELS:
+                nodes.write(STIX_TYPE_LABELS[obj_type], [], dict(stix_to_properties(obj), domains=domains))
+                if obj_type == "attack-pattern":
+                    tactic_refs.update((obj["id"], ref) for ref in technique_tactic_refs(obj))
+                elif obj_type == "x-mitre-tactic" and obj.get("x_mitre_shortname"):
+                    for domain in domains:
+                        tactic_ids[(domain, obj["x_mitre_shortname"])] = obj["id"]
+            for rel in object_relations(obj):
+                if obj_type == "relationship":
+                    rel["props"]["domains"] = domains
+                relationships.write(rel["type"], [rel["source"], rel["target"]], rel["props"])
+
+        # 技术 → 战术：战术可能出现在技术之后，解析结束后按（领域, shortname）补齐
+        # 同一对只写一次，对应在线导入的 MERGE
+        for tech_id, ref in sorted(tactic_refs):
+            if ref in tactic_ids:
+                relationships.write("BELONGS_TO", [tech_id, tactic_ids[ref]], {})
+    finally:
+        nodes.close()
+        relationships.close()
+
+    script = os.path.join(out_dir, IMPORT_SCRIPT)
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("#!/bin/sh\n" + import_command(nodes, relationships, database) + "\n")
+    os.chmod(script, 0o755)
+    return {"nodes": dict(nodes.counts), "relationships": dict(relationships.counts), "script": script}
+
+
+def import_command(nodes, relationships, database):
+    """neo4j-admin 导入命令；描述中含换行，需要 --multiline-fields"""
+    args = []
+    for label in sorted(nodes.files):
+        args.append(f"--nodes={label}=" + ",".join(os.path.basename(p) for p in nodes.paths(label)))
+    for rel_type in sorted(relationships.files):
+        args.append(f"--relationships={rel_type}=" + ",".join(os.path.basename(p) for p in relationships.paths(rel_type)))
+    args += [
+        "--multiline-fields=true",
+        f"--array-delimiter={ARRAY_DELIMITER}",
+        "--skip-bad-relationships=true",
+        database,
+    ]
+    return "cd \"$(dirname \"$0\")\" && neo4j-admin database import full \\\n  " + " \\\n  ".join(
+        shlex.quote(a) for a in args
+    )
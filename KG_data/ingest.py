@@ -0,0 +1,179 @@
+"""
+并发写入管道（导入脚本使用）
+- 写入按 key（标签 / 关系类型）分组缓冲，缓冲区达到当前批大小即提交到线程池
+- 线程池中每个线程持有自己的 session，批次以托管事务（execute_write）提交，死锁等瞬时错误由驱动重试
+- 驱动重试后仍失败的批次拆成两半重新提交，仍失败则记录错误，在 flush() 时统一抛出
+- 批大小按事务耗时自适应：超过目标耗时减半，远低于目标耗时翻倍
+- 在途批次数有上限（背压），解析速度快于写入时不会把整份 bundle 积压在内存里
+- flush() 是屏障：等待已提交的批次全部完成，保证写关系之前端点节点已经存在
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 500
+MIN_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 5000
+# 单个事务的目标耗时（秒）
+TARGET_TX_SECONDS = 1.0
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+
+@lru_cache(maxsize=None)
+def cypher_batch(query):
+    """UNWIND $rows 的写查询 → 事务函数，返回查询 RETURN 的 count（同一查询复用同一函数）"""
+    def work(tx, rows):
+        record = tx.run(query, rows=rows).single()
+        return record["count"] if record else 0
+    return work
+
+
+class IngestPipeline:
+    """多 session 并发写入，批大小自适应，失败重试，统计吞吐量"""
+
+    def __init__(self, driver, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 min_batch_size=MIN_BATCH_SIZE, max_batch_size=MAX_BATCH_SIZE,
+                 target_seconds=TARGET_TX_SECONDS, max_retries=MAX_RETRIES):
+        self.driver = driver
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_size = max(min_batch_size, min(batch_size, max_batch_size))
+        self.target_seconds = target_seconds
+        self.max_retries = max_retries
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = []
+        self._buffers = {}   # key → (事务函数, 待写入行)
+        self._futures = []
+        self._errors = []
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._started = time.perf_counter()
+        self._stats = {"rows": 0, "written": 0, "batches": 0, "retries": 0, "failed_rows": 0, "by_key": {}}
+
+    # ---------- 提交 ----------
+
+    def add(self, key, work, row):
+        """把一行放入 key 对应的缓冲区，同一 key 的行由同一个事务函数写入"""
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = (work, [])
+        buffer[1].append(row)
+        if len(buffer[1]) >= self.batch_size:
+            self._submit(key)
+
+    def _submit(self, key):
+        work, rows = self._buffers.pop(key)
+        if not rows:
+            return
+        self._slots.acquire()
+        future = self._executor.submit(self._run, key, work, rows)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def flush(self):
+        """
+        提交所有缓冲区并等待完成，返回本阶段的统计（自上次 flush 起）
+        有批次最终写入失败时抛出 RuntimeError
+        """
+        for key in list(self._buffers):
+            self._submit(key)
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+        elapsed = time.perf_counter() - self._started
+        stats = dict(self._stats, seconds=round(elapsed, 2), batch_size=self.batch_size,
+                     rows_per_second=round(self._stats["rows"] / elapsed, 1) if elapsed > 0 else 0.0)
+        errors, self._errors = self._errors, []
+        self._reset_stats()
+        if errors:
+            raise RuntimeError(f"{stats['failed_rows']} 行写入失败（{len(errors)} 个批次）: {errors[0]}")
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 工作线程 ----------
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self.driver.session()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _drop_session(self):
+        """出错后丢弃当前线程的 session，下次使用时重新创建"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            return
+        self._local.session = None
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+        try:
+            session.close()
+        except Exception:
+            pass
+
+    def _run(self, key, work, rows, attempt=0):
+        started = time.perf_counter()
+        try:
+            written = self._session().execute_write(work, rows)
+        except Exception as e:
+            return self._retry(key, work, rows, attempt, e)
+        self._record(key, len(rows), written or 0, time.perf_counter() - started)
+        return written
+
+    def _retry(self, key, work, rows, attempt, error):
+        self._drop_session()
+        with self._lock:
+            self._stats["retries"] += 1
+            # 失败往往意味着批次过大（超时 / 内存），后续批次同样缩小
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        if attempt >= self.max_retries:
+            with self._lock:
+                self._stats["failed_rows"] += len(rows)
+                self._errors.append(error)
+            return 0
+
+        time.sleep(RETRY_BACKOFF * (2 ** attempt))
+        if len(rows) > 1:
+            middle = len(rows) // 2
+            return (self._run(key, work, rows[:middle], attempt + 1)
+                    + self._run(key, work, rows[middle:], attempt + 1))
+        return self._run(key, work, rows, attempt + 1)
+
+    def _record(self, key, rows, written, elapsed):
+        with self._lock:
+            stats = self._stats
+            stats["rows"] += rows
+            stats["written"] += written
+            stats["batches"] += 1
+            stats["by_key"][key] = stats["by_key"].get(key, 0) + written
+
+            if elapsed > self.target_seconds:
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            elif elapsed < self.target_seconds / 2 and rows >= self.batch_size:
+                # 只有满批次才说明还有增大的余地，末尾的零散小批次不参与
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
@@ -1,164 +1,484 @@
-import json
 from neo4j import GraphDatabase
+import argparse
 import os
+import sys
+import time
+
+# 复用后端的图布局等工具模块
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from utils.attack_schema import (
+    DERIVED_RELATIONSHIP_TYPES, ID_LABELS, OPTIONAL_PROPERTY_NAMES, STIX_TYPE_LABELS, is_tombstoned,
+    label_for_stix_id, object_relations, parse_bundles, quote_label, stix_to_properties, technique_tactic_refs
+)
+from utils.graph_layout import layout_full, layout_neighbourhood
+from utils.graph_schema import apply_migrations, index_usage, print_index_usage
+from utils.graph_version import META_LABEL, graph_version
+from utils.stix_stream import DomainIndex, iter_bundle_objects
+
+from bulk_csv import export_csv
+from ingest import DEFAULT_BATCH_SIZE as BATCH_SIZE, DEFAULT_WORKERS, IngestPipeline, cypher_batch
+
+DEFAULT_BUNDLE = "./cti/enterprise-attack/enterprise-attack.json"
+DEFAULT_CSV_DIR = "./import"
+
+# 增量更新的变更摘要项
+CHANGE_SUMMARY_KEYS = ["新增节点", "更新节点", "失效节点", "未变节点", "新增关系", "更新关系", "删除关系", "未变关系"]
+
+_MISSING = object()
 
 class LiteATTACKImporter:
     def __init__(self, uri, user, password):
         self.driver = GraphDatabase.driver(uri, auth=(user, password), max_connection_lifetime=100)
     
     def clear_database(self):
-        """清空数据库中的所有节点和关系"""
+        """清空数据库中的所有节点和关系（保留图版本号）"""
         print("正在清空现有数据库...")
         with self.driver.session() as session:
             # 删除所有节点和关系
-            session.run("MATCH (n) DETACH DELETE n")
+            session.run(f"MATCH (n) WHERE NOT n:{META_LABEL} DETACH DELETE n")
             print("数据库已清空")
+        # 节点将被整体重建，开启新的导入批次
+        graph_version.bump(self.driver, new_epoch=True)
     
-    def load_core_data(self, file_path):
-        """只导入核心数据：技术、战术、技术-战术关系"""
-        print(f"开始导入数据文件: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        with self.driver.session() as session:
-            print("正在处理技术节点...")
-            # 只导入技术
-            techniques = [obj for obj in data['objects'] 
-                         if obj.get('type') == 'attack-pattern']
-            
-            # 批量导入技术节点
-            batch_size = 100
-            for i in range(0, len(techniques), batch_size):
-                batch = techniques[i:i+batch_size]
-                self._create_techniques_batch(session, batch)
-                print(f"已导入技术节点: {min(i+batch_size, len(techniques))}/{len(techniques)}")
-            
-            print("正在处理战术节点...")
-            # 导入战术
-            tactics = [obj for obj in data['objects'] 
-                      if obj.get('type') == 'x-mitre-tactic']
-            for tactic in tactics:
-                self._create_tactic(session, tactic)
-            print(f"已导入战术节点: {len(tactics)}个")
-            
-            print("正在创建技术-战术关系...")
-            # 创建技术-战术关系
-            self._create_tactic_technique_relations(session, techniques, tactics)
-            print("数据导入完成！")
-    
-    def _create_techniques_batch(self, session, techniques):
-        """批量创建技术节点（去除字数限制）"""
-        query = """
-        UNWIND $techniques as tech
-        CREATE (t:Technique {
-            id: tech.id,
-            name: tech.name,
-            description: tech.description,
-            external_id: CASE WHEN size(tech.external_references) > 0 
-                            THEN tech.external_references[0].external_id
-                            ELSE '' END,
-            url: CASE WHEN size(tech.external_references) > 0 
-                     THEN tech.external_references[0].url
-                     ELSE '' END,
-            created: tech.created,
-            modified: tech.modified
-        })
+    def load_attack_data(self, bundles, batch_size=BATCH_SIZE, mode="rebuild", workers=DEFAULT_WORKERS):
         """
-        
-        # 预处理数据，保留完整信息
-        tech_data = []
-        for tech in techniques:
-            description = tech.get('description', '')
-            # 不再截断描述
-            external_refs = tech.get('external_references', [])
-            external_id = ''
-            url = ''
-            if external_refs:
-                external_id = external_refs[0].get('external_id', '')
-                url = external_refs[0].get('url', '')
-            
-            tech_data.append({
-                'id': tech['id'],
-                'name': tech['name'],
-                'description': description,
-                'external_references': external_refs,
-                'created': tech.get('created', ''),
-                'modified': tech.get('modified', '')
-            })
-        
-        session.run(query, techniques=tech_data)
-    
-    def _create_tactic(self, session, tactic):
-        """创建战术节点（去除字数限制）"""
-        external_id = ''
-        url = ''
-        if tactic.get('external_references'):
-            external_id = tactic['external_references'][0].get('external_id', '')
-            url = tactic['external_references'][0].get('url', '')
-        
-        query = """
-        CREATE (ta:Tactic {
-            id: $id,
-            name: $name,
-            description: $description,
-            external_id: $external_id,
-            shortname: $shortname,
-            url: $url,
-            created: $created,
-            modified: $modified
-        })
+        导入完整的 ATT&CK 数据：STIX_TYPE_LABELS 中的全部对象、relationship 对象、
+        矩阵 → 战术与数据组件 → 数据源的引用关系，以及技术 → 战术（BELONGS_TO）关系
+
+        bundles 为一个或多个 bundle（enterprise / mobile / ics，见 parse_bundles），在同一个管道中处理：
+        同一 STIX id 只写入一次，节点与关系的 domains 属性记录其出现过的全部领域
+
+        流式解析 bundle 两遍（不整体 json.load），写入经 IngestPipeline 在多个 session 上并发执行：
+        - 第一遍：按标签分组 UNWIND MERGE 节点
+        - 屏障：等待节点全部写入
+        - 第二遍：按（关系类型, 源标签, 目标标签）分组 UNWIND MERGE 关系，端点按 id 走索引 MATCH
+        批大小按事务耗时自适应（batch_size 为初始值），失败批次拆分重试，每个阶段输出吞吐量
+
+        mode="upsert" 时不清库：按 STIX id / modified / domains 与库中已有对象比较，只写入新增或变化的节点与关系，
+        变化的关系先按 STIX id 删除旧关系（类型或端点可能已改变）再写入；写入了战术时，
+        kill_chain_phases 指向这些战术的未变技术也重建 BELONGS_TO；新增 / 更新关系只统计实际写入的行；
+        已撤销 / 弃用或已从本次导入的全部领域中消失的节点标记为失效（deprecated，节点保留），对应的关系删除；
+        仍属于其他（本次未导入的）领域的对象只更新 domains。
+        管理员编辑、布局坐标以及 MySQL 中 neo4j_id 的关联在未变化的节点上原样保留。
+        返回变更摘要 {项目: 数量}
         """
-        
-        session.run(query,
-            id=tactic['id'],
-            name=tactic['name'],
-            description=tactic.get('description', ''),
-            external_id=external_id,
-            shortname=tactic.get('x_mitre_shortname', ''),
-            url=url,
-            created=tactic.get('created', ''),
-            modified=tactic.get('modified', '')
+        bundles = parse_bundles(bundles)
+        upsert = mode == "upsert"
+        print(f"开始导入（{'增量更新' if upsert else '完整导入'}，{workers} 个写入线程）:")
+        for domain, path in bundles:
+            print(f"  {domain}: {path}")
+
+        # 先应用 schema 迁移（id 唯一约束、external_id / shortname 索引、全文索引等），
+        # MERGE、关系端点与 BELONGS_TO 的 MATCH 都走索引
+        self.ensure_schema()
+
+        with self.driver.session() as session:
+            # 库中已有对象，比较过的条目随即弹出，剩下的就是本次 bundle 中已不存在的对象
+            stored_nodes, stored_relationships = self._load_stored_state(session) if upsert else ({}, {})
+        domain_index = DomainIndex(bundles)
+        imported_domains = domain_index.domains
+
+        def merged_domains(obj_id, stored_domains):
+            """本次导入的领域以 bundle 为准，其他领域沿用库中记录"""
+            return sorted((set(stored_domains or ()) - imported_domains) | domain_index.get(obj_id))
+
+        summary = dict.fromkeys(CHANGE_SUMMARY_KEYS, 0)
+        # 需要删除的关系 [(关系类型, STIX id)]
+        removed_relationships = []
+        # 本次处理过的节点 / 关系（跨 bundle 去重），以及其中需要写入的节点（第二遍为它们重建推出的关系）
+        seen_nodes, seen_relationships, written_nodes = set(), set(), set()
+        # 增量更新中写入的战术 id 与其（领域, shortname）：新增或改名的战术需要未变技术重新关联
+        written_tactics, written_phases, relinked = [], set(), set()
+        started = time.perf_counter()
+        parsed = 0
+
+        with IngestPipeline(self.driver, workers=workers, batch_size=batch_size) as pipeline:
+            print("正在导入节点...")
+            for _, obj in iter_bundle_objects(bundles):
+                parsed += 1
+                if obj.get("type") not in STIX_TYPE_LABELS or obj["id"] in seen_nodes:
+                    continue
+                seen_nodes.add(obj["id"])
+                stored = stored_nodes.pop(obj["id"], _MISSING)
+                domains = merged_domains(obj["id"], None if stored is _MISSING else stored[1])
+                if stored is _MISSING:
+                    summary["新增节点"] += 1
+                elif stored == (obj.get("modified", ""), domains):
+                    summary["未变节点"] += 1
+                    continue
+                else:
+                    summary["失效节点" if is_tombstoned(obj) else "更新节点"] += 1
+
+                label = STIX_TYPE_LABELS[obj["type"]]
+                written_nodes.add(obj["id"])
+                if upsert:
+                    # 更新的对象重新推出 BELONGS_TO / HAS_TACTIC / COMPONENT_OF，先删除旧的
+                    pipeline.add(("clear", label), cypher_batch(_clear_derived_query(label)), obj["id"])
+                # 对象更新后不再有的可选属性置为 null，SET += 时从节点上移除
+                props = dict.fromkeys(OPTIONAL_PROPERTY_NAMES)
+                props.update(stix_to_properties(obj))
+                props["domains"] = domains
+                pipeline.add(("node", label), cypher_batch(_merge_nodes_query(label)), props)
+                if upsert and label == "Tactic":
+                    written_tactics.append(obj["id"])
+                    written_phases.update((domain, props["shortname"]) for domain in domains)
+            self._report("节点", pipeline.flush())
+
+            if written_tactics:
+                # 战术改名后原有的 BELONGS_TO 可能已不对应，删除后在第二遍按 kill_chain_phases 重建
+                with self.driver.session() as session:
+                    session.run(CLEAR_TACTIC_TECHNIQUE_QUERY, ids=written_tactics).consume()
+
+            print("正在导入关系...")
+            belongs_to = cypher_batch(TACTIC_TECHNIQUE_QUERY)
+            for _, obj in iter_bundle_objects(bundles):
+                parsed += 1
+                obj_type = obj.get("type")
+                if obj_type == "relationship":
+                    if obj["id"] in seen_relationships:
+                        continue
+                    seen_relationships.add(obj["id"])
+                    stored = stored_relationships.pop(obj["id"], _MISSING)
+                    domains = merged_domains(obj["id"], None if stored is _MISSING else stored[2])
+                    if stored is not _MISSING and (stored[0], stored[2]) == (obj.get("modified", ""), domains):
+                        summary["未变关系"] += 1
+                        continue
+                    if is_tombstoned(obj):
+                        if stored is not _MISSING:
+                            removed_relationships.append((stored[1], obj["id"]))
+                        continue
+                    # 新增 / 更新关系在写入后按实际写入的行数统计（端点不存在的行不计入）
+                    status = "新增关系" if stored is _MISSING else "更新关系"
+                    relations = object_relations(obj)
+                    for rel in relations:
+                        rel["props"]["domains"] = domains
+                        if stored is _MISSING:
+                            key = ("rel", rel["type"], rel["source_label"], rel["target_label"], status)
+                            work = cypher_batch(_merge_relationships_query(*key[1:4]))
+                        else:
+                            # 关系类型或端点可能已改变：在同一事务中先按 STIX id 删除旧关系（旧类型）再写入
+                            key = ("rel", rel["type"], rel["source_label"], rel["target_label"], status, stored[1])
+                            work = cypher_batch(_replace_relationships_query(*key[1:4], stored[1]))
+                        pipeline.add(key, work, {"source": rel["source"], "target": rel["target"],
+                                                 "props": rel["props"]})
+                    continue
+                elif obj_type in STIX_TYPE_LABELS and obj["id"] in written_nodes:
+                    # 推出的关系只按对象的首次出现处理一次
+                    written_nodes.discard(obj["id"])
+                    relinked.add(obj["id"])
+                    # 技术 → 战术按（领域, shortname）在 Cypher 中匹配，无需在内存中保留战术对象
+                    for domain, phase in technique_tactic_refs(obj):
+                        pipeline.add(("rel", "BELONGS_TO"), belongs_to,
+                                     {"tech_id": obj["id"], "phase": phase, "domain": domain})
+                    relations = object_relations(obj)
+                elif obj_type == "attack-pattern" and written_phases and obj["id"] not in relinked:
+                    # 未变的技术：只为它指向本次写入的战术的 kill_chain_phases 重建 BELONGS_TO
+                    relinked.add(obj["id"])
+                    for domain, phase in technique_tactic_refs(obj):
+                        if (domain, phase) in written_phases:
+                            pipeline.add(("rel", "BELONGS_TO"), belongs_to,
+                                         {"tech_id": obj["id"], "phase": phase, "domain": domain})
+                    continue
+                else:
+                    continue
+
+                for rel in relations:
+                    key = ("rel", rel["type"], rel["source_label"], rel["target_label"])
+                    pipeline.add(key, cypher_batch(_merge_relationships_query(*key[1:])),
+                                 {"source": rel["source"], "target": rel["target"], "props": rel["props"]})
+            stats = pipeline.flush()
+            self._report("关系", stats)
+            for key, count in stats["by_key"].items():
+                if len(key) > 4:
+                    summary[key[4]] += count
+
+        if upsert:
+            with self.driver.session() as session:
+                # 本次导入的领域中都已不存在的节点标记失效、关系删除；仍属于其他领域的只更新 domains
+                tombstoned, retagged = _split_absent(stored_nodes, imported_domains, lambda state: state[1])
+                summary["失效节点"] += self._tombstone_nodes(session, tombstoned)
+                summary["更新节点"] += self._retag_nodes(session, retagged)
+                removed, retagged = _split_absent(stored_relationships, imported_domains, lambda state: state[2])
+                removed_relationships.extend((stored_relationships[rel_id][1], rel_id) for rel_id in removed)
+                summary["删除关系"] += self._delete_relationships(session, removed_relationships)
+                summary["更新关系"] += self._retag_relationships(session, [
+                    (stored_relationships[rel_id][1], rel_id, domains) for rel_id, domains in retagged
+                ])
+
+        relation_counts = {}
+        for key, count in stats["by_key"].items():
+            relation_counts[key[1]] = relation_counts.get(key[1], 0) + count
+        for rel_type, count in sorted(relation_counts.items()):
+            print(f"  {rel_type}: {count}")
+        elapsed = time.perf_counter() - started
+        print(f"共解析 {parsed} 个 STIX 对象（两遍），用时 {elapsed:.1f}s，{parsed / max(elapsed, 1e-9):.0f} 对象/秒")
+        print("变更摘要: " + "，".join(f"{key} {summary[key]}" for key in CHANGE_SUMMARY_KEYS))
+        print("数据导入完成！")
+
+        if not any(summary[key] for key in CHANGE_SUMMARY_KEYS if not key.startswith("未变")):
+            print("数据没有变化，图版本号保持不变")
+            return summary
+
+        # 递增图版本号，使后端的快照缓存失效
+        version = graph_version.bump(self.driver)
+        print(f"图版本号已更新: {version}")
+        return summary
+    
+    def ensure_schema(self):
+        """应用尚未执行的 schema 迁移，修复缺失的约束 / 索引"""
+        result = apply_migrations(self.driver, verbose=True)
+        print(f"schema 版本: {result['to']}" + (f"，修复 {len(result['repaired'])} 个对象" if result["repaired"] else ""))
+
+    def report_index_usage(self):
+        """导入完成后输出热点查询的索引使用情况"""
+        print("热点查询的索引使用情况:")
+        print_index_usage(index_usage(self.driver))
+
+    @staticmethod
+    def _report(phase, stats):
+        """输出一个写入阶段的吞吐量，用于估算导入窗口"""
+        print(
+            f"{phase}写入完成: {stats['rows']} 行 / {stats['batches']} 批，用时 {stats['seconds']}s，"
+            f"{stats['rows_per_second']} 行/秒，重试 {stats['retries']} 次，当前批大小 {stats['batch_size']}"
         )
     
-    def _create_tactic_technique_relations(self, session, techniques, tactics):
-        """创建技术-战术关系"""
-        # 创建战术映射表
-        tactic_map = {}
-        for tactic in tactics:
-            shortname = tactic.get('x_mitre_shortname')
-            if shortname:
-                tactic_map[shortname] = tactic['id']
-        
-        # 批量创建关系
-        relations = []
-        for tech in techniques:
-            kill_chain_phases = tech.get('kill_chain_phases', [])
-            for phase in kill_chain_phases:
-                if phase.get('kill_chain_name') == 'mitre-attack':
-                    phase_name = phase.get('phase_name')
-                    if phase_name in tactic_map:
-                        relations.append({
-                            'tech_id': tech['id'],
-                            'tactic_id': tactic_map[phase_name]
-                        })
-        
-        # 批量执行
-        query = """
-        UNWIND $relations as rel
-        MATCH (t:Technique {id: rel.tech_id})
-        MATCH (ta:Tactic {id: rel.tactic_id})
-        CREATE (t)-[:BELONGS_TO]->(ta)
+    def compute_layout(self):
+        """预计算整张图的布局，坐标写入节点 x / y，前端打开即可直接渲染"""
+        print("正在计算图布局...")
+        count = layout_full(self.driver)
+        print(f"布局计算完成: {count}个节点")
+    
+    def layout_new_nodes(self):
+        """增量更新后只为没有坐标的新节点做局部布局；库中原本没有布局时计算整张图"""
+        with self.driver.session() as session:
+            record = session.run(f"""
+            MATCH (n) WHERE NOT n:{META_LABEL}
+            RETURN count(n) AS total, collect(CASE WHEN n.x IS NULL OR n.y IS NULL THEN id(n) END) AS missing
+            """).single()
+        if not record or not record["missing"]:
+            return
+        if len(record["missing"]) == record["total"]:
+            self.compute_layout()
+            return
+        print(f"正在为新节点计算布局: {len(record['missing'])}个")
+        count = layout_neighbourhood(self.driver, record["missing"])
+        print(f"布局计算完成: {count}个节点")
+    
+    def _load_stored_state(self, session):
         """
-        
-        if relations:
-            session.run(query, relations=relations)
-            print(f"已创建技术-战术关系: {len(relations)}条")
+        库中已有对象：节点 {STIX id: (modified, domains)}，
+        relationship 对象导入的关系 {STIX id: (modified, 关系类型, domains)}
+        推出的关系（BELONGS_TO 等）没有 modified 属性，不参与比较
+        """
+        nodes = {}
+        for label in ID_LABELS:
+            result = session.run(
+                f"MATCH (n:{quote_label(label)}) RETURN n.id AS id, n.modified AS modified, n.domains AS domains"
+            )
+            nodes.update((record["id"], (record["modified"], sorted(record["domains"] or []))) for record in result)
+        result = session.run("""
+        MATCH ()-[r]->() WHERE r.id IS NOT NULL AND r.modified IS NOT NULL
+        RETURN r.id AS id, r.modified AS modified, type(r) AS type, r.domains AS domains
+        """)
+        relationships = {
+            record["id"]: (record["modified"], record["type"], sorted(record["domains"] or []))
+            for record in result
+        }
+        return nodes, relationships
+    
+    def _tombstone_nodes(self, session, node_ids):
+        """标记失效节点（保留节点及其 MySQL 关联，前端按 deprecated 属性区分），返回数量"""
+        count = 0
+        for label, ids in self._group_ids_by_label(node_ids).items():
+            record = session.run(f"""
+            UNWIND $ids as node_id
+            MATCH (n:{quote_label(label)} {{id: node_id}})
+            WHERE n.deprecated IS NULL OR n.deprecated = false
+            SET n.deprecated = true
+            RETURN count(n) AS count
+            """, ids=ids).single()
+            count += record["count"] if record else 0
+        return count
+    
+    def _retag_nodes(self, session, rows):
+        """只更新节点的 domains，rows 为 [(STIX id, domains)]，返回数量"""
+        count = 0
+        domains = dict(rows)
+        for label, ids in self._group_ids_by_label(domains).items():
+            record = session.run(f"""
+            UNWIND $rows as row
+            MATCH (n:{quote_label(label)} {{id: row.id}})
+            SET n.domains = row.domains
+            RETURN count(n) AS count
+            """, rows=[{"id": node_id, "domains": domains[node_id]} for node_id in ids]).single()
+            count += record["count"] if record else 0
+        return count
+    
+    def _retag_relationships(self, session, rows):
+        """只更新关系的 domains，rows 为 [(关系类型, STIX id, domains)]，返回数量"""
+        groups = {}
+        for rel_type, rel_id, domains in rows:
+            groups.setdefault(rel_type, {})[rel_id] = domains
+        count = 0
+        for rel_type, domains in groups.items():
+            record = session.run(f"""
+            MATCH ()-[r:{quote_label(rel_type)}]->() WHERE r.id IN $ids
+            SET r.domains = $domains[r.id]
+            RETURN count(r) AS count
+            """, ids=list(domains), domains=domains).single()
+            count += record["count"] if record else 0
+        return count
+    
+    def _delete_relationships(self, session, relationships):
+        """按关系类型分组删除关系，relationships 为 [(关系类型, STIX id)]，返回数量"""
+        groups = {}
+        for rel_type, rel_id in relationships:
+            groups.setdefault(rel_type, []).append(rel_id)
+        count = 0
+        for rel_type, ids in groups.items():
+            record = session.run(f"""
+            MATCH ()-[r:{quote_label(rel_type)}]->() WHERE r.id IN $ids
+            DELETE r
+            RETURN count(r) AS count
+            """, ids=ids).single()
+            count += record["count"] if record else 0
+        return count
+    
+    @staticmethod
+    def _group_ids_by_label(node_ids):
+        groups = {}
+        for node_id in node_ids:
+            label = label_for_stix_id(node_id)
+            if label:
+                groups.setdefault(label, []).append(node_id)
+        return groups
+
+
+def _split_absent(stored, imported_domains, domains_of):
+    """
+    本次 bundle 中没有出现的已入库对象：
+    不再属于任何领域的 → 失效列表 [id]，仍属于其他领域的 → 更新列表 [(id, 剩余领域)]
+    """
+    absent, retagged = [], []
+    for obj_id, state in stored.items():
+        domains = domains_of(state)
+        remaining = sorted(set(domains) - imported_domains)
+        if not remaining:
+            absent.append(obj_id)
+        elif remaining != domains:
+            retagged.append((obj_id, remaining))
+    return absent, retagged
+
+
+def _merge_nodes_query(label):
+    """按标签批量 MERGE 节点（去除字数限制），属性映射与后端内存图共用；标签来自 STIX_TYPE_LABELS"""
+    return f"""
+    UNWIND $rows as props
+    MERGE (n:{quote_label(label)} {{id: props.id}})
+    SET n += props
+    RETURN count(n) AS count
+    """
+
+
+def _merge_relationships_query(rel_type, source_label, target_label):
+    """按（关系类型, 源标签, 目标标签）批量 MERGE 关系，以 STIX id 保证幂等；端点不存在的行被跳过"""
+    return f"""
+    UNWIND $rows as rel
+    MATCH (s:{quote_label(source_label)} {{id: rel.source}})
+    MATCH (t:{quote_label(target_label)} {{id: rel.target}})
+    MERGE (s)-[r:{quote_label(rel_type)} {{id: rel.props.id}}]->(t)
+    SET r += rel.props
+    RETURN count(r) AS count
+    """
+
+
+def _replace_relationships_query(rel_type, source_label, target_label, old_type):
+    """
+    更新已有的 relationship 对象：先按 STIX id 删除旧关系（旧类型走关系 id 索引），再按新的类型与端点 MERGE；
+    删除与写入在同一事务中，端点不存在时旧关系同样被删除
+    """
+    return f"""
+    UNWIND $rows as rel
+    OPTIONAL MATCH ()-[old:{quote_label(old_type)} {{id: rel.props.id}}]->()
+    WITH rel, collect(old) AS olds
+    FOREACH (o IN olds | DELETE o)
+    WITH rel
+    MATCH (s:{quote_label(source_label)} {{id: rel.source}})
+    MATCH (t:{quote_label(target_label)} {{id: rel.target}})
+    MERGE (s)-[r:{quote_label(rel_type)} {{id: rel.props.id}}]->(t)
+    SET r += rel.props
+    RETURN count(r) AS count
+    """
+
+
+def _clear_derived_query(label):
+    """删除对象推出的出边（BELONGS_TO / HAS_TACTIC / COMPONENT_OF），随后按新对象重建"""
+    rel_types = "|".join(quote_label(t) for t in DERIVED_RELATIONSHIP_TYPES)
+    return f"""
+    UNWIND $rows as node_id
+    MATCH (n:{quote_label(label)} {{id: node_id}})-[r:{rel_types}]->()
+    DELETE r
+    RETURN count(r) AS count
+    """
+
+
+# 删除指向战术的 BELONGS_TO（增量更新写入战术后重建）
+CLEAR_TACTIC_TECHNIQUE_QUERY = """
+UNWIND $ids as tactic_id
+MATCH (:Technique)-[r:BELONGS_TO]->(:Tactic {id: tactic_id})
+DELETE r
+"""
+
+# 创建技术-战术关系（不同领域的战术 shortname 可能相同，同时按领域匹配）
+TACTIC_TECHNIQUE_QUERY = """
+UNWIND $rows as rel
+MATCH (t:Technique {id: rel.tech_id})
+MATCH (ta:Tactic {shortname: rel.phase}) WHERE rel.domain IN ta.domains
+MERGE (t)-[r:BELONGS_TO]->(ta)
+RETURN count(r) AS count
+"""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导入 ATT&CK STIX 数据到 Neo4j")
+    parser.add_argument("files", nargs="*", default=[DEFAULT_BUNDLE],
+                        help="STIX bundle 文件，可同时给出 enterprise / mobile / ics 多个领域；"
+                             "领域由文件名推断，也可写成 <领域>=<路径>")
+    parser.add_argument("--mode", choices=["upsert", "rebuild", "csv"], default="upsert",
+                        help="upsert：按 id / modified 增量更新（默认）；rebuild：清空数据库后完整导入；"
+                             "csv：生成 neo4j-admin 离线批量导入的 CSV，不连接数据库")
+    parser.add_argument("--out", default=DEFAULT_CSV_DIR, help="csv 模式的输出目录")
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password", default="K988464noNeo4j")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="初始批大小，导入过程中按事务耗时自适应")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并发写入的 session 数")
+    args = parser.parse_args()
+
+    if args.mode == "csv":
+        started = time.perf_counter()
+        result = export_csv(args.files, args.out)
+        for label, count in sorted(result["nodes"].items()):
+            print(f"  {label}: {count}")
+        for rel_type, count in sorted(result["relationships"].items()):
+            print(f"  {rel_type}: {count}")
+        print(f"CSV 已写入 {args.out}，用时 {time.perf_counter() - started:.1f}s")
+        print(f"停止 Neo4j 后执行 {result['script']} 导入，启动后再运行一次 --mode upsert 建立约束、索引与布局")
+        sys.exit(0)
+
+    importer = LiteATTACKImporter(args.uri, args.user, args.password)
 
-# 使用
-importer = LiteATTACKImporter("bolt://localhost:7687", "neo4j", "K988464noNeo4j")
+    if args.mode == "rebuild":
+        # 1. 先清空数据库
+        importer.clear_database()
 
-# 1. 先清空数据库
-importer.clear_database()
+        # 2. 重新导入完整数据
+        importer.load_attack_data(args.files, args.batch_size, workers=args.workers)
 
-# 2. 重新导入完整数据
-importer.load_core_data("./cti/enterprise-attack/enterprise-attack.json")
\ No newline at end of file
+        # 3. 预计算布局
+        importer.compute_layout()
+    else:
+        # 只写入变化的部分，新节点做局部布局
+        importer.load_attack_data(args.files, args.batch_size, mode="upsert", workers=args.workers)
+        importer.layout_new_nodes()
+    importer.report_index_usage()
@@ -1,4 +1,169 @@
-from neo4j import GraphDatabase
+"""
+导入结果验证
+- 数量检查与一致性检查（孤立技术、无战术的技术、悬空的 SUB_TECHNIQUE_OF、重复 id、仍在图中的撤销对象等）
+  在线程池中并发执行，每个检查使用独立的只读 session（共享驱动的连接池）
+- 输出每个检查的数量、样例与耗时，可保存为 JSON 报告
+- 退出码供 CI 判断导入是否可用：0 通过，1 有 error 级检查未通过（--strict 时包括 warning），2 有检查执行失败
+
+用法：
+    python verify.py                        # 输出检查结果
+    python verify.py --json report.json     # 同时保存 JSON 报告（- 表示输出到标准输出）
+    python verify.py --demo                 # 另外运行搜索 / 技术详情示例
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from neo4j import GraphDatabase, READ_ACCESS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from utils.attack_schema import ID_LABELS, quote_label
+from utils.graph_schema import SCHEMA_KEY, SCHEMA_VERSION
+from utils.graph_version import META_KEY, META_LABEL
+
+DEFAULT_WORKERS = 4
+# 每个检查最多返回的问题样例数
+SAMPLE_SIZE = 10
+
+# 未撤销、未弃用的节点
+_ACTIVE = "NOT coalesce({0}.revoked, false) AND NOT coalesce({0}.deprecated, false)"
+
+
+def _count_check(name, query, min_count=0, severity="info"):
+    """数量检查：count 小于 min_count 时不通过"""
+    return {"name": name, "kind": "count", "severity": severity, "min_count": min_count, "query": query}
+
+
+def _consistency_check(name, description, query, severity="error"):
+    """一致性检查：count 为问题数量，大于 0 时不通过，samples 为问题样例"""
+    return {"name": name, "kind": "consistency", "severity": severity, "description": description, "query": query}
+
+
+CHECKS = [
+    _count_check(f"{label} 数量", f"MATCH (n:{quote_label(label)}) RETURN count(n) AS count",
+                 min_count=1 if label in ("Technique", "Tactic") else 0,
+                 severity="error" if label in ("Technique", "Tactic") else "info")
+    for label in ID_LABELS
+] + [
+    _count_check("关系总数", "MATCH ()-[r]->() RETURN count(r) AS count", min_count=1, severity="error"),
+    _count_check("BELONGS_TO 数量", "MATCH (:Technique)-[r:BELONGS_TO]->(:Tactic) RETURN count(r) AS count",
+                 min_count=1, severity="error"),
+    _count_check("图版本号", f"MATCH (m:{META_LABEL} {{key: '{META_KEY}'}}) RETURN count(m) AS count",
+                 min_count=1, severity="warning"),
+    _count_check("schema 版本", f"""
+        OPTIONAL MATCH (m:{META_LABEL} {{key: '{SCHEMA_KEY}'}})
+        RETURN coalesce(m.version, 0) AS count
+    """, min_count=SCHEMA_VERSION, severity="warning"),
+
+    _consistency_check("孤立技术", "没有任何关系的有效技术", f"""
+        MATCH (t:Technique) WHERE {_ACTIVE.format("t")} AND NOT (t)--()
+        RETURN count(t) AS count, collect(coalesce(t.external_id, t.id))[..$samples] AS samples
+    """, severity="warning"),
+    _consistency_check("无战术的技术", "没有 BELONGS_TO 的有效技术（kill_chain_phases 与战术 shortname 对不上）", f"""
+        MATCH (t:Technique) WHERE {_ACTIVE.format("t")} AND NOT (t)-[:BELONGS_TO]->(:Tactic)
+        RETURN count(t) AS count, collect(coalesce(t.external_id, t.id))[..$samples] AS samples
+    """),
+    _consistency_check("悬空的 SUB_TECHNIQUE_OF", "端点不是技术、起点不是子技术、终点是子技术，或有效子技术指向已失效的父技术", f"""
+        MATCH (s)-[r:SUB_TECHNIQUE_OF]->(p)
+        WHERE NOT s:Technique OR NOT p:Technique
+           OR s.is_subtechnique = false OR p.is_subtechnique = true
+           OR ({_ACTIVE.format("s")} AND NOT ({_ACTIVE.format("p")}))
+        RETURN count(r) AS count,
+               collect(coalesce(s.external_id, s.id) + ' -> ' + coalesce(p.external_id, p.id))[..$samples] AS samples
+    """),
+    _consistency_check("缺少父技术的子技术", "is_subtechnique 为 true 但没有 SUB_TECHNIQUE_OF 的有效技术", f"""
+        MATCH (t:Technique) WHERE t.is_subtechnique = true AND {_ACTIVE.format("t")}
+          AND NOT (t)-[:SUB_TECHNIQUE_OF]->(:Technique)
+        RETURN count(t) AS count, collect(coalesce(t.external_id, t.id))[..$samples] AS samples
+    """),
+    _consistency_check("重复的节点 id", "同一业务 id 对应多个节点（缺少唯一约束时的重复导入）", f"""
+        MATCH (n) WHERE n.id IS NOT NULL AND NOT n:{META_LABEL}
+        WITH n.id AS id, count(*) AS copies WHERE copies > 1
+        RETURN count(id) AS count, collect(id)[..$samples] AS samples
+    """),
+    _consistency_check("重复的关系 id", "同一 STIX relationship id 对应多条关系", """
+        MATCH ()-[r]->() WHERE r.id IS NOT NULL
+        WITH r.id AS id, count(*) AS copies WHERE copies > 1
+        RETURN count(id) AS count, collect(id)[..$samples] AS samples
+    """),
+    _consistency_check("仍在图中的撤销对象", "已撤销 / 弃用的节点（增量更新保留为失效节点，前端按属性区分）", """
+        MATCH (n) WHERE n.revoked = true OR n.deprecated = true
+        RETURN count(n) AS count, collect(coalesce(n.external_id, n.id))[..$samples] AS samples
+    """, severity="warning"),
+    _consistency_check("撤销对象的关系", "已撤销 / 弃用的节点仍有 REVOKED_BY 以外的关系", """
+        MATCH (n)-[r]-() WHERE (n.revoked = true OR n.deprecated = true) AND type(r) <> 'REVOKED_BY'
+        WITH DISTINCT n
+        RETURN count(n) AS count, collect(coalesce(n.external_id, n.id))[..$samples] AS samples
+    """, severity="warning"),
+]
+
+
+def _run_check(driver, check, sample_size):
+    started = time.perf_counter()
+    result = {key: check[key] for key in ("name", "kind", "severity")}
+    if check.get("description"):
+        result["description"] = check["description"]
+    try:
+        with driver.session(default_access_mode=READ_ACCESS) as session:
+            record = session.execute_read(lambda tx: tx.run(check["query"], samples=sample_size).single())
+        count = record["count"] if record else 0
+        result["count"] = count
+        if check["kind"] == "count":
+            result["min_count"] = check["min_count"]
+            result["status"] = "pass" if count >= check["min_count"] else "fail"
+        else:
+            result["samples"] = record["samples"] if record else []
+            result["status"] = "pass" if count == 0 else "fail"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def run_checks(driver, checks=None, workers=DEFAULT_WORKERS, sample_size=SAMPLE_SIZE, strict=False):
+    """
+    并发执行检查，返回报告 {"ok", "exit_code", "seconds", "summary", "checks"}
+    checks 按定义顺序输出；strict=True 时 warning 级检查未通过同样视为失败
+    """
+    checks = checks or CHECKS
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") as executor:
+        results = list(executor.map(lambda check: _run_check(driver, check, sample_size), checks))
+
+    gating = ("error", "warning") if strict else ("error",)
+    failed = [r for r in results if r["status"] == "fail" and r["severity"] in gating]
+    errors = [r for r in results if r["status"] == "error"]
+    exit_code = 2 if errors else 1 if failed else 0
+    return {
+        "ok": exit_code == 0,
+        "exit_code": exit_code,
+        "strict": strict,
+        "seconds": round(time.perf_counter() - started, 3),
+        "summary": {
+            "checks": len(results),
+            "passed": sum(1 for r in results if r["status"] == "pass"),
+            "failed": sum(1 for r in results if r["status"] == "fail"),
+            "errors": len(errors),
+        },
+        "checks": results,
+    }
+
+
+def print_report(report):
+    for r in report["checks"]:
+        mark = {"pass": "通过", "fail": "未通过", "error": "出错"}[r["status"]]
+        value = r.get("error") if r["status"] == "error" else r["count"]
+        print(f"[{mark}] {r['name']}: {value}（{r['ms']}ms）")
+        if r["status"] == "fail" and r.get("samples"):
+            print(f"    样例: {', '.join(str(s) for s in r['samples'])}")
+    summary = report["summary"]
+    print(f"共 {summary['checks']} 项检查，通过 {summary['passed']}，未通过 {summary['failed']}，"
+          f"出错 {summary['errors']}，用时 {report['seconds']}s")
+
 
 class ATTACKVerifier:
     def __init__(self, uri, user, password):
@@ -7,16 +172,15 @@ class ATTACKVerifier:
     def close(self):
         self.driver.close()
     
-    def verify_import(self):
-        """验证导入结果"""
+    def verify_import(self, workers=DEFAULT_WORKERS, strict=False):
+        """验证导入结果，输出并返回检查报告（见 run_checks）"""
+        report = run_checks(self.driver, workers=workers, strict=strict)
+        print_report(report)
+        return report
+
+    def top_techniques(self):
+        """最常用的技术与技术最多的战术"""
         queries = [
-            ("技术数量", "MATCH (t:Technique) RETURN count(t) as count"),
-            ("战术数量", "MATCH (t:Tactic) RETURN count(t) as count"),
-            ("缓解措施数量", "MATCH (m:Mitigation) RETURN count(m) as count"),
-            ("攻击组织数量", "MATCH (g:Group) RETURN count(g) as count"),
-            ("软件数量", "MATCH (s:Software) RETURN count(s) as count"),
-            ("数据源数量", "MATCH (d:DataSource) RETURN count(d) as count"),
-            ("关系总数", "MATCH ()-[r]->() RETURN count(r) as count"),
             ("最常用的技术", """
                 MATCH (t:Technique)<-[r:USES]-()
                 RETURN t.name, t.external_id, count(r) as usage_count 
@@ -33,7 +197,7 @@ class ATTACKVerifier:
             for name, query in queries:
                 result = session.run(query)
                 for record in result:
-                    print(f"{name}: {record['count'] if 'count' in record else record}")
+                    print(f"{name}: {record}")
     
     def search_technique(self, search_term):
         """搜索技术"""
@@ -97,19 +261,45 @@ class ATTACKVerifier:
                 if record['detection']:
                     print(f"\n检测方法:\n{record['detection']}")
 
-# 使用示例
 if __name__ == "__main__":
-    verifier = ATTACKVerifier("bolt://localhost:7687", "neo4j", "K988464noNeo4j")
+    parser = argparse.ArgumentParser(description="验证 Neo4j 中的 ATT&CK 导入结果")
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password", default="K988464noNeo4j")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并发执行检查的 session 数")
+    parser.add_argument("--json", help="JSON 报告的保存路径，- 表示输出到标准输出")
+    parser.add_argument("--strict", action="store_true", help="warning 级检查未通过同样返回非零退出码")
+    parser.add_argument("--demo", action="store_true", help="另外运行常用技术统计、搜索与技术详情示例")
+    args = parser.parse_args()
+    if args.json == "-" and args.demo:
+        # 标准输出只能是 JSON 报告，示例输出会使其无法解析
+        parser.error("--json - 不能与 --demo 同时使用，请把报告保存到文件")
+
+    verifier = ATTACKVerifier(args.uri, args.user, args.password)
     
     try:
-        print("=== 验证导入结果 ===")
-        verifier.verify_import()
-        
-        print("\n=== 搜索技术示例 ===")
-        verifier.search_technique("Execution")
-        
-        print("\n=== 技术详情示例 ===")
-        verifier.get_technique_details("T1059")  # Command and Scripting Interpreter
+        if args.json == "-":
+            report = run_checks(verifier.driver, workers=args.workers, strict=args.strict)
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            print("=== 验证导入结果 ===")
+            report = verifier.verify_import(workers=args.workers, strict=args.strict)
+            if args.json:
+                with open(args.json, "w", encoding="utf-8") as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                print(f"报告已保存: {args.json}")
+
+        if args.demo:
+            print("\n=== 常用技术统计 ===")
+            verifier.top_techniques()
+
+            print("\n=== 搜索技术示例 ===")
+            verifier.search_technique("Execution")
+            
+            print("\n=== 技术详情示例 ===")
+            verifier.get_technique_details("T1059")  # Command and Scripting Interpreter
     
     finally:
-        verifier.close()
\ No newline at end of file
+        verifier.close()
+
+    sys.exit(report["exit_code"])
@@ -10,6 +10,10 @@ from routes.admin import bp as admin_bp
 from routes.learning_path import bp as learning_path_bp
 from routes.materials import bp as materials_bp
 from utils.database import init_db
+from utils.attack_matrix import attack_matrix
+from utils.graph_mirror import graph_mirror
+from utils.graph_repository import get_graph_repository
+from utils.graph_schema import ensure_schema
 
 app = Flask(__name__)
 
@@ -58,7 +62,9 @@ def home():
                 "update_user": "PUT /api/admin/users/<user_id>",
                 "delete_user": "DELETE /api/admin/users/<user_id>",
                 "reset_password": "POST /api/admin/users/<user_id>/reset-password",
-                "stats": "GET /api/admin/stats"
+                "stats": "GET /api/admin/stats",
+                "knowledge_sync": "GET / POST /api/admin/knowledge/sync",
+                "job": "GET /api/admin/jobs/<job_id>"
             },
             "graph": {
                 "nodes": "GET /api/graph/nodes",
@@ -120,6 +126,15 @@ if __name__ == "__main__":
     with app.app_context():
         db.create_all()
         print("数据库表已初始化")
+
+    # 确保 Neo4j 约束与索引为最新版本（内存图后端无需）
+    repository = get_graph_repository()
+    if repository.name == "neo4j":
+        ensure_schema(repository.driver, verbose=True)
+
+    # 后台构建图镜像（路径查询 / 中心性分析使用）与 ATT&CK 矩阵
+    graph_mirror.warm_up(repository)
+    attack_matrix.warm_up(repository)
     
     # 启动应用
     print(f"服务器启动: http://0.0.0.0:5005")
@@ -0,0 +1,420 @@
+"""
+图接口性能基准
+- 生成可调规模的合成 ATT&CK（STIX 2.x）数据：节点数量、技术被引用的长尾分布（Zipf 指数）均可配置
+- 通过 Flask test client 调用 get_subgraph / attack_data / node_types / generate_path 等接口
+- 每个接口统计 p50 / p95 / p99 延迟、响应字节数、Neo4j 往返次数与分配峰值，并记录进程峰值 RSS
+- 结果保存为 JSON，可用 --compare 与之前的结果（其他提交）对比
+
+用法（在 backend 目录下）：
+    python benchmark_graph.py --techniques 2000 --output bench.json
+    python benchmark_graph.py --techniques 2000 --compare bench.json
+    python benchmark_graph.py --backend neo4j      # 对当前 Neo4j 中的数据压测（需先用 KG_data 导入）
+    python benchmark_graph.py --bundle-out synthetic.json --iterations 0   # 只生成合成数据，供导入脚本使用
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# ---------- 合成数据 ----------
+
+TACTIC_SHORTNAMES = [
+    "reconnaissance", "resource-development", "initial-access", "execution", "persistence",
+    "privilege-escalation", "defense-evasion", "credential-access", "discovery", "lateral-movement",
+    "collection", "command-and-control", "exfiltration", "impact"
+]
+PLATFORMS = ["Windows", "Linux", "macOS", "Network", "Containers", "IaaS", "SaaS", "Office 365"]
+WORDS = ("adversary may use technique to gain access execute code persist escalate evade detection "
+         "credential discovery lateral movement collection exfiltration command control impact").split()
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _stix_id(stix_type, index):
+    return f"{stix_type}--{index:08d}-0000-4000-8000-{index:012d}"
+
+
+def _zipf_weights(count, exponent):
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def generate_stix_bundle(techniques=600, tactics=14, groups=130, software=700, mitigations=270,
+                         data_sources=40, subtechnique_ratio=0.6, uses_per_group=30,
+                         zipf_exponent=1.1, description_words=80, seed=42):
+    """
+    生成合成 STIX bundle
+    - 技术按 subtechnique_ratio 划分为父技术与子技术，每个技术属于 1~3 个战术
+    - 组织 / 软件使用技术的概率服从 Zipf 分布（少数技术被大量使用），缓解措施同理
+    """
+    rng = random.Random(seed)
+    created = "2020-01-01T00:00:00.000Z"
+    objects = []
+
+    def base(stix_type, index, name, external_id):
+        return {
+            "type": stix_type,
+            "id": _stix_id(stix_type, index),
+            "name": name,
+            "description": _text(rng, description_words),
+            "created": created,
+            "modified": created,
+            "external_references": [{
+                "source_name": "mitre-attack",
+                "external_id": external_id,
+                "url": f"https://attack.mitre.org/{external_id}"
+            }]
+        }
+
+    tactic_names = [TACTIC_SHORTNAMES[i % len(TACTIC_SHORTNAMES)] + (f"-{i}" if i >= len(TACTIC_SHORTNAMES) else "")
+                    for i in range(tactics)]
+    for i, shortname in enumerate(tactic_names):
+        obj = base("x-mitre-tactic", i, shortname.replace("-", " ").title(), f"TA{i:04d}")
+        obj["x_mitre_shortname"] = shortname
+        objects.append(obj)
+
+    parent_count = max(int(techniques * (1 - subtechnique_ratio)), 1)
+    technique_ids = []
+    for i in range(techniques):
+        is_sub = i >= parent_count
+        parent = rng.randrange(parent_count) if is_sub else i
+        external_id = f"T{1000 + parent}" + (f".{i:03d}" if is_sub else "")
+        obj = base("attack-pattern", i, f"Technique {external_id}", external_id)
+        obj["kill_chain_phases"] = [
+            {"kill_chain_name": "mitre-attack", "phase_name": phase}
+            for phase in rng.sample(tactic_names, k=min(rng.randint(1, 3), len(tactic_names)))
+        ]
+        obj["x_mitre_platforms"] = rng.sample(PLATFORMS, k=rng.randint(1, 4))
+        obj["x_mitre_is_subtechnique"] = is_sub
+        objects.append(obj)
+        technique_ids.append(obj["id"])
+        if is_sub:
+            objects.append(_relationship(rng, "subtechnique-of", obj["id"], _stix_id("attack-pattern", parent)))
+
+    weights = _zipf_weights(len(technique_ids), zipf_exponent)
+    popularity = technique_ids[:]
+    rng.shuffle(popularity)
+
+    for stix_type, count, prefix in (("intrusion-set", groups, "G"), ("malware", software, "S"),
+                                     ("course-of-action", mitigations, "M"), ("x-mitre-data-source", data_sources, "DS")):
+        for i in range(count):
+            # 软件的一半生成为 tool
+            real_type = "tool" if stix_type == "malware" and i % 2 else stix_type
+            obj = base(real_type, i, f"{real_type.title()} {i}", f"{prefix}{i:04d}")
+            objects.append(obj)
+            if real_type == "x-mitre-data-source":
+                continue
+            rel_type = "mitigates" if real_type == "course-of-action" else "uses"
+            fan_out = max(1, int(rng.expovariate(1.0 / uses_per_group)))
+            targets = set(rng.choices(popularity, weights=weights, k=fan_out))
+            for target in targets:
+                objects.append(_relationship(rng, rel_type, obj["id"], target))
+
+    return {"type": "bundle", "id": "bundle--synthetic", "objects": objects}
+
+
+_relationship_counter = [0]
+
+
+def _relationship(rng, rel_type, source_ref, target_ref):
+    _relationship_counter[0] += 1
+    return {
+        "type": "relationship",
+        "id": _stix_id("relationship", _relationship_counter[0]),
+        "relationship_type": rel_type,
+        "source_ref": source_ref,
+        "target_ref": target_ref,
+        "created": "2020-01-01T00:00:00.000Z",
+        "modified": "2020-01-01T00:00:00.000Z"
+    }
+
+
+# ---------- 测量 ----------
+
+class RoundTripCounter:
+    """统计 Neo4j 往返次数：包装驱动的 Session.run / Transaction.run"""
+
+    def __init__(self):
+        self.count = 0
+        self._patched = []
+
+    def install(self):
+        try:
+            import neo4j
+        except ImportError:
+            return
+        owners = []
+        for cls_name in ("Session", "Transaction", "ManagedTransaction"):
+            cls = getattr(neo4j, cls_name, None)
+            # run 可能定义在基类（TransactionBase）上，只包装定义它的类一次
+            owner = next((k for k in cls.__mro__ if "run" in k.__dict__), None) if cls else None
+            if owner is not None and owner not in owners:
+                owners.append(owner)
+
+        for owner in owners:
+            original = owner.__dict__["run"]
+
+            def run(*args, _original=original, **kwargs):
+                self.count += 1
+                return _original(*args, **kwargs)
+
+            owner.run = run
+            self._patched.append((owner, original))
+
+    def uninstall(self):
+        for cls, original in self._patched:
+            cls.run = original
+        self._patched = []
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(int(round(pct / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回 KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+@contextmanager
+def _traced():
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        tracemalloc.stop()
+
+
+def measure(client, request, iterations, counter, cold=False):
+    """
+    对单个请求测量 iterations 次
+    cold=True 时每次请求前清空快照缓存与图镜像，测量缓存未命中的代价
+    """
+    from utils.graph_cache import snapshot_cache
+    from utils.graph_mirror import graph_mirror
+
+    method, url, kwargs = request
+    latencies = []
+    sizes = []
+    round_trips = []
+    status = None
+
+    for _ in range(iterations):
+        if cold:
+            snapshot_cache.clear()
+            graph_mirror.clear()
+        before = counter.count
+        started = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        body = response.get_data()
+        latencies.append((time.perf_counter() - started) * 1000)
+        sizes.append(len(body))
+        round_trips.append(counter.count - before)
+        status = response.status_code
+
+    # 单独执行一次带 tracemalloc 的请求测量分配峰值，避免影响延迟样本
+    if cold:
+        snapshot_cache.clear()
+        graph_mirror.clear()
+    with _traced():
+        client.open(url, method=method, **kwargs).get_data()
+        _, peak_alloc = tracemalloc.get_traced_memory()
+
+    return {
+        "status": status,
+        "iterations": iterations,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "bytes": int(statistics.median(sizes)),
+        "round_trips": int(statistics.median(round_trips)),
+        "peak_alloc_kb": peak_alloc // 1024
+    }
+
+
+def build_app():
+    from flask import Flask
+    from routes.graph import bp as graph_bp
+    from routes.learning_path import bp as learning_path_bp
+
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = os.urandom(16).hex()
+    app.register_blueprint(graph_bp, url_prefix="/api")
+    app.register_blueprint(learning_path_bp, url_prefix="/api")
+    return app
+
+
+def benchmark_requests(app, sample_ids):
+    """要压测的请求：(名称, (方法, URL, 参数))"""
+    from utils.security import generate_token
+
+    with app.app_context():
+        token = generate_token(1, "benchmark")
+    auth = {"headers": {"Authorization": f"Bearer {token}"}}
+
+    requests = [
+        ("get_subgraph", ("GET", "/api/graph/get_subgraph", {})),
+        ("attack_data", ("GET", "/api/graph/attack_data", {})),
+        ("attack_data_columnar", ("GET", "/api/graph/attack_data?format=columnar&data_source=attack", {})),
+        ("node_types", ("GET", "/api/graph/node_types", {})),
+        ("generate_path", ("POST", "/api/learning_path/generate",
+                           dict(auth, json={"target_knowledge": sample_ids[:5], "max_nodes": 10}))),
+    ]
+    if len(sample_ids) >= 2:
+        requests.append(("path", ("GET", f"/api/graph/path?from={sample_ids[0]}&to={sample_ids[-1]}&k=3", {})))
+    requests.append(("centrality", ("GET", "/api/graph/analytics/centrality?metric=pagerank&label=Technique", {})))
+    return requests
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(current, previous):
+    """打印与之前结果的对比（p95 延迟与响应大小）"""
+    print(f"\n对比 {previous['meta'].get('commit')} → {current['meta'].get('commit')}")
+    print(f"{'接口':<24}{'p95 (ms)':>22}{'bytes':>26}")
+    for name, result in current["endpoints"].items():
+        old = previous["endpoints"].get(name)
+        if not old:
+            print(f"{name:<24}{'(新增)':>22}")
+            continue
+        p95_delta = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        print(f"{name:<24}{old['p95_ms']:>9.2f} → {result['p95_ms']:<8.2f}{p95_delta:+6.1f}%"
+              f"{old['bytes']:>12} → {result['bytes']:<10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图接口性能基准")
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory",
+                        help="memory：加载合成数据到内存图；neo4j：压测当前 Neo4j 中已导入的数据")
+    parser.add_argument("--techniques", type=int, default=600)
+    parser.add_argument("--tactics", type=int, default=14)
+    parser.add_argument("--groups", type=int, default=130)
+    parser.add_argument("--software", type=int, default=700)
+    parser.add_argument("--mitigations", type=int, default=270)
+    parser.add_argument("--uses-per-group", type=int, default=30, help="每个组织 / 软件平均使用的技术数")
+    parser.add_argument("--zipf", type=float, default=1.1, help="技术被使用次数的 Zipf 指数，越大越集中")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--cold", action="store_true", help="每次请求前清空快照缓存（测量未命中代价）")
+    parser.add_argument("--bundle-out", help="把合成 STIX bundle 写入该文件（可用 KG_data 导入脚本导入 Neo4j）")
+    parser.add_argument("--output", help="结果 JSON 的保存路径")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args(argv)
+
+    os.environ["GRAPH_BACKEND"] = args.backend
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "bundle_out")}
+    bundle = None
+    if args.backend == "memory" or args.bundle_out:
+        started = time.perf_counter()
+        bundle = generate_stix_bundle(
+            techniques=args.techniques, tactics=args.tactics, groups=args.groups,
+            software=args.software, mitigations=args.mitigations,
+            uses_per_group=args.uses_per_group, zipf_exponent=args.zipf, seed=args.seed
+        )
+        print(f"合成数据: {len(bundle['objects'])} 个 STIX 对象，用时 {time.perf_counter() - started:.2f}s")
+        if args.bundle_out:
+            with open(args.bundle_out, "w", encoding="utf-8") as f:
+                json.dump(bundle, f)
+            print(f"已写入: {args.bundle_out}")
+    if args.iterations <= 0:
+        return 0
+
+    from utils.graph_repository import get_graph_repository, set_graph_repository
+
+    load_ms = None
+    if args.backend == "memory":
+        from utils.memory_graph import MemoryGraphRepository
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(bundle, f)
+            bundle_path = f.name
+        try:
+            # 与导入脚本相同的加载路径：从 STIX 文件读取
+            started = time.perf_counter()
+            set_graph_repository(MemoryGraphRepository.from_stix_bundle(bundle_path))
+            load_ms = round((time.perf_counter() - started) * 1000, 2)
+        finally:
+            os.remove(bundle_path)
+
+    repository = get_graph_repository()
+    index_report = None
+    if repository.name == "neo4j":
+        # 与应用启动相同，先确保约束与索引存在，并记录热点查询实际使用的索引
+        from utils.graph_schema import ensure_schema, index_usage, print_index_usage
+        ensure_schema(repository.driver, verbose=True)
+        index_report = index_usage(repository.driver)
+        print_index_usage(index_report)
+    nodes, _ = repository.topology()
+    sample_ids = [str(node_id) for _, node_id, labels in nodes if node_id and "Technique" in labels]
+    random.Random(args.seed).shuffle(sample_ids)
+
+    app = build_app()
+    client = app.test_client()
+    counter = RoundTripCounter()
+    counter.install()
+    try:
+        endpoints = {}
+        for name, request in benchmark_requests(app, sample_ids):
+            # 预热一次（建立缓存 / 图镜像），冷启动模式除外
+            if not args.cold:
+                client.open(request[1], method=request[0], **request[2]).get_data()
+            endpoints[name] = measure(client, request, args.iterations, counter, cold=args.cold)
+            result = endpoints[name]
+            print(f"{name:<24} p50={result['p50_ms']:>8.2f}ms  p95={result['p95_ms']:>8.2f}ms  "
+                  f"p99={result['p99_ms']:>8.2f}ms  bytes={result['bytes']:>9}  "
+                  f"round_trips={result['round_trips']}  status={result['status']}")
+    finally:
+        counter.uninstall()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "backend": repository.name,
+            "python": platform.python_version(),
+            "params": params,
+            "graph": {"nodes": len(nodes), "edges": len(repository.topology()[1])},
+            "load_ms": load_ms,
+            "indexes": index_report
+        },
+        "endpoints": endpoints,
+        "peak_rss_kb": _peak_rss_kb()
+    }
+    print(f"峰值 RSS: {report['peak_rss_kb'] / 1024:.1f} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 from .user import db, User
-from .knowledge import KnowledgeNode, KnowledgeRelation
+from .knowledge import KnowledgeNode, KnowledgeRelation, KnowledgeSyncState
 from .learning_path import LearningPath, LearningPathNode, UserLearningPath, UserLearningProgress
 from .material import Material
 
 # 导出所有模型
-__all__ = ["db", "User", "KnowledgeNode", "KnowledgeRelation", "LearningPath", "LearningPathNode", "UserLearningPath", "UserLearningProgress", "Material"]
\ No newline at end of file
+__all__ = ["db", "User", "KnowledgeNode", "KnowledgeRelation", "KnowledgeSyncState", "LearningPath", "LearningPathNode", "UserLearningPath", "UserLearningProgress", "Material"]
\ No newline at end of file
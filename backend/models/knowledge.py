@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 
 from .user import db
@@ -16,7 +17,7 @@ class KnowledgeNode(db.Model):
     category = db.Column(db.String(100), nullable=False, default="concept")  # 如 tactic / technique / vulnerability / course
     description = db.Column(db.Text, default="")
     source = db.Column(db.String(50), nullable=False, default="custom")  # mitre / custom / other
-    neo4j_id = db.Column(db.String(128), nullable=True, index=True)  # 关联到 Neo4j 中对应节点的业务 id
+    neo4j_id = db.Column(db.String(128), nullable=True, unique=True, index=True)  # 关联到 Neo4j 中对应节点的业务 id
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -47,6 +48,7 @@ class KnowledgeRelation(db.Model):
     target_id = db.Column(db.Integer, db.ForeignKey("knowledge_nodes.id"), nullable=False, index=True)
     relation_type = db.Column(db.String(50), nullable=False, default="related")
     description = db.Column(db.String(255), default="")
+    neo4j_id = db.Column(db.String(255), nullable=True, unique=True, index=True)  # 由 Neo4j 同步的关系：STIX relationship id 或 起点|类型|终点
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -60,6 +62,33 @@ class KnowledgeRelation(db.Model):
             "target_id": self.target_id,
             "relation_type": self.relation_type,
             "description": self.description,
+            "neo4j_id": self.neo4j_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
+
+
+class KnowledgeSyncState(db.Model):
+    """
+    Neo4j → MySQL 同步的进度
+    high_water 为 JSON：各标签节点 / 关系已同步到的 (modified, id)，graph_epoch 为同步时的图导入批次号
+    """
+
+    __tablename__ = "knowledge_sync_state"
+
+    name = db.Column(db.String(50), primary_key=True)
+    high_water = db.Column(db.Text, default="{}")
+    graph_epoch = db.Column(db.Integer, nullable=True)
+    last_stats = db.Column(db.Text, default="{}")
+    last_full_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "high_water": json.loads(self.high_water or "{}"),
+            "graph_epoch": self.graph_epoch,
+            "last_stats": json.loads(self.last_stats or "{}"),
+            "last_full_at": self.last_full_at.isoformat() if self.last_full_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
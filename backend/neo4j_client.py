@@ -1,10 +1,34 @@
+import threading
+
 from neo4j import GraphDatabase
-import config.neo4j_config as cfg
 
-driver = GraphDatabase.driver(
-    cfg.NEO4J_URI,
-    auth=(cfg.NEO4J_USER, cfg.NEO4J_PASSWORD)
-)
+
+class _LazyDriver:
+    """
+    首次使用时才读取配置并创建 Neo4j 驱动
+    使用内存图后端（GRAPH_BACKEND=memory）时不需要 Neo4j 配置，也不会建立连接
+    """
+
+    def __init__(self):
+        self._driver = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    import config.neo4j_config as cfg
+                    self._driver = GraphDatabase.driver(
+                        cfg.NEO4J_URI,
+                        auth=(cfg.NEO4J_USER, cfg.NEO4J_PASSWORD)
+                    )
+        return self._driver
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+driver = _LazyDriver()
 
 def query(cypher, params=None):
     with driver.session() as session:
@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
 from functools import wraps
 from models.user import db, User
+from neo4j_client import driver
+from utils.graph_jobs import job_registry
+from utils.knowledge_sync import KnowledgeSync, sync_in_progress, sync_state
 from utils.security import (
     generate_token,
     verify_token,
@@ -355,4 +358,57 @@ def get_admin_stats(admin_user):
         })
 
     except Exception as e:
-        return jsonify({'success': False, 'message': f'获取统计信息失败: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'message': f'获取统计信息失败: {str(e)}'}), 500
+
+
+@bp.route('/admin/knowledge/sync', methods=['GET'])
+@admin_required
+def get_knowledge_sync(admin_user):
+    """查看 Neo4j → MySQL 知识库同步的进度（高水位、上次同步的统计）"""
+    try:
+        return jsonify({
+            'success': True,
+            'running': sync_in_progress(),
+            'state': sync_state()
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取同步状态失败: {str(e)}'}), 500
+
+@bp.route('/admin/knowledge/sync', methods=['POST'])
+@admin_required
+def start_knowledge_sync(admin_user):
+    """
+    在后台把 Neo4j 节点 / 关系同步到 KnowledgeNode / KnowledgeRelation（见 utils/knowledge_sync.py）
+    请求体 {"full": true} 为全量同步，默认从上次的高水位增量同步
+    返回任务 ID，通过 /api/admin/jobs/<job_id> 查看进度与统计
+    """
+    if sync_in_progress():
+        return jsonify({'success': False, 'message': '知识库同步正在进行中'}), 409
+
+    data = request.get_json(silent=True) or {}
+    full = bool(data.get('full'))
+    app = current_app._get_current_object()
+
+    def run(job):
+        # 后台线程中没有请求上下文，数据库会话需要应用上下文
+        with app.app_context():
+            stats = KnowledgeSync(driver, progress=job.update).run(full=full)
+        job.update(phase='done', **stats)
+
+    job = job_registry.submit('knowledge_sync', run, {'full': full}, admin_only=True)
+    return jsonify({
+        'success': True,
+        'message': '知识库同步任务已创建',
+        'job_id': job.id
+    }), 202
+
+
+@bp.route('/admin/jobs/<job_id>', methods=['GET'])
+@admin_required
+def get_admin_job(admin_user, job_id):
+    """查询管理员后台任务（如知识库同步）的状态、进度与统计"""
+    job = job_registry.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
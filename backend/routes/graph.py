@@ -1,252 +1,848 @@
-from flask import Blueprint, jsonify, request
+import json
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from neo4j.exceptions import ClientError
 from neo4j_client import driver
+from utils.attack_matrix import attack_matrix
+from utils.attack_schema import DEFAULT_DOMAIN, normalize_domain, quote_label
+from utils.graph_analytics import METRICS, centrality, top_nodes
+from utils.graph_cache import conditional_get, snapshot_cache
+from utils.graph_delete import chunked_delete, collect_label_element_ids
+from utils.graph_format import to_columnar
+from utils.graph_jobs import job_registry
+from utils.graph_layout import relayout_in_background
+from utils.graph_mirror import graph_mirror
+from utils.graph_paths import k_shortest_paths, path_nodes
+from utils.graph_repository import (PROTECTED_PROPERTIES, domain_filter, edge_return_clause, get_graph_repository,
+                                    label_filter, projection_params, record_nodes)
+from utils.graph_search import fallback_index, fulltext_search, highlight, split_terms
+from utils.graph_version import META_LABEL, graph_version
+from utils.node_resolver import node_resolver
 
 bp = Blueprint("graph", __name__)
 
+# 属性配置版本号，保存配置时递增，用于 property_config 的 ETag
+_property_config_version = 1
+
+# 预定义的属性配置
+# 可以根据不同的数据源返回不同的配置
+PROPERTY_CONFIGS = {
+    "default": {
+        "groups": [
+            {
+                "name": "基本信息",
+                "order": 1,
+                "properties": ["name", "label", "id", "type", "description"]
+            },
+            {
+                "name": "扩展信息",
+                "order": 2,
+                "properties": []  # 空数组表示显示所有其他属性
+            }
+        ],
+        "property_labels": {
+            "name": "名称",
+            "label": "标签",
+            "id": "ID",
+            "type": "类型",
+            "description": "描述"
+        },
+        "hidden_properties": ["x", "y"],  # 隐藏的属性
+        "property_order": []  # 空数组表示使用默认顺序
+    },
+    "attack": {
+        "groups": [
+            {
+                "name": "基本信息",
+                "order": 1,
+                "properties": ["name", "external_id", "type", "description"]
+            },
+            {
+                "name": "其他信息",
+                "order": 3,
+                "properties": ["platform", "detection", "created", "modified", "version"]
+            },
+            {
+                "name": "扩展属性",
+                "order": 4,
+                "properties": []
+            }
+        ],
+        "property_labels": {
+            "name": "名称",
+            "external_id": "外部ID",
+            "type": "类型",
+            "description": "描述",
+            "x_mitre_platforms": "MITRE平台",
+            "x_mitre_permissions_required": "所需权限",
+            "x_mitre_data_sources": "数据源",
+            "x_mitre_defense_bypassed": "绕过防御",
+            "kill_chain_phases": "杀伤链阶段",
+            "platform": "平台",
+            "detection": "检测",
+            "created": "创建时间",
+            "modified": "修改时间",
+            "version": "版本"
+        },
+        "hidden_properties": ["x", "y", "id"],
+        "property_order": []
+    }
+}
+
+
+def _current_graph_version():
+    return get_graph_repository().version()
+
+
+def _current_config_version():
+    return _property_config_version
+
+
+def _resolve_node_ids(session, node_ids):
+    """节点 ID → elementId（仅 Neo4j 后端，见 Neo4jGraphRepository.resolve_node_ids）"""
+    return get_graph_repository().resolve_node_ids(session, node_ids)
+
+
+def _resolve_node_id(session, node_id):
+    return _resolve_node_ids(session, [node_id]).get(str(node_id))
+
+
+def _neo4j_only_response():
+    return jsonify({
+        "code": 501,
+        "message": "当前图存储后端不支持该功能"
+    }), 501
+
+
+def _neo4j_only(f):
+    """依赖 Neo4j 的功能（全文索引、Cypher 批量写入等），其他存储后端返回 501"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if get_graph_repository().name != "neo4j":
+            return _neo4j_only_response()
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def _serialize_node(n):
+    """
+    将 Neo4j 节点整理为前端通用的节点结构
+    节点 ID：优先业务 ID，否则 Neo4j 内部 ID
+    """
+    n_id = str(n.get("id") or n.id)
+    return {
+        "id": n_id,
+        "label": n.get("name", ""),
+        "type": list(n.labels)[0] if n.labels else "Node",
+        "x": n.get("x"),
+        "y": n.get("y"),
+        "properties": dict(n)
+    }
+
+
+def _serialize_attack_node(n):
+    """将 Neo4j 节点整理为 ATT&CK 视图使用的节点结构（含完整属性）"""
+    n_id = str(n.get("id") or n.id)
+    return {
+        "id": n_id,
+        "display_id": str(n.get("external_id") or n.get("id") or n_id),
+        "label": n.get("name", ""),
+        "type": list(n.labels)[0] if n.labels else "Node",
+        "external_id": n.get("external_id"),
+        "description": n.get("description"),
+        "platform": n.get("platform"),
+        "detection": n.get("detection"),
+        "created": n.get("created"),
+        "modified": n.get("modified"),
+        "version": n.get("version"),
+        "x_mitre_platforms": n.get("x_mitre_platforms"),
+        "x_mitre_permissions_required": n.get("x_mitre_permissions_required"),
+        "x_mitre_data_sources": n.get("x_mitre_data_sources"),
+        "x_mitre_defense_bypassed": n.get("x_mitre_defense_bypassed"),
+        "kill_chain_phases": n.get("kill_chain_phases"),
+        "x": n.get("x"),
+        "y": n.get("y"),
+        "properties": dict(n)
+    }
+
+
+def _serialize_edge(n_id, rel_type, m_id, suffix):
+    """边结构，suffix 用于保证同一对节点间多条同类型边的 ID 唯一"""
+    return {
+        "id": f"{n_id}_{rel_type}_{m_id}_{suffix}",
+        "source": n_id,
+        "target": m_id,
+        "type": rel_type,
+        "label": rel_type
+    }
+
+
+# 长文本属性：投影模式下默认不返回，通过 /graph/node/<node_id>/properties 按需获取
+LAZY_PROPERTIES = ["description", "detection"]
+
+# 投影模式下始终返回的属性（节点标识、显示名称与布局坐标）
+ALWAYS_PROPERTIES = ["id", "name", "x", "y"]
+
+
+def _parse_projection():
+    """
+    解析属性投影参数，返回 None（不投影）或 (模式, 属性列表)
+    - ?fields=name,external_id：只返回列出的属性（外加 ALWAYS_PROPERTIES）
+    - ?data_source=attack：返回除该数据源隐藏属性和长文本属性之外的所有属性
+    """
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()]
+    if fields:
+        return "include", tuple(sorted(set(fields) | set(ALWAYS_PROPERTIES)))
+
+    data_source = request.args.get("data_source")
+    if data_source:
+        config = PROPERTY_CONFIGS.get(data_source, PROPERTY_CONFIGS["default"])
+        excluded = set(config["hidden_properties"]) | set(LAZY_PROPERTIES)
+        return "exclude", tuple(sorted(excluded - set(ALWAYS_PROPERTIES)))
+
+    return None
+
+
+def _fetch_nodes(iids, projection=None):
+    """按内部 ID 批量取回节点并序列化，返回 {内部 ID: 节点}（图镜像上的计算结果回图存储取属性）"""
+    return {
+        iid: _serialize_node(node)
+        for iid, node in get_graph_repository().nodes_by_iids(iids, projection).items()
+    }
+
+
+# ATT&CK 视图关注的节点标签
+ATTACK_LABELS = [
+    "Technique", "Tactic", "Subtechnique", "Mitigation", "Group", "Software",
+    "DataSource", "DataComponent", "Campaign", "Asset"
+]
+
+# 游标分页：默认 / 最大每页边数
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+
+def _parse_cursor_args():
+    """
+    解析游标分页参数 ?cursor=<上一页返回的 next_cursor>&page_size=，返回 (起始关系内部 ID, 每页边数)
+    cursor 为本页第一条关系内部 ID 的下界（含），为空或 0 表示从头开始；
+    不是非负整数时抛出 ValueError（调用方返回 400）
+    """
+    cursor = request.args.get("cursor", "").strip()
+    start = int(cursor) if cursor else 0
+    if start < 0:
+        raise ValueError(f"cursor 不能为负数: {cursor}")
+    page_size = request.args.get("page_size", DEFAULT_PAGE_SIZE, type=int)
+    page_size = max(min(page_size, MAX_PAGE_SIZE), 1)
+    return start, page_size
+
+
+def _stream_edge_page(where, start, page_size, serialize_node, projection=None, params=None):
+    """
+    以 NDJSON 形式流式输出一页子图
+    - 按关系内部 ID 排序并以其作为游标（不使用 SKIP，翻页代价不随页码增长）
+    - 直接消费 Neo4j 结果迭代器，每条记录立即输出，不在内存中拼装整张图
+    - 每行一个 JSON 对象：{"kind": "node"|"edge"|"page"|"error", ...}
+    - 节点仅在本页内去重，跨页去重由前端完成
+    """
+    cypher = f"""
+    MATCH (n)-[r]->(m)
+    WHERE id(r) >= $start {f"AND ({where})" if where else ""}
+    {edge_return_clause(projection)}
+    ORDER BY rid
+    LIMIT $page_size
+    """
+    query_params = dict(projection_params(projection), start=start, page_size=page_size, **(params or {}))
+
+    def generate():
+        seen = set()
+        count = 0
+        last_rid = None
+        try:
+            with driver.session() as session:
+                result = session.run(cypher, query_params)
+
+                for record in result:
+                    n, m = record_nodes(record)
+                    last_rid = record["rid"]
+                    count += 1
+
+                    for node in (n, m):
+                        node_data = serialize_node(node)
+                        if node_data["id"] not in seen:
+                            seen.add(node_data["id"])
+                            yield json.dumps({"kind": "node", "data": node_data}, ensure_ascii=False) + "\n"
+
+                    n_id = str(n.get("id") or n.id)
+                    m_id = str(m.get("id") or m.id)
+                    edge = _serialize_edge(n_id, record["r_type"], m_id, last_rid)
+                    yield json.dumps({"kind": "edge", "data": edge}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"kind": "error", "message": f"数据库查询失败: {str(e)}"}, ensure_ascii=False) + "\n"
+            return
+
+        # 不足一页说明已到末尾；下一页从本页最后一条关系之后开始
+        next_cursor = str(last_rid + 1) if count == page_size else None
+        yield json.dumps({"kind": "page", "count": count, "next_cursor": next_cursor}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _build_edge_payload(labels, serialize_node, projection=None, limit=200, domain=None):
+    """通过图存储取子图并整理为 nodes / edges 结构，labels 限定起点标签，domain 限定 ATT&CK 领域"""
+    nodes = {}
+    edges = []
+
+    for idx, (n, rel_type, _, m) in enumerate(get_graph_repository().edges(labels, projection, limit, domain)):
+        n_data = serialize_node(n)
+        m_data = serialize_node(m)
+        nodes.setdefault(n_data["id"], n_data)
+        nodes.setdefault(m_data["id"], m_data)
+
+        edges.append(_serialize_edge(n_data["id"], rel_type, m_data["id"], idx))
+
+    return list(nodes.values()), edges
+
+
+def _cached_json(name, build_payload, params=()):
+    """
+    返回按图版本号缓存的 JSON 响应
+    build_payload() 只在图版本变化后首次访问时调用；params 区分同一接口的不同变体
+    """
+    version = _current_graph_version()
+    body = snapshot_cache.get_or_build(
+        name, version, lambda: current_app.json.dumps(build_payload()), params
+    )
+    return current_app.response_class(body, mimetype="application/json")
+
 
 @bp.route("/graph/get_subgraph", methods=["GET"])
+@conditional_get("get_subgraph", _current_graph_version)
 def get_subgraph():
     """
     从 Neo4j 中取一小部分子图，并整理成前端易用的 nodes / edges 结构
     严格保证：session 内消费 result，避免 Result has been consumed 错误
+
+    传入 ?cursor= 时切换为游标分页模式，按页以 NDJSON 流式返回，
+    可遍历整张图：?cursor=&page_size=1000 → 末行的 next_cursor 作为下一页的 cursor
+    ?format=columnar 返回紧凑的列式结构（见 utils/graph_format.py）
+    ?data_source= / ?fields= 在 Cypher 中按需投影属性（见 _parse_projection）
     """
-    cypher = """
-    MATCH (n)-[r]->(m)
-    RETURN n, r, m
-    LIMIT 200
+    projection = _parse_projection()
+
+    if "cursor" in request.args:
+        if get_graph_repository().name != "neo4j":
+            return _neo4j_only_response()
+        try:
+            start, page_size = _parse_cursor_args()
+        except ValueError:
+            return jsonify({"code": 400, "message": "cursor 参数无效"}), 400
+        return _stream_edge_page(None, start, page_size, _serialize_node, projection)
+
+    columnar = request.args.get("format") == "columnar"
+
+    def build_payload():
+        nodes, edges = _build_edge_payload(None, _serialize_node, projection)
+        if columnar:
+            return dict(to_columnar(nodes, edges), code=200, format="columnar")
+        return {
+            "code": 200,
+            "nodes": nodes,
+            "edges": edges
+        }
+
+    try:
+        return _cached_json("get_subgraph", build_payload, (columnar, projection))
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "message": f"数据库查询失败: {str(e)}"
+        }), 500
+
+
+@bp.route("/graph/attack_data", methods=["GET"])
+@conditional_get("attack_data", _current_graph_version)
+def get_attack_data():
     """
+    获取 ATT&CK 框架数据（技术 / 战术 / 缓解措施 / 组织 / 软件 / 数据源等，见 ATTACK_LABELS）
+    返回完整节点属性，保证前后端一致
 
-    nodes = {}
-    edges = []
+    ATT&CK 数据只在导入或管理员编辑时变化，序列化结果按图版本号缓存
+    ?format=columnar 返回紧凑的列式结构（见 utils/graph_format.py）
+    ?data_source= / ?fields= 在 Cypher 中按需投影属性（见 _parse_projection）
+    ?domain=enterprise|mobile|ics 只返回该 ATT&CK 领域的关系（按节点 / 关系的 domains 属性过滤，结果同样按版本缓存）
+    同样支持 ?cursor=&page_size= 游标分页 + NDJSON 流式模式
+    """
+    projection = _parse_projection()
+    domain = normalize_domain(request.args.get("domain", "")) or None
+
+    if "cursor" in request.args:
+        if get_graph_repository().name != "neo4j":
+            return _neo4j_only_response()
+        try:
+            start, page_size = _parse_cursor_args()
+        except ValueError:
+            return jsonify({"code": 400, "message": "cursor 参数无效"}), 400
+        where = f"({label_filter('n', ATTACK_LABELS)})"
+        if domain:
+            where += f" AND {domain_filter()}"
+        return _stream_edge_page(where, start, page_size, _serialize_attack_node, projection, {"domain": domain})
+
+    columnar = request.args.get("format") == "columnar"
+
+    def build_payload():
+        if columnar:
+            # 列式格式中的 ATT&CK 字段都由 properties 推出，使用基础节点结构即可
+            nodes, edges = _build_edge_payload(ATTACK_LABELS, _serialize_node, projection, domain=domain)
+            return dict(to_columnar(nodes, edges), code=200, format="columnar",
+                        message="ATT&CK 数据获取成功")
+        nodes, edges = _build_edge_payload(ATTACK_LABELS, _serialize_attack_node, projection, domain=domain)
+        return {
+            "code": 200,
+            "nodes": nodes,
+            "edges": edges,
+            "message": "ATT&CK 数据获取成功"
+        }
 
     try:
-        with driver.session() as session:
-            result = session.run(cypher)
-
-            for idx, record in enumerate(result):
-                n = record["n"]
-                m = record["m"]
-                r = record["r"]
-
-                # 节点 ID：优先业务 ID，否则 Neo4j 内部 ID
-                n_id = str(n.get("id") or n.id)
-                m_id = str(m.get("id") or m.id)
-
-                # 源节点
-                if n_id not in nodes:
-                    nodes[n_id] = {
-                        "id": n_id,
-                        "label": n.get("name", ""),
-                        "type": list(n.labels)[0] if n.labels else "Node",
-                        "x": n.get("x"),
-                        "y": n.get("y"),
-                        "properties": dict(n)
-                    }
-
-                # 目标节点
-                if m_id not in nodes:
-                    nodes[m_id] = {
-                        "id": m_id,
-                        "label": m.get("name", ""),
-                        "type": list(m.labels)[0] if m.labels else "Node",
-                        "x": m.get("x"),
-                        "y": m.get("y"),
-                        "properties": dict(m)
-                    }
-
-                # 边
-                edges.append({
-                    "id": f"{n_id}_{r.type}_{m_id}_{idx}",
-                    "source": n_id,
-                    "target": m_id,
-                    "type": r.type,
-                    "label": r.type
-                })
+        return _cached_json("attack_data", build_payload, (columnar, projection, domain))
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "message": f"获取 ATT&CK 数据失败: {str(e)}"
+        }), 500
+
+
+@bp.route("/graph/matrix", methods=["GET"])
+@conditional_get("matrix", _current_graph_version)
+def get_matrix():
+    """
+    ATT&CK 矩阵：/graph/matrix?domain=enterprise&platform=Windows
+    - 列为战术（按矩阵的杀伤链顺序），列内为父技术（按名称排序），每个技术附带子技术数量
+    - ?domain= 默认 enterprise-attack；?platform= 只保留该平台的技术与子技术（不区分大小写）
+    - 矩阵每个图版本只由 HAS_TACTIC / BELONGS_TO / SUB_TECHNIQUE_OF 构建一次（见 utils/attack_matrix.py），
+      序列化结果按（领域, 平台）缓存
+    """
+    domain = normalize_domain(request.args.get("domain", "")) or DEFAULT_DOMAIN
+    platform = request.args.get("platform", "").strip() or None
+
+    try:
+        version = _current_graph_version()
+        matrix = attack_matrix.get(get_graph_repository(), version)
+        if domain not in matrix.domains:
+            return jsonify({
+                "code": 404,
+                "message": f"图中没有该领域的数据: {domain}",
+                "domains": matrix.domains
+            }), 404
+
+        def build_payload():
+            return dict(matrix.build(domain, platform), code=200, message="ATT&CK 矩阵获取成功")
 
+        return _cached_json("matrix", build_payload, (domain, platform.lower() if platform else None))
     except Exception as e:
         return jsonify({
             "code": 500,
-            "message": f"数据库查询失败: {str(e)}"
+            "message": f"获取 ATT&CK 矩阵失败: {str(e)}"
+        }), 500
+
+
+@bp.route("/graph/node/<node_id>/properties", methods=["GET"])
+@conditional_get("node_properties", _current_graph_version)
+def get_node_properties(node_id):
+    """
+    按需获取单个节点的属性（投影模式下省略的长文本属性）
+    ?fields=description,detection，默认返回 LAZY_PROPERTIES
+    """
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()] or LAZY_PROPERTIES
+
+    try:
+        properties = get_graph_repository().node_properties(node_id, fields)
+        if properties is None:
+            return jsonify({
+                "code": 404,
+                "message": "节点不存在"
+            }), 404
+
+        return jsonify({
+            "code": 200,
+            "id": str(node_id),
+            "properties": properties
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "message": f"获取节点属性失败: {str(e)}"
         }), 500
 
+
+@bp.route("/graph/cache_stats", methods=["GET"])
+def get_cache_stats():
+    """查看快照缓存的命中率与重建耗时"""
+    try:
+        version = _current_graph_version()
+    except Exception:
+        version = None
     return jsonify({
         "code": 200,
-        "nodes": list(nodes.values()),
-        "edges": edges
+        "backend": get_graph_repository().name,
+        "graph_version": version,
+        "snapshots": snapshot_cache.stats(),
+        "mirror": graph_mirror.stats(),
+        "matrix": attack_matrix.stats()
     })
 
 
-@bp.route("/graph/attack_data", methods=["GET"])
-def get_attack_data():
+# 搜索：默认与最大返回条数
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def _search_hit(node_id, labels, name, external_id, description, score, terms):
+    return {
+        "id": node_id,
+        "label": name,
+        "type": labels[0] if labels else "Node",
+        "external_id": external_id,
+        "score": round(float(score), 4),
+        "highlight": {
+            "label": highlight(name, terms, radius=len(name or "")),
+            "description": highlight(description, terms)
+        }
+    }
+
+
+@bp.route("/graph/search", methods=["GET"])
+@_neo4j_only
+@conditional_get("search", _current_graph_version)
+def search_nodes():
     """
-    获取 ATT&CK 框架数据（Technique / Tactic / Subtechnique / Mitigation / Group / Software）
-    返回完整节点属性，保证前后端一致
+    节点搜索 ?q=关键词&labels=Technique,Group&limit=20
+    多个关键词之间为 AND，每个词按前缀匹配名称、外部 ID 与描述
+    优先使用全文索引，索引不存在时退回进程内搜索
     """
-    cypher = """
-    MATCH (n)-[r]->(m)
-    WHERE n:Technique OR n:Tactic OR n:Subtechnique
-       OR n:Mitigation OR n:Group OR n:Software
-    RETURN n, r, m
-    LIMIT 200
+    terms = split_terms(request.args.get("q", ""))
+    if not terms:
+        return jsonify({
+            "code": 400,
+            "message": "缺少搜索关键词 q"
+        }), 400
+
+    labels = [l.strip() for l in request.args.get("labels", "").split(",") if l.strip()]
+    try:
+        limit = int(request.args.get("limit", DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        limit = DEFAULT_SEARCH_LIMIT
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    try:
+        with driver.session() as session:
+            try:
+                hits = [
+                    _search_hit(
+                        str(n.get("id") or n.id), list(n.labels), n.get("name", ""),
+                        n.get("external_id"), n.get("description"), score, terms
+                    )
+                    for n, score in fulltext_search(session, terms, labels, limit)
+                ]
+                source = "fulltext"
+            except ClientError:
+                # 全文索引尚未创建（旧数据未重新导入）
+                hits = [
+                    _search_hit(
+                        entry["id"], entry["labels"], entry["name"],
+                        entry["external_id"] or None, entry["description"], score, terms
+                    )
+                    for score, entry in fallback_index.search(
+                        session, _current_graph_version(), terms, labels, limit
+                    )
+                ]
+                source = "fallback"
+
+        return jsonify({
+            "code": 200,
+            "query": " ".join(terms),
+            "source": source,
+            "hits": hits
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "message": f"搜索失败: {str(e)}"
+        }), 500
+
+
+# 邻域展开：最大跳数 / 每个节点默认与最大展开边数
+MAX_EXPAND_DEPTH = 3
+DEFAULT_MAX_PER_NODE = 25
+MAX_PER_NODE_LIMIT = 200
+
+
+@bp.route("/graph/expand/<node_id>", methods=["GET"])
+@_neo4j_only
+def expand_node(node_id):
+    """
+    按需展开节点的 k 跳邻域：/graph/expand/<node_id>?depth=1&max_per_node=25&labels=Technique,Tactic
+    - node_id 与 update_node 相同：业务 ID 或 Neo4j 内部 ID
+    - 每个节点最多展开 max_per_node 条边，避免 Tactic 等超级节点一次返回上百条边；
+      超出时随机抽样（ORDER BY rand()，而不是总取最早的边），再次展开得到另一批样本
+    - 被截断的节点在 truncated 中返回其度数（与 labels 过滤条件一致），前端可提示“还有 N 条”
+    """
+    depth = max(min(request.args.get("depth", 1, type=int), MAX_EXPAND_DEPTH), 1)
+    max_per_node = max(min(request.args.get("max_per_node", DEFAULT_MAX_PER_NODE, type=int), MAX_PER_NODE_LIMIT), 1)
+    labels = [label.strip() for label in request.args.get("labels", "").split(",") if label.strip()]
+
+    find_query = """
+    MATCH (n) WHERE elementId(n) = $eid
+    RETURN n, id(n) AS iid
+    """
+
+    # 对每个前沿节点在子查询内随机排序后单独 LIMIT，多取一条用于判断是否被截断；
+    # 度数与展开使用同一个标签条件，每个节点只计算一次
+    expand_query = """
+    UNWIND $frontier AS iid
+    MATCH (n) WHERE id(n) = iid
+    WITH n, size([(n)--(x) WHERE size($labels) = 0 OR any(label IN labels(x) WHERE label IN $labels) | 1]) AS degree
+    CALL {
+        WITH n
+        MATCH (n)-[r]-(m)
+        WHERE size($labels) = 0 OR any(label IN labels(m) WHERE label IN $labels)
+        RETURN r, m
+        ORDER BY rand()
+        LIMIT $limit
+    }
+    RETURN n, r, m, id(r) AS rid, id(m) AS m_iid, id(startNode(r)) = id(n) AS outgoing, degree
     """
 
     nodes = {}
-    edges = []
+    edges = {}
+    truncated = {}
 
     try:
         with driver.session() as session:
-            result = session.run(cypher)
-
-            for idx, record in enumerate(result):
-                n = record["n"]
-                m = record["m"]
-                r = record["r"]
-
-                n_id = str(n.get("id") or n.id)
-                m_id = str(m.get("id") or m.id)
-
-                # 源节点
-                if n_id not in nodes:
-                    nodes[n_id] = {
-                        "id": n_id,
-                        "display_id": str(n.get("external_id") or n.get("id") or n_id),
-                        "label": n.get("name", ""),
-                        "type": list(n.labels)[0] if n.labels else "Node",
-                        "external_id": n.get("external_id"),
-                        "description": n.get("description"),
-                        "platform": n.get("platform"),
-                        "detection": n.get("detection"),
-                        "created": n.get("created"),
-                        "modified": n.get("modified"),
-                        "version": n.get("version"),
-                        "x_mitre_platforms": n.get("x_mitre_platforms"),
-                        "x_mitre_permissions_required": n.get("x_mitre_permissions_required"),
-                        "x_mitre_data_sources": n.get("x_mitre_data_sources"),
-                        "x_mitre_defense_bypassed": n.get("x_mitre_defense_bypassed"),
-                        "kill_chain_phases": n.get("kill_chain_phases"),
-                        "x": n.get("x"),
-                        "y": n.get("y"),
-                        "properties": dict(n)
-                    }
-
-                # 目标节点
-                if m_id not in nodes:
-                    nodes[m_id] = {
-                        "id": m_id,
-                        "display_id": str(m.get("external_id") or m.get("id") or m_id),
-                        "label": m.get("name", ""),
-                        "type": list(m.labels)[0] if m.labels else "Node",
-                        "external_id": m.get("external_id"),
-                        "description": m.get("description"),
-                        "platform": m.get("platform"),
-                        "detection": m.get("detection"),
-                        "created": m.get("created"),
-                        "modified": m.get("modified"),
-                        "version": m.get("version"),
-                        "x_mitre_platforms": m.get("x_mitre_platforms"),
-                        "x_mitre_permissions_required": m.get("x_mitre_permissions_required"),
-                        "x_mitre_data_sources": m.get("x_mitre_data_sources"),
-                        "x_mitre_defense_bypassed": m.get("x_mitre_defense_bypassed"),
-                        "kill_chain_phases": m.get("kill_chain_phases"),
-                        "x": m.get("x"),
-                        "y": m.get("y"),
-                        "properties": dict(m)
-                    }
-
-                # 边
-                edges.append({
-                    "id": f"{n_id}_{r.type}_{m_id}_{idx}",
-                    "source": n_id,
-                    "target": m_id,
-                    "type": r.type,
-                    "label": r.type
+            eid = _resolve_node_id(session, node_id)
+            record = session.run(find_query, {"eid": eid}).single() if eid else None
+            if not record:
+                return jsonify({
+                    "code": 404,
+                    "message": "节点不存在"
+                }), 404
+
+            root = _serialize_node(record["n"])
+            nodes[root["id"]] = root
+            visited = {record["iid"]}
+            frontier = [record["iid"]]
+
+            for _ in range(depth):
+                if not frontier:
+                    break
+                result = session.run(expand_query, {
+                    "frontier": frontier,
+                    "labels": labels,
+                    "limit": max_per_node + 1
                 })
 
+                per_node = {}
+                next_frontier = []
+                for row in result:
+                    n_data = _serialize_node(row["n"])
+                    taken = per_node.get(n_data["id"], 0)
+                    if taken >= max_per_node:
+                        truncated[n_data["id"]] = row["degree"]
+                        continue
+                    per_node[n_data["id"]] = taken + 1
+
+                    m_data = _serialize_node(row["m"])
+                    nodes.setdefault(m_data["id"], m_data)
+                    if row["rid"] not in edges:
+                        source, target = (n_data["id"], m_data["id"]) if row["outgoing"] else (m_data["id"], n_data["id"])
+                        edges[row["rid"]] = _serialize_edge(source, row["r"].type, target, row["rid"])
+
+                    if row["m_iid"] not in visited:
+                        visited.add(row["m_iid"])
+                        next_frontier.append(row["m_iid"])
+                frontier = next_frontier
 
     except Exception as e:
         return jsonify({
             "code": 500,
-            "message": f"获取 ATT&CK 数据失败: {str(e)}"
+            "message": f"展开节点失败: {str(e)}"
+        }), 500
+
+    return jsonify({
+        "code": 200,
+        "root": root["id"],
+        "nodes": list(nodes.values()),
+        "edges": list(edges.values()),
+        "truncated": truncated
+    })
+
+
+# 路径查询：默认 / 最大跳数，最多返回的路径条数
+DEFAULT_PATH_DEPTH = 4
+MAX_PATH_DEPTH = 8
+MAX_PATHS = 10
+
+
+@bp.route("/graph/path", methods=["GET"])
+@conditional_get("path", _current_graph_version)
+def find_path():
+    """
+    两个节点之间的最短路径：/graph/path?from=<id>&to=<id>&max_depth=4&rel_types=USES,BELONGS_TO&k=3
+    - from / to 与 update_node 相同：业务 ID 或 Neo4j 内部 ID
+    - 在进程内的图镜像上做双向 BFS（k>1 时用 Yen 算法求前 k 条无环路径），不跑变长 Cypher
+    - directed=true 时只沿关系方向查找，默认忽略方向
+    - 返回与 get_subgraph 相同的 nodes / edges，paths 中按顺序列出每条路径的节点与边 ID
+    """
+    source_id = request.args.get("from", "").strip()
+    target_id = request.args.get("to", "").strip()
+    if not source_id or not target_id:
+        return jsonify({
+            "code": 400,
+            "message": "缺少 from 或 to 参数"
+        }), 400
+
+    max_depth = max(min(request.args.get("max_depth", DEFAULT_PATH_DEPTH, type=int), MAX_PATH_DEPTH), 1)
+    k = max(min(request.args.get("k", 1, type=int), MAX_PATHS), 1)
+    directed = request.args.get("directed", "false").lower() == "true"
+    rel_type_names = [t.strip() for t in request.args.get("rel_types", "").split(",") if t.strip()]
+    projection = _parse_projection()
+
+    try:
+        # 镜像建立后路径上的节点可能已被删除（其他进程的修改在版本号刷新前尚未反映到镜像）：
+        # 此时重建镜像再查一次，仍不一致时返回 409
+        for attempt in range(2):
+            mirror = graph_mirror.get(get_graph_repository(), _current_graph_version())
+
+            source = mirror.node_index(source_id)
+            target = mirror.node_index(target_id)
+            if source is None or target is None:
+                return jsonify({
+                    "code": 404,
+                    "message": "节点不存在"
+                }), 404
+
+            rel_types = mirror.type_ids(rel_type_names) if rel_type_names else None
+            found = k_shortest_paths(mirror, source, target, k, max_depth, rel_types, directed)
+
+            # 只为路径上的节点回 Neo4j 取属性
+            node_indexes = sorted({idx for edges in found for idx in path_nodes(mirror, source, edges)} | {source, target})
+            nodes = _fetch_nodes([mirror.iids[i] for i in node_indexes], projection)
+            if all(mirror.iids[i] in nodes for i in node_indexes):
+                break
+            graph_mirror.clear()
+        else:
+            return jsonify({
+                "code": 409,
+                "message": "图数据已变化，请重试"
+            }), 409
+
+        edges = {}
+        paths = []
+        for path in found:
+            edge_ids = []
+            for edge in path:
+                rid = mirror.edge_rid[edge]
+                if rid not in edges:
+                    edges[rid] = _serialize_edge(
+                        nodes[mirror.iids[mirror.edge_src[edge]]]["id"],
+                        mirror.rel_types[mirror.edge_type[edge]],
+                        nodes[mirror.iids[mirror.edge_dst[edge]]]["id"],
+                        rid
+                    )
+                edge_ids.append(edges[rid]["id"])
+            paths.append({
+                "nodes": [nodes[mirror.iids[i]]["id"] for i in path_nodes(mirror, source, path)],
+                "edges": edge_ids,
+                "length": len(path)
+            })
+
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "message": f"路径查询失败: {str(e)}"
         }), 500
 
     return jsonify({
         "code": 200,
         "nodes": list(nodes.values()),
-        "edges": edges,
-        "message": "ATT&CK 数据获取成功"
+        "edges": list(edges.values()),
+        "paths": paths
+    })
+
+
+# 中心性排行：默认 / 最大返回条数
+DEFAULT_CENTRALITY_LIMIT = 20
+MAX_CENTRALITY_LIMIT = 1000
+
+
+@bp.route("/graph/analytics/centrality", methods=["GET"])
+@conditional_get("centrality", _current_graph_version)
+def get_centrality():
+    """
+    节点中心性排行：/graph/analytics/centrality?metric=pagerank&label=Technique&limit=20
+    - metric：degree / pagerank / betweenness（抽样近似），默认 pagerank
+    - 在图镜像的 CSR 数组上向量化计算，每个图版本每种指标只算一次
+    - ?format=scores 只返回 {节点 ID: 分数}（不访问 Neo4j），供前端按分数设置节点大小
+    """
+    metric = request.args.get("metric", "pagerank")
+    if metric not in METRICS:
+        return jsonify({
+            "code": 400,
+            "message": f"不支持的指标: {metric}，可选 {', '.join(METRICS)}"
+        }), 400
+
+    label = request.args.get("label") or None
+    limit = max(min(request.args.get("limit", DEFAULT_CENTRALITY_LIMIT, type=int), MAX_CENTRALITY_LIMIT), 1)
+
+    try:
+        mirror = graph_mirror.get(get_graph_repository(), _current_graph_version())
+        scores = centrality(mirror, metric)
+
+        if request.args.get("format") == "scores":
+            indexes = top_nodes(mirror, scores, label, mirror.node_count)
+            return jsonify({
+                "code": 200,
+                "metric": metric,
+                "scores": {mirror.keys[i]: float(scores[i]) for i in indexes}
+            })
+
+        indexes = top_nodes(mirror, scores, label, limit)
+        nodes = _fetch_nodes([mirror.iids[i] for i in indexes], _parse_projection())
+        results = [
+            dict(nodes[mirror.iids[i]], score=float(scores[i]), rank=rank)
+            for rank, i in enumerate(indexes, start=1)
+            if mirror.iids[i] in nodes
+        ]
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "message": f"中心性计算失败: {str(e)}"
+        }), 500
+
+    return jsonify({
+        "code": 200,
+        "metric": metric,
+        "label": label,
+        "results": results
     })
 
 
 @bp.route("/graph/node_types", methods=["GET"])
+@conditional_get("node_types", _current_graph_version)
 def get_node_types():
     """
     获取所有节点类型（标签）和边类型
     用于前端动态生成颜色映射
     """
     try:
-        with driver.session() as session:
-            # 获取所有节点标签
-            node_types_query = """
-            CALL db.labels()
-            YIELD label
-            RETURN collect(label) as labels
-            """
-            node_result = session.run(node_types_query)
-            node_labels = []
-            for record in node_result:
-                labels = record.get("labels", [])
-                if labels:
-                    node_labels = labels
-                    break
-            
-            # 如果没有获取到,尝试另一种方法
-            if not node_labels:
-                alt_query = """
-                MATCH (n)
-                RETURN DISTINCT labels(n) as labels
-                LIMIT 100
-                """
-                alt_result = session.run(alt_query)
-                all_labels = set()
-                for record in alt_result:
-                    labels = record.get("labels", [])
-                    all_labels.update(labels)
-                node_labels = list(all_labels)
-            
-            # 获取所有关系类型
-            edge_types_query = """
-            CALL db.relationshipTypes()
-            YIELD relationshipType
-            RETURN collect(relationshipType) as types
-            """
-            edge_result = session.run(edge_types_query)
-            edge_types = []
-            for record in edge_result:
-                types = record.get("types", [])
-                if types:
-                    edge_types = types
-                    break
-            
-            # 如果没有获取到,尝试另一种方法
-            if not edge_types:
-                alt_edge_query = """
-                MATCH ()-[r]->()
-                RETURN DISTINCT type(r) as relType
-                LIMIT 100
-                """
-                alt_edge_result = session.run(alt_edge_query)
-                all_edge_types = set()
-                for record in alt_edge_result:
-                    rel_type = record.get("relType")
-                    if rel_type:
-                        all_edge_types.add(rel_type)
-                edge_types = list(all_edge_types)
-            
-            return jsonify({
-                "code": 200,
-                "node_types": node_labels,
-                "edge_types": edge_types
-            })
+        node_labels, edge_types = get_graph_repository().node_types()
+        return jsonify({
+            "code": 200,
+            "node_types": node_labels,
+            "edge_types": edge_types
+        })
     except Exception as e:
         return jsonify({
             "code": 500,
@@ -257,94 +853,22 @@ def get_node_types():
 @bp.route("/graph/update_node/<node_id>", methods=["PUT"])
 def update_node(node_id):
     """
-    更新Neo4j中的节点
-    支持更新节点的属性、标签等
+    更新图中的节点
+    支持更新节点的属性、标签等（id / x / y 属性保留不改）
     """
     try:
         data = request.json or {}
-        
-        with driver.session() as session:
-            # 构建更新查询
-            # 首先找到节点
-            find_query = """
-            MATCH (n)
-            WHERE n.id = $node_id OR toString(id(n)) = $node_id
-            RETURN n, labels(n) as labels
-            LIMIT 1
-            """
-            result = session.run(find_query, {"node_id": str(node_id)})
-            record = result.single()
-            
-            if not record:
-                return jsonify({
-                    "code": 404,
-                    "message": "节点不存在"
-                }), 404
-            
-            node = record["n"]
-            current_labels = record["labels"]
-            
-            # 更新属性
-            if "properties" in data:
-                properties = data["properties"]
-                set_props = []
-                params = {"node_id": node_id}
-                
-                for key, value in properties.items():
-                    if key not in ["id", "x", "y"]:  # 保留这些特殊属性
-                        param_key = f"prop_{key}"
-                        set_props.append(f"n.{key} = ${param_key}")
-                        params[param_key] = value
-                
-                if set_props:
-                    update_query = f"""
-                    MATCH (n)
-                    WHERE n.id = $node_id OR toString(id(n)) = $node_id
-                    SET {', '.join(set_props)}
-                    RETURN n
-                    """
-                    params["node_id"] = str(node_id)
-                    session.run(update_query, params)
-            
-            # 更新标签（如果提供了新标签）
-            if "type" in data:
-                new_label = data["type"]
-                if new_label and new_label not in current_labels:
-                    # 移除所有旧标签
-                    for old_label in current_labels:
-                        # 使用字符串格式化来动态设置标签
-                        remove_old = f"""
-                        MATCH (n)
-                        WHERE n.id = $node_id OR toString(id(n)) = $node_id
-                        REMOVE n:`{old_label}`
-                        RETURN n
-                        """
-                        session.run(remove_old, {"node_id": str(node_id)})
-                    
-                    # 添加新标签
-                    add_new = f"""
-                    MATCH (n)
-                    WHERE n.id = $node_id OR toString(id(n)) = $node_id
-                    SET n:`{new_label}`
-                    RETURN n
-                    """
-                    session.run(add_new, {"node_id": str(node_id)})
-            
-            # 更新label（显示名称）
-            if "label" in data or "name" in data:
-                name = data.get("label") or data.get("name")
-                update_name_query = """
-                MATCH (n)
-                WHERE n.id = $node_id OR toString(id(n)) = $node_id
-                SET n.name = $name
-                RETURN n
-                """
-                session.run(update_name_query, {"node_id": str(node_id), "name": name})
-            
+
+        if not get_graph_repository().update_node(node_id, data):
             return jsonify({
-                "code": 200,
-                "message": "节点更新成功"
-            })
+                "code": 404,
+                "message": "节点不存在"
+            }), 404
+
+        return jsonify({
+            "code": 200,
+            "message": "节点更新成功"
+        })
     except Exception as e:
         return jsonify({
             "code": 500,
@@ -352,40 +876,154 @@ def update_node(node_id):
         }), 500
 
 
+# 批量更新单次请求的最大节点数
+MAX_BATCH_NODES = 1000
+
+def _apply_node_batch(tx, items):
+    """
+    在同一个写事务中批量应用节点修改，返回每项的处理结果
+    - 节点 ID 经 node_resolver 解析为 elementId（命中缓存时只在同一事务中按 elementId 复核一次）
+    - 属性与名称合并为一次 UNWIND ... SET n += props
+    - 标签按（旧标签 / 新标签）分组，每组一次 UNWIND
+    """
+    results = [{"id": item["id"], "status": "updated"} for item in items]
+
+    element_ids = _resolve_node_ids(tx, [item["id"] for item in items])
+    resolved = {}
+    for record in tx.run("""
+    UNWIND $rows AS row
+    MATCH (n) WHERE elementId(n) = row.eid
+    RETURN row.node_id AS node_id, id(n) AS iid, labels(n) AS labels
+    """, {"rows": [{"node_id": k, "eid": v} for k, v in element_ids.items()]}):
+        resolved[record["node_id"]] = (record["iid"], record["labels"])
+
+    prop_rows = []
+    label_removals = {}
+    label_additions = {}
+    relabeled = []
+
+    for item, result in zip(items, results):
+        if item["id"] not in resolved:
+            result.update(status="not_found", message="节点不存在")
+            continue
+        iid, current_labels = resolved[item["id"]]
+
+        props = {
+            key: value for key, value in (item.get("properties") or {}).items()
+            if key not in PROTECTED_PROPERTIES
+        }
+        name = item.get("label") or item.get("name")
+        if name:
+            props["name"] = name
+        if props:
+            prop_rows.append({"iid": iid, "props": props})
+
+        new_label = item.get("type")
+        if new_label and new_label not in current_labels:
+            for old_label in current_labels:
+                label_removals.setdefault(old_label, []).append(iid)
+            label_additions.setdefault(new_label, []).append(iid)
+            relabeled.append(iid)
+
+    if prop_rows:
+        tx.run("""
+        UNWIND $rows AS row
+        MATCH (n) WHERE id(n) = row.iid
+        SET n += row.props
+        """, {"rows": prop_rows})
+
+    for label, iids in label_removals.items():
+        tx.run(f"""
+        UNWIND $iids AS iid
+        MATCH (n) WHERE id(n) = iid
+        REMOVE n:{quote_label(label)}
+        """, {"iids": iids})
+
+    for label, iids in label_additions.items():
+        tx.run(f"""
+        UNWIND $iids AS iid
+        MATCH (n) WHERE id(n) = iid
+        SET n:{quote_label(label)}
+        """, {"iids": iids})
+
+    return results, relabeled
+
+
+@bp.route("/graph/nodes/batch", methods=["PUT"])
+@_neo4j_only
+def update_nodes_batch():
+    """
+    批量更新节点（图编辑器批量改类型 / 属性）
+    请求体：{"nodes": [{"id": ..., "properties": {...}, "type": "...", "label": "..."}, ...]}
+    每项字段含义与 update_node 相同；所有修改在同一个写事务中提交，任一语句失败则全部回滚
+    返回每个节点的处理结果（updated / not_found / invalid）
+    """
+    data = request.json or {}
+    raw_items = data.get("nodes") or []
+
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({
+            "code": 400,
+            "message": "nodes 不能为空"
+        }), 400
+    if len(raw_items) > MAX_BATCH_NODES:
+        return jsonify({
+            "code": 400,
+            "message": f"单次最多更新 {MAX_BATCH_NODES} 个节点"
+        }), 400
+
+    # 结果按请求顺序返回，无效项不进入事务
+    results = [None] * len(raw_items)
+    items, positions = [], []
+    for pos, raw in enumerate(raw_items):
+        if not isinstance(raw, dict) or raw.get("id") in (None, ""):
+            results[pos] = {"id": raw.get("id") if isinstance(raw, dict) else None,
+                            "status": "invalid", "message": "缺少节点 ID"}
+            continue
+        items.append(dict(raw, id=str(raw["id"])))
+        positions.append(pos)
+
+    try:
+        relabeled = []
+        if items:
+            with driver.session() as session:
+                item_results, relabeled = session.execute_write(_apply_node_batch, items)
+            for pos, result in zip(positions, item_results):
+                results[pos] = result
+            graph_version.bump(driver)
+
+        if relabeled:
+            relayout_in_background(driver, relabeled)
+
+        return jsonify({
+            "code": 200,
+            "message": "批量更新完成",
+            "updated": sum(1 for r in results if r["status"] == "updated"),
+            "results": results
+        })
+    except Exception as e:
+        return jsonify({
+            "code": 500,
+            "message": f"批量更新失败，所有修改已回滚: {str(e)}"
+        }), 500
+
+
 @bp.route("/graph/delete_node/<node_id>", methods=["DELETE"])
 def delete_node(node_id):
     """
-    删除Neo4j中的节点及其所有关系
+    删除图中的节点及其所有关系
     """
     try:
-        with driver.session() as session:
-            # 先检查节点是否存在
-            check_query = """
-            MATCH (n)
-            WHERE n.id = $node_id OR toString(id(n)) = $node_id
-            RETURN n
-            LIMIT 1
-            """
-            result = session.run(check_query, {"node_id": str(node_id)})
-            if not result.single():
-                return jsonify({
-                    "code": 404,
-                    "message": "节点不存在"
-                }), 404
-            
-            # 删除节点及其所有关系
-            delete_query = """
-            MATCH (n)
-            WHERE n.id = $node_id OR toString(id(n)) = $node_id
-            DETACH DELETE n
-            RETURN count(n) as deleted
-            """
-            result = session.run(delete_query, {"node_id": str(node_id)})
-            
+        if not get_graph_repository().delete_node(node_id):
             return jsonify({
-                "code": 200,
-                "message": "节点删除成功"
-            })
+                "code": 404,
+                "message": "节点不存在"
+            }), 404
+
+        return jsonify({
+            "code": 200,
+            "message": "节点删除成功"
+        })
     except Exception as e:
         return jsonify({
             "code": 500,
@@ -393,7 +1031,101 @@ def delete_node(node_id):
         }), 500
 
 
+# 批量删除单次请求的最大 ID 数
+MAX_BULK_DELETE_IDS = 10000
+
+
+@bp.route("/graph/nodes/bulk_delete", methods=["POST"])
+@_neo4j_only
+def bulk_delete_nodes():
+    """
+    后台批量删除节点及其关系
+    请求体：{"ids": [...]} 或 {"label": "Technique"}（二选一）
+    关系与节点分批在小事务中删除，接口立即返回任务 ID，通过 /graph/jobs/<job_id> 查看进度
+    """
+    data = request.json or {}
+    ids = data.get("ids") or []
+    label = data.get("label")
+
+    if bool(ids) == bool(label):
+        return jsonify({
+            "code": 400,
+            "message": "ids 与 label 必须且只能提供一个"
+        }), 400
+    if not isinstance(ids, list) or len(ids) > MAX_BULK_DELETE_IDS:
+        return jsonify({
+            "code": 400,
+            "message": f"ids 必须是列表，且单次最多 {MAX_BULK_DELETE_IDS} 个"
+        }), 400
+    if label == META_LABEL:
+        return jsonify({
+            "code": 400,
+            "message": "不能删除元数据节点"
+        }), 400
+
+    def run(job):
+        job.update(phase="resolving")
+        with driver.session() as session:
+            if label:
+                element_ids = collect_label_element_ids(session, label)
+                missing = []
+            else:
+                resolved = _resolve_node_ids(session, ids)
+                element_ids = list(resolved.values())
+                missing = [str(node_id) for node_id in ids if str(node_id) not in resolved]
+        job.update(phase="deleting", total_nodes=len(element_ids), not_found=missing,
+                   deleted_nodes=0, deleted_relationships=0)
+
+        def on_progress(deleted_nodes, deleted_relationships):
+            job.update(deleted_nodes=deleted_nodes, deleted_relationships=deleted_relationships)
+
+        try:
+            chunked_delete(driver, element_ids, on_progress)
+        finally:
+            # 部分完成也已修改图数据
+            node_resolver.forget([str(node_id) for node_id in ids] + element_ids)
+            graph_version.bump(driver)
+        job.update(phase="done")
+
+    job = job_registry.submit("bulk_delete", run, {"ids": len(ids), "label": label})
+    return jsonify({
+        "code": 202,
+        "message": "批量删除任务已创建",
+        "job_id": job.id
+    }), 202
+
+
+@bp.route("/graph/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """查询后台任务的状态与进度（管理员任务见 /admin/jobs/<job_id>）"""
+    job = job_registry.get(job_id)
+    if not job or job.admin_only:
+        return jsonify({
+            "code": 404,
+            "message": "任务不存在"
+        }), 404
+    return jsonify({
+        "code": 200,
+        "job": job.to_dict()
+    })
+
+
+@bp.route("/graph/layout", methods=["POST"])
+@_neo4j_only
+def recompute_layout():
+    """
+    重新计算整张图的布局（管理员功能，导入数据后调用）
+    布局在后台执行，坐标写回节点的 x / y 属性
+    """
+    relayout_in_background(driver)
+    return jsonify({
+        "code": 202,
+        "message": "布局计算已开始"
+    }), 202
+
+
 @bp.route("/graph/property_config", methods=["GET"])
+@conditional_get("property_config", _current_config_version)
 def get_property_config():
     """
     获取属性显示配置
@@ -402,73 +1134,8 @@ def get_property_config():
     # 从查询参数获取数据源类型，默认为 'default'
     data_source = request.args.get("data_source", "default")
     
-    # 预定义的属性配置
-    # 可以根据不同的数据源返回不同的配置
-    configs = {
-        "default": {
-            "groups": [
-                {
-                    "name": "基本信息",
-                    "order": 1,
-                    "properties": ["name", "label", "id", "type", "description"]
-                },
-                {
-                    "name": "扩展信息",
-                    "order": 2,
-                    "properties": []  # 空数组表示显示所有其他属性
-                }
-            ],
-            "property_labels": {
-                "name": "名称",
-                "label": "标签",
-                "id": "ID",
-                "type": "类型",
-                "description": "描述"
-            },
-            "hidden_properties": ["x", "y"],  # 隐藏的属性
-            "property_order": []  # 空数组表示使用默认顺序
-        },
-        "attack": {
-            "groups": [
-                {
-                    "name": "基本信息",
-                    "order": 1,
-                    "properties": ["name", "external_id", "type", "description"]
-                },
-                {
-                    "name": "其他信息",
-                    "order": 3,
-                    "properties": ["platform", "detection", "created", "modified", "version"]
-                },
-                {
-                    "name": "扩展属性",
-                    "order": 4,
-                    "properties": []
-                }
-            ],
-            "property_labels": {
-                "name": "名称",
-                "external_id": "外部ID",
-                "type": "类型",
-                "description": "描述",
-                "x_mitre_platforms": "MITRE平台",
-                "x_mitre_permissions_required": "所需权限",
-                "x_mitre_data_sources": "数据源",
-                "x_mitre_defense_bypassed": "绕过防御",
-                "kill_chain_phases": "杀伤链阶段",
-                "platform": "平台",
-                "detection": "检测",
-                "created": "创建时间",
-                "modified": "修改时间",
-                "version": "版本"
-            },
-            "hidden_properties": ["x", "y", "id"],
-            "property_order": []
-        }
-    }
-    
     # 返回对应数据源的配置，如果没有则返回默认配置
-    config = configs.get(data_source, configs["default"])
+    config = PROPERTY_CONFIGS.get(data_source, PROPERTY_CONFIGS["default"])
     
     return jsonify({
         "code": 200,
@@ -484,12 +1151,16 @@ def save_property_config():
     允许管理员自定义不同数据源的属性显示配置
     """
     try:
+        global _property_config_version
         data = request.json or {}
         data_source = data.get("data_source", "default")
         config = data.get("config", {})
         
         # 这里可以将配置保存到数据库或配置文件
         # 目前先返回成功，实际项目中可以保存到数据库
+
+        # 配置变化后使前端缓存的 property_config 失效
+        _property_config_version += 1
         
         return jsonify({
             "code": 200,
@@ -517,52 +517,36 @@ def generate_path():
         difficulty = data.get("difficulty", "beginner")
         max_nodes = data.get("max_nodes", 10)
         
-        # 从Neo4j获取知识图谱数据
-        from neo4j_client import driver
-        
-        # 构建查询：找到目标知识点及其前置依赖
-        cypher = """
-        MATCH (n)
-        WHERE n.id IN $target_ids
-        OPTIONAL MATCH (n)<-[:PREREQUISITE|DEPENDS_ON*]-(prereq)
-        RETURN DISTINCT n, collect(DISTINCT prereq) as prerequisites
-        LIMIT $limit
-        """
+        # 从图存储获取目标知识点及其前置依赖（Neo4j 或内存图，见 utils/graph_repository.py）
+        from utils.graph_repository import get_graph_repository
         
         target_ids = [str(tid) for tid in target_knowledge]
         
         nodes_map = {}
         edges_list = []
         
-        with driver.session() as session:
-            result = session.run(cypher, target_ids=target_ids, limit=max_nodes * 2)
+        for n, prereqs in get_graph_repository().prerequisites(target_ids, max_nodes * 2):
+            node_id = str(n.get("id") or n.id)
+            nodes_map[node_id] = {
+                "id": node_id,
+                "label": n.get("name", ""),
+                "type": list(n.labels)[0] if n.labels else "Node",
+                "properties": dict(n)
+            }
             
-            for record in result:
-                n = record["n"]
-                if n:
-                    node_id = str(n.get("id") or n.id)
-                    nodes_map[node_id] = {
-                        "id": node_id,
-                        "label": n.get("name", ""),
-                        "type": list(n.labels)[0] if n.labels else "Node",
-                        "properties": dict(n)
-                    }
-                
-                prereqs = record["prerequisites"]
-                for prereq in prereqs:
-                    if prereq:
-                        prereq_id = str(prereq.get("id") or prereq.id)
-                        nodes_map[prereq_id] = {
-                            "id": prereq_id,
-                            "label": prereq.get("name", ""),
-                            "type": list(prereq.labels)[0] if prereq.labels else "Node",
-                            "properties": dict(prereq)
-                        }
-                        edges_list.append({
-                            "source": prereq_id,
-                            "target": node_id,
-                            "type": "PREREQUISITE"
-                        })
+            for prereq in prereqs:
+                prereq_id = str(prereq.get("id") or prereq.id)
+                nodes_map[prereq_id] = {
+                    "id": prereq_id,
+                    "label": prereq.get("name", ""),
+                    "type": list(prereq.labels)[0] if prereq.labels else "Node",
+                    "properties": dict(prereq)
+                }
+                edges_list.append({
+                    "source": prereq_id,
+                    "target": node_id,
+                    "type": "PREREQUISITE"
+                })
         
         # 使用拓扑排序生成学习顺序
         def topological_sort(nodes, edges):
@@ -0,0 +1,40 @@
+"""
+Neo4j → MySQL 知识库同步（命令行，可放入导入脚本之后或定时任务中执行）
+同步逻辑见 utils/knowledge_sync.py；管理员也可以通过 POST /api/admin/knowledge/sync 在后台执行
+
+用法（在 backend 目录下）：
+    python sync_knowledge.py                 # 从上次的高水位增量同步
+    python sync_knowledge.py --full          # 全量同步（之后导入了其他领域、或在图上做过编辑时）
+    python sync_knowledge.py --status        # 只查看同步进度
+"""
+import argparse
+import json
+import sys
+
+from app import app
+from neo4j_client import driver
+from utils.knowledge_sync import DEFAULT_PAGE_SIZE, KnowledgeSync, sync_state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="同步 Neo4j 节点 / 关系到 MySQL 知识库")
+    parser.add_argument("--full", action="store_true", help="忽略高水位，全量同步")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="每页读取 / 写入的行数")
+    parser.add_argument("--status", action="store_true", help="只输出同步进度，不执行同步")
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        if args.status:
+            print(json.dumps(sync_state(), ensure_ascii=False, indent=2))
+            return 0
+
+        def progress(**values):
+            print("  " + ", ".join(f"{k}={v}" for k, v in values.items()))
+
+        stats = KnowledgeSync(driver, page_size=args.page_size, progress=progress).run(full=args.full)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
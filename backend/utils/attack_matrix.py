@@ -0,0 +1,170 @@
+"""
+ATT&CK 矩阵（战术为列、技术为行）
+- 由导入脚本写入的 HAS_TACTIC（矩阵 → 战术，带 order）、BELONGS_TO（技术 → 战术）与
+  SUB_TECHNIQUE_OF（子技术 → 父技术）推出，不在前端由边列表拼装
+- 每个图版本只读取一次（见 GraphRepository.matrix_source），整理为按领域分列、列内按名称排序的紧凑结构；
+  按平台过滤只是在该结构上做筛选，序列化后的响应再按（领域, 平台）由快照缓存保存
+- 已撤销 / 弃用的战术与技术不出现在矩阵中
+
+响应中的技术行是数组，字段顺序见 MATRIX_FIELDS：
+  tactics[i].techniques[j] = [id, external_id, name, 子技术数量]
+"""
+import threading
+import time
+
+MATRIX_FIELDS = ["id", "external_id", "name", "subtechniques"]
+
+
+def _active(item):
+    return not (item.get("deprecated") or item.get("revoked"))
+
+
+def _platforms(item):
+    return {str(p).lower() for p in item.get("platform") or ()}
+
+
+class AttackMatrix:
+    """某个图版本的矩阵：{领域: [(战术, [技术行])]}，技术行附带平台与子技术的平台"""
+
+    def __init__(self, version, matrices, tactics, techniques):
+        """
+        matrices：[{id, domains, tactics: [按 order 排列的战术 id]}]
+        tactics：[{id, external_id, name, shortname, domains, deprecated, revoked}]
+        techniques：[{id, external_id, name, platform, domains, deprecated, revoked, tactics: [战术 id], parent}]
+        """
+        self.version = version
+        tactics = {t["id"]: t for t in tactics if _active(t)}
+        techniques = [t for t in techniques if _active(t)]
+
+        # 父技术 → 子技术的平台集合
+        children = {}
+        for tech in techniques:
+            if tech.get("parent"):
+                children.setdefault(tech["parent"], []).append(_platforms(tech))
+
+        self._columns = {}
+        self._platforms = {}
+        domains = {d for item in list(tactics.values()) + techniques for d in item.get("domains") or ()}
+        for domain in sorted(domains):
+            order = self._tactic_order(domain, matrices, tactics)
+            rows = {tactic_id: [] for tactic_id in order}
+            platforms = set()
+            for tech in techniques:
+                if domain not in (tech.get("domains") or ()):
+                    continue
+                platforms.update(tech.get("platform") or ())
+                if tech.get("parent"):
+                    continue
+                row = (tech["id"], tech.get("external_id", ""), tech.get("name", ""),
+                       _platforms(tech), children.get(tech["id"], []))
+                for tactic_id in tech.get("tactics") or ():
+                    if tactic_id in rows:
+                        rows[tactic_id].append(row)
+            self._columns[domain] = [
+                (tactics[tactic_id], sorted(rows[tactic_id], key=lambda r: (r[2].lower(), r[1])))
+                for tactic_id in order
+            ]
+            self._platforms[domain] = sorted(platforms)
+
+    @staticmethod
+    def _tactic_order(domain, matrices, tactics):
+        """
+        领域内战术的列顺序：该领域矩阵 tactic_refs 的顺序（即杀伤链顺序）；
+        没有矩阵对象的数据（如合成数据）退回按外部 ID 排序
+        """
+        order = []
+        for matrix in sorted(matrices, key=lambda m: m["id"]):
+            if domain in (matrix.get("domains") or ()):
+                order.extend(t for t in matrix["tactics"] if t in tactics and t not in order)
+        if order:
+            return order
+        in_domain = [t for t in tactics.values() if domain in (t.get("domains") or ())]
+        return [t["id"] for t in sorted(in_domain, key=lambda t: (t.get("external_id") or "", t["id"]))]
+
+    @property
+    def domains(self):
+        return sorted(self._columns)
+
+    def platforms(self, domain):
+        return self._platforms.get(domain, [])
+
+    def build(self, domain, platform=None):
+        """领域内（可按平台过滤）的矩阵，领域不存在时返回 None"""
+        if domain not in self._columns:
+            return None
+        wanted = platform.lower() if platform else None
+        columns = []
+        parents, subtechniques = set(), 0
+        for tactic, rows in self._columns[domain]:
+            cells = []
+            for tech_id, external_id, name, platforms, children in rows:
+                if wanted and wanted not in platforms:
+                    continue
+                count = sum(1 for p in children if not wanted or wanted in p)
+                cells.append([tech_id, external_id, name, count])
+                if tech_id not in parents:
+                    parents.add(tech_id)
+                    subtechniques += count
+            columns.append({
+                "id": tactic["id"],
+                "external_id": tactic.get("external_id", ""),
+                "name": tactic.get("name", ""),
+                "shortname": tactic.get("shortname", ""),
+                "techniques": cells
+            })
+        return {
+            "domain": domain,
+            "platform": platform,
+            "platforms": self.platforms(domain),
+            "fields": MATRIX_FIELDS,
+            "tactics": columns,
+            "technique_count": len(parents),
+            "subtechnique_count": subtechniques
+        }
+
+
+class AttackMatrixCache:
+    """持有当前版本的矩阵；版本变化后首次访问时重建，并发访问只重建一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._build_ms = 0.0
+        self._builds = 0
+
+    def get(self, repository, version):
+        with self._lock:
+            if self._matrix is not None and self._matrix.version == version:
+                return self._matrix
+
+            started = time.perf_counter()
+            self._matrix = AttackMatrix(version, *repository.matrix_source())
+            self._build_ms = (time.perf_counter() - started) * 1000
+            self._builds += 1
+            return self._matrix
+
+    def clear(self):
+        with self._lock:
+            self._matrix = None
+
+    def warm_up(self, repository):
+        """后台预先构建矩阵（应用启动时调用），首个矩阵请求无需等待"""
+        def run():
+            try:
+                self.get(repository, repository.version())
+            except Exception as e:
+                print(f"ATT&CK 矩阵预构建失败: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._matrix.version if self._matrix else None,
+                "domains": self._matrix.domains if self._matrix else [],
+                "builds": self._builds,
+                "build_ms_last": round(self._build_ms, 2)
+            }
+
+
+attack_matrix = AttackMatrixCache()
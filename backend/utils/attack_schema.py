@@ -0,0 +1,263 @@
+"""
+ATT&CK（STIX 2.x）对象与图谱节点标签的对应关系
+后端与 KG_data 导入脚本共用，保证两边的标签一致
+"""
+import os
+import re
+
+# STIX 对象类型 → 节点标签
+STIX_TYPE_LABELS = {
+    "attack-pattern": "Technique",
+    "x-mitre-tactic": "Tactic",
+    "course-of-action": "Mitigation",
+    "intrusion-set": "Group",
+    "malware": "Software",
+    "tool": "Software",
+    "x-mitre-data-source": "DataSource",
+    "x-mitre-data-component": "DataComponent",
+    "campaign": "Campaign",
+    "x-mitre-asset": "Asset",
+    "x-mitre-matrix": "Matrix",
+}
+
+# STIX relationship_type → 关系类型，未列出的类型按 relationship_label 规则转换
+RELATIONSHIP_TYPES = {
+    "uses": "USES",
+    "mitigates": "MITIGATES",
+    "subtechnique-of": "SUB_TECHNIQUE_OF",
+    "detects": "DETECTS",
+    "attributed-to": "ATTRIBUTED_TO",
+    "revoked-by": "REVOKED_BY",
+    "targets": "TARGETS",
+}
+
+# ATT&CK 领域：每个 bundle 属于一个领域，同一对象出现在多个 bundle 中时合并为一个节点，domains 属性记录全部领域
+DEFAULT_DOMAIN = "enterprise-attack"
+DOMAINS = ("enterprise-attack", "mobile-attack", "ics-attack")
+_DOMAIN_PATTERN = re.compile(r"(enterprise|mobile|ics)-attack")
+
+# 技术 kill_chain_phases 中的杀伤链名称 → 领域
+KILL_CHAIN_DOMAINS = {
+    "mitre-attack": "enterprise-attack",
+    "mitre-mobile-attack": "mobile-attack",
+    "mitre-ics-attack": "ics-attack",
+}
+
+# 由对象自身的引用字段推出的关系（非 relationship 对象）
+MATRIX_TACTIC_REL = "HAS_TACTIC"
+DATA_COMPONENT_REL = "COMPONENT_OF"
+# 由导入脚本推出（而非 relationship 对象）的关系，对象更新时整体重建
+DERIVED_RELATIONSHIP_TYPES = ("BELONGS_TO", MATRIX_TACTIC_REL, DATA_COMPONENT_REL)
+
+# 按对象类型存在才写入的 STIX 字段 → 节点属性
+OPTIONAL_PROPERTIES = {
+    "x_mitre_platforms": "platform",
+    "x_mitre_detection": "detection",
+    "x_mitre_version": "version",
+    "x_mitre_is_subtechnique": "is_subtechnique",
+    "x_mitre_permissions_required": "x_mitre_permissions_required",
+    "x_mitre_data_sources": "x_mitre_data_sources",
+    "x_mitre_defense_bypassed": "x_mitre_defense_bypassed",
+    "aliases": "aliases",
+    "x_mitre_aliases": "aliases",
+    "revoked": "revoked",
+    "x_mitre_deprecated": "deprecated",
+}
+
+# 可选属性在节点上的名称；对象更新时缺失的可选属性需要从节点上移除
+OPTIONAL_PROPERTY_NAMES = sorted(set(OPTIONAL_PROPERTIES.values()) | {"kill_chain_phases"})
+
+# stix_to_properties 产出的节点属性（基础属性 + 可选属性 + 战术 shortname）
+NODE_PROPERTY_NAMES = (
+    ["id", "name", "description", "external_id", "url", "created", "modified"]
+    + OPTIONAL_PROPERTY_NAMES + ["shortname", "domains"]
+)
+
+# 非字符串属性的类型（离线批量导入的 CSV 表头需要），未列出的均为字符串
+PROPERTY_TYPES = {
+    "platform": "string[]",
+    "aliases": "string[]",
+    "kill_chain_phases": "string[]",
+    "domains": "string[]",
+    "x_mitre_permissions_required": "string[]",
+    "x_mitre_data_sources": "string[]",
+    "x_mitre_defense_bypassed": "string[]",
+    "is_subtechnique": "boolean",
+    "revoked": "boolean",
+    "deprecated": "boolean",
+    "order": "int",
+}
+
+# 以业务 id 唯一标识的节点标签（建立唯一约束，按 id 查找可走索引）
+ID_LABELS = sorted(set(STIX_TYPE_LABELS.values()))
+
+
+def stix_type(stix_id):
+    """STIX id 形如 attack-pattern--<uuid>，返回其中的类型部分"""
+    if not stix_id or "--" not in str(stix_id):
+        return None
+    return str(stix_id).split("--", 1)[0]
+
+
+def label_for_stix_id(stix_id):
+    """由 STIX id 推断节点标签，无法推断时返回 None"""
+    return STIX_TYPE_LABELS.get(stix_type(stix_id))
+
+
+def quote_label(label):
+    """标签无法参数化，拼接进 Cypher 前转义反引号"""
+    return "`" + str(label).replace("`", "``") + "`"
+
+
+def stix_to_properties(obj):
+    """
+    STIX 对象 → 节点属性，导入脚本与内存图后端共用同一映射
+    外部 ID / URL 取第一条 external_references
+    值为空列表的可选属性与缺失同样处理（不写入）：离线 CSV 导入无法表示空数组，两种导入方式得到相同的节点
+    """
+    external_refs = obj.get("external_references") or []
+    first_ref = external_refs[0] if external_refs else {}
+    properties = {
+        "id": obj["id"],
+        "name": obj.get("name", ""),
+        "description": obj.get("description", ""),
+        "external_id": first_ref.get("external_id", ""),
+        "url": first_ref.get("url", ""),
+        "created": obj.get("created", ""),
+        "modified": obj.get("modified", "")
+    }
+    for key, name in OPTIONAL_PROPERTIES.items():
+        if obj.get(key) is not None and obj[key] != []:
+            properties[name] = obj[key]
+    # Neo4j 属性不支持嵌套结构，杀伤链阶段只保留 phase_name 列表
+    phases = technique_phases(obj)
+    if phases:
+        properties["kill_chain_phases"] = phases
+    if obj.get("type") == "x-mitre-tactic":
+        properties["shortname"] = obj.get("x_mitre_shortname", "")
+    return properties
+
+
+def is_tombstoned(obj):
+    """已撤销（revoked）或已弃用（x_mitre_deprecated）的对象"""
+    return bool(obj.get("revoked") or obj.get("x_mitre_deprecated"))
+
+
+def relationship_label(relationship_type):
+    """STIX relationship_type → 关系类型（大写、下划线分隔）"""
+    return RELATIONSHIP_TYPES.get(relationship_type) or re.sub(r"[^0-9A-Za-z]+", "_", relationship_type).upper()
+
+
+def _relation(rel_id, rel_type, source, target, **properties):
+    return {
+        "id": rel_id,
+        "type": rel_type,
+        "source": source,
+        "target": target,
+        "source_label": label_for_stix_id(source),
+        "target_label": label_for_stix_id(target),
+        "props": dict(properties, id=rel_id),
+    }
+
+
+def object_relations(obj):
+    """
+    STIX 对象 → 关系行 [{id, type, source, target, source_label, target_label, props}]
+    - relationship 对象：按 relationship_type 映射
+    - 矩阵的 tactic_refs：Matrix -[HAS_TACTIC {order}]-> Tactic
+    - 数据组件的 x_mitre_data_source_ref：DataComponent -[COMPONENT_OF]-> DataSource
+    已撤销 / 弃用的 relationship 对象及端点无法映射到节点标签的关系被忽略；导入脚本与内存图后端共用
+    """
+    relations = []
+    obj_type = obj.get("type")
+    if obj_type == "relationship" and is_tombstoned(obj):
+        return relations
+    if obj_type == "relationship":
+        if obj.get("relationship_type") and obj.get("source_ref") and obj.get("target_ref"):
+            relations.append(_relation(
+                obj["id"], relationship_label(obj["relationship_type"]), obj["source_ref"], obj["target_ref"],
+                description=obj.get("description", ""),
+                created=obj.get("created", ""),
+                modified=obj.get("modified", "")
+            ))
+    elif obj_type == "x-mitre-matrix":
+        for order, tactic_ref in enumerate(obj.get("tactic_refs") or []):
+            relations.append(_relation(
+                f"{obj['id']}|{tactic_ref}", MATRIX_TACTIC_REL, obj["id"], tactic_ref, order=order
+            ))
+    elif obj_type == "x-mitre-data-component" and obj.get("x_mitre_data_source_ref"):
+        relations.append(_relation(
+            f"{obj['id']}|{obj['x_mitre_data_source_ref']}", DATA_COMPONENT_REL,
+            obj["id"], obj["x_mitre_data_source_ref"]
+        ))
+    return [r for r in relations if r["source_label"] and r["target_label"]]
+
+
+def tactic_technique_relations(techniques, tactics, tactic_domains):
+    """
+    由技术的 kill_chain_phases 推出技术 → 战术（BELONGS_TO）关系，返回 [{tech_id, tactic_id}]
+    不同领域的战术 shortname 可能相同（如 initial-access），按（领域, shortname）匹配；
+    tactic_domains 为 {战术 id: 所属领域}
+    """
+    tactic_map = {}
+    for tactic in tactics:
+        shortname = tactic.get("x_mitre_shortname")
+        if shortname:
+            for domain in tactic_domains.get(tactic["id"], ()):
+                tactic_map[(domain, shortname)] = tactic["id"]
+
+    relations = []
+    for tech in techniques:
+        for ref in technique_tactic_refs(tech):
+            if ref in tactic_map:
+                relations.append({
+                    "tech_id": tech["id"],
+                    "tactic_id": tactic_map[ref]
+                })
+    return relations
+
+
+def technique_tactic_refs(technique):
+    """技术所属战术的（领域, shortname）列表，领域由 kill_chain_name 决定"""
+    return [
+        (KILL_CHAIN_DOMAINS[phase["kill_chain_name"]], phase["phase_name"])
+        for phase in technique.get("kill_chain_phases", [])
+        if phase.get("kill_chain_name") in KILL_CHAIN_DOMAINS and phase.get("phase_name")
+    ]
+
+
+def technique_phases(technique):
+    """技术所属战术的 shortname（kill_chain_phases 中 ATT&CK 各领域杀伤链的 phase_name）"""
+    return [phase for _, phase in technique_tactic_refs(technique)]
+
+
+def bundle_domain(path):
+    """
+    由 bundle 文件名推断 ATT&CK 领域（enterprise-attack / mobile-attack / ics-attack），
+    无法推断时视为 DEFAULT_DOMAIN；也可以写成 "<领域>=<路径>" 显式指定
+    """
+    match = _DOMAIN_PATTERN.search(os.path.basename(str(path)).lower())
+    return match.group(0) if match else DEFAULT_DOMAIN
+
+
+def parse_bundles(bundles):
+    """单个路径或路径列表 → [(领域, 路径)]，支持 "<领域>=<路径>" 写法"""
+    if isinstance(bundles, (str, os.PathLike)):
+        bundles = [bundles]
+    parsed = []
+    for bundle in bundles:
+        if isinstance(bundle, tuple):
+            parsed.append(bundle)
+            continue
+        domain, sep, path = str(bundle).partition("=")
+        if sep and domain and os.sep not in domain:
+            parsed.append((normalize_domain(domain), path))
+        else:
+            parsed.append((bundle_domain(bundle), str(bundle)))
+    return parsed
+
+
+def normalize_domain(domain):
+    """enterprise / mobile / ics 的简写补全为 STIX 中的领域名"""
+    domain = str(domain).strip().lower()
+    return domain if not domain or domain.endswith("-attack") else f"{domain}-attack"
@@ -0,0 +1,171 @@
+"""
+图数据快照缓存
+- 以（快照名, 参数）为键缓存已序列化的响应体，并记录生成时的图版本号
+- 图版本号变化（导入、编辑）后首次访问时重建，其余请求直接返回缓存，不访问 Neo4j
+- 同一个键的并发重建只执行一次，其他请求等待结果
+- 键含请求参数（fields / labels / limit 等），条目数与总字节数都有上限，超出时按最近最少使用淘汰；
+  写入新版本的快照时一并丢弃旧版本的条目与重建锁，缓存大小不随参数组合与版本数增长
+- 记录命中率与重建耗时，供 /graph/cache_stats 查看
+- conditional_get：基于版本号的强 ETag，未变化的请求直接返回 304
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+
+# 快照缓存的条目数与总字节数上限
+MAX_SNAPSHOT_ENTRIES = 256
+MAX_SNAPSHOT_BYTES = 256 * 1024 * 1024
+
+
+class SnapshotCache:
+    """按图版本号失效的进程内快照缓存（LRU，条目数与总字节数有上限）"""
+
+    def __init__(self, max_entries=MAX_SNAPSHOT_ENTRIES, max_bytes=MAX_SNAPSHOT_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._build_locks = {}
+        self._bytes = 0
+        self._stats = {}
+
+    def _stat(self, name):
+        return self._stats.setdefault(name, {
+            "hits": 0,
+            "misses": 0,
+            "rebuild_ms_total": 0.0,
+            "rebuild_ms_last": 0.0,
+            "size_bytes": 0,
+            "evictions": 0
+        })
+
+    def get_or_build(self, name, version, builder, params=()):
+        """
+        返回 version 版本的快照；不存在或版本过期时调用 builder() 重建
+        builder 返回已序列化的字符串
+        """
+        key = (name, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._stat(name)["hits"] += 1
+                return entry[1]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # 等待期间可能已被其他请求重建
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] == version:
+                    self._stat(name)["hits"] += 1
+                    return entry[1]
+
+            started = time.perf_counter()
+            try:
+                body = builder()
+            except Exception:
+                # 构建失败时不保留该键的重建锁（键含请求参数，失败的请求不应在表中累积）
+                with self._lock:
+                    if key not in self._entries:
+                        self._build_locks.pop(key, None)
+                raise
+            elapsed = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                self._store(key, version, body)
+                stat = self._stat(name)
+                stat["misses"] += 1
+                stat["rebuild_ms_total"] += elapsed
+                stat["rebuild_ms_last"] = elapsed
+                stat["size_bytes"] = len(body)
+            return body
+
+    def _store(self, key, version, body):
+        """写入条目（调用方持有 self._lock）：先丢弃旧版本的条目，再按 LRU 淘汰到上限以内"""
+        for k in [k for k, entry in self._entries.items() if entry[0] != version and k != key]:
+            self._evict(k)
+        old = self._entries.pop(key, None)
+        if old:
+            self._bytes -= len(old[1])
+        self._entries[key] = (version, body)
+        self._bytes += len(body)
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+            self._stat(oldest[0])["evictions"] += 1
+
+    def _evict(self, key):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+        # 正在重建的请求持有锁对象本身，从表中移除不影响它们
+        self._build_locks.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._build_locks.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """各快照的命中次数、命中率、重建耗时与因超出上限被淘汰的条目数"""
+        with self._lock:
+            result = {}
+            for name, stat in self._stats.items():
+                total = stat["hits"] + stat["misses"]
+                result[name] = dict(
+                    stat,
+                    hit_rate=round(stat["hits"] / total, 4) if total else 0.0,
+                    rebuild_ms_avg=round(stat["rebuild_ms_total"] / stat["misses"], 2) if stat["misses"] else 0.0,
+                    rebuild_ms_total=round(stat["rebuild_ms_total"], 2),
+                    rebuild_ms_last=round(stat["rebuild_ms_last"], 2)
+                )
+            return result
+
+
+snapshot_cache = SnapshotCache()
+
+
+def make_etag(name, version, params=()):
+    """由接口名、版本号和请求参数生成强 ETag"""
+    raw = repr((name, version, params)).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def conditional_get(name, get_version):
+    """
+    只读接口的条件 GET 装饰器
+    - get_version() 返回决定响应内容的版本号（图版本号或配置版本号）
+    - 请求的 If-None-Match 命中时直接返回 304，不执行视图函数，也就不访问 Neo4j
+    - 获取版本号失败时退化为普通请求
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                version = get_version()
+            except Exception:
+                return f(*args, **kwargs)
+
+            params = (tuple(sorted(request.args.items(multi=True))), tuple(sorted(kwargs.items())))
+            etag = make_etag(name, version, params)
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                # 流式响应在输出过程中才可能出错，不为其生成 ETag
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+
+            response.set_etag(etag)
+            # 允许浏览器缓存，但每次使用前都要重新验证
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,61 @@
+"""
+分批删除节点
+对 Tactic 这类高连接度节点，单个 DETACH DELETE 会在一个事务里删除成百上千条关系，
+长时间持有锁并占用大量堆内存。这里先按批删除关系，再按批删除节点，每批一个独立的小事务。
+"""
+from utils.attack_schema import quote_label
+
+# 每个事务最多删除的关系数 / 每轮处理的节点数
+RELATIONSHIP_BATCH_SIZE = 1000
+NODE_BATCH_SIZE = 500
+
+
+def collect_label_element_ids(session, label):
+    """按标签收集待删除节点的 elementId"""
+    result = session.run(f"MATCH (n:{quote_label(label)}) RETURN elementId(n) AS eid")
+    return [record["eid"] for record in result]
+
+
+def chunked_delete(driver, element_ids, on_progress=None,
+                   relationship_batch_size=RELATIONSHIP_BATCH_SIZE, node_batch_size=NODE_BATCH_SIZE):
+    """
+    分批删除节点及其关系，返回 (删除的节点数, 删除的关系数)
+    on_progress(deleted_nodes, deleted_relationships) 在每个事务提交后调用
+    """
+    element_ids = list(dict.fromkeys(element_ids))
+    deleted_nodes = 0
+    deleted_relationships = 0
+
+    with driver.session() as session:
+        for start in range(0, len(element_ids), node_batch_size):
+            chunk = element_ids[start:start + node_batch_size]
+
+            # 先分批删关系，直到这批节点上不再有关系
+            while True:
+                record = session.run("""
+                UNWIND $eids AS eid
+                MATCH (n) WHERE elementId(n) = eid
+                MATCH (n)-[r]-()
+                WITH DISTINCT r LIMIT $limit
+                DELETE r
+                RETURN count(r) AS deleted
+                """, {"eids": chunk, "limit": relationship_batch_size}).single()
+                deleted = record["deleted"] if record else 0
+                deleted_relationships += deleted
+                if on_progress:
+                    on_progress(deleted_nodes, deleted_relationships)
+                if deleted < relationship_batch_size:
+                    break
+
+            # DETACH 兜底删除期间新建的关系
+            record = session.run("""
+            UNWIND $eids AS eid
+            MATCH (n) WHERE elementId(n) = eid
+            DETACH DELETE n
+            RETURN count(n) AS deleted
+            """, {"eids": chunk}).single()
+            deleted_nodes += record["deleted"] if record else 0
+            if on_progress:
+                on_progress(deleted_nodes, deleted_relationships)
+
+    return deleted_nodes, deleted_relationships
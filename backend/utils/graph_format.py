@@ -0,0 +1,80 @@
+"""
+图数据的紧凑列式格式（?format=columnar）
+- 节点表按列存储：每个字段 / 属性一个数组，缺失值为 null
+- 边只保存源 / 目标节点在节点表中的下标，不再重复字符串 ID，也不再生成合成边 ID
+- 节点类型、关系类型字符串各自驻留到查找数组中，表中只保存下标
+- 顶层的 display_id / description 等字段均可由 properties 推出，只保留一份
+
+前端还原方式：
+  node[i] = {id: nodes.id[i], label: nodes.label[i], type: node_types[nodes.type[i]],
+             x: nodes.x[i], y: nodes.y[i], properties: {k: nodes.properties[k][i], ...}}
+  edge[j] = {source: node[edges.source[j]].id, target: node[edges.target[j]].id,
+             type: edge_types[edges.type[j]]}
+"""
+
+# 已经作为独立列输出的属性：name → label，id → id，x / y → x / y
+_BASE_PROPERTIES = {"id", "name", "x", "y"}
+
+
+def _intern(table, index, value):
+    """字符串驻留：返回 value 在查找数组中的下标"""
+    if value not in index:
+        index[value] = len(table)
+        table.append(value)
+    return index[value]
+
+
+def to_columnar(nodes, edges):
+    """将 nodes / edges 行式结构转换为列式结构"""
+    node_types, node_type_index = [], {}
+    edge_types, edge_type_index = [], {}
+    node_index = {}
+
+    ids, labels, types, xs, ys = [], [], [], [], []
+    properties = {}
+
+    for i, node in enumerate(nodes):
+        node_index[node["id"]] = i
+        ids.append(node["id"])
+        labels.append(node.get("label"))
+        types.append(_intern(node_types, node_type_index, node.get("type")))
+        xs.append(node.get("x"))
+        ys.append(node.get("y"))
+
+        for key, value in (node.get("properties") or {}).items():
+            if key in _BASE_PROPERTIES:
+                continue
+            column = properties.get(key)
+            if column is None:
+                # 新出现的属性列，为之前的节点补 null
+                column = properties[key] = [None] * i
+            column.append(value)
+
+        # 本节点没有的属性列补 null，保持各列等长
+        for column in properties.values():
+            if len(column) < i + 1:
+                column.append(None)
+
+    sources, targets, edge_type_ids = [], [], []
+    for edge in edges:
+        sources.append(node_index[edge["source"]])
+        targets.append(node_index[edge["target"]])
+        edge_type_ids.append(_intern(edge_types, edge_type_index, edge.get("type")))
+
+    return {
+        "node_types": node_types,
+        "edge_types": edge_types,
+        "nodes": {
+            "id": ids,
+            "label": labels,
+            "type": types,
+            "x": xs,
+            "y": ys,
+            "properties": properties
+        },
+        "edges": {
+            "source": sources,
+            "target": targets,
+            "type": edge_type_ids
+        }
+    }
@@ -0,0 +1,84 @@
+"""
+图数据后台任务
+耗时的图操作（批量删除等）放到后台线程执行，接口立即返回任务 ID，
+前端通过 /graph/jobs/<job_id> 轮询进度；
+管理员功能创建的任务（admin_only，如知识库同步）只能通过需要管理员权限的 /admin/jobs/<job_id> 查询
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# 保留最近的任务记录数
+MAX_JOB_HISTORY = 200
+
+
+class GraphJob:
+    """单个后台任务的状态与进度"""
+
+    def __init__(self, kind, params=None, admin_only=False):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.admin_only = admin_only
+        self.status = "pending"  # pending / running / succeeded / failed
+        self.progress = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, **progress):
+        with self._lock:
+            self.progress.update(progress)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "params": self.params,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at
+            }
+
+
+class JobRegistry:
+    """进程内任务表"""
+
+    def __init__(self, capacity=MAX_JOB_HISTORY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, kind, target, params=None, admin_only=False):
+        """创建任务并在后台线程中执行 target(job)；admin_only 的任务不在公开的任务接口中返回"""
+        job = GraphJob(kind, params, admin_only)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.capacity:
+                self._jobs.popitem(last=False)
+
+        def run():
+            job.status = "running"
+            try:
+                target(job)
+                job.status = "succeeded"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+
+        threading.Thread(target=run, daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+job_registry = JobRegistry()
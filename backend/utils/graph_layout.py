@@ -0,0 +1,223 @@
+"""
+知识图谱服务端布局
+- 战术（Tactic）节点均匀分布在外圈作为锚点，与战术相连的节点在其附近放射状初始化
+- 其余节点使用向量化（NumPy）的 Fruchterman-Reingold 力导向算法迭代
+- 计算结果写回 Neo4j 节点的 x / y 属性，前端直接使用，无需在浏览器中跑布局
+- 坐标属于返回给前端的数据，写回后同样递增图版本号
+"""
+import threading
+
+import numpy as np
+
+from utils.graph_version import META_LABEL, graph_version
+
+ANCHOR_LABEL = "Tactic"
+
+# 斥力按行分块计算，避免 n×n 矩阵一次性占满内存
+BLOCK_SIZE = 1024
+SAVE_BATCH_SIZE = 500
+
+
+def radial_seed(types, edges, scale=60.0, seed=42):
+    """
+    战术锚定的放射状初始位置
+    types: 节点类型列表；edges: (源下标, 目标下标) 数组
+    返回 (positions, anchor_mask)
+    """
+    rng = np.random.default_rng(seed)
+    n = len(types)
+    radius = scale * max(np.sqrt(n), 1.0)
+    pos = rng.normal(scale=radius * 0.3, size=(n, 2))
+
+    anchors = np.array([t == ANCHOR_LABEL for t in types], dtype=bool)
+    anchor_idx = np.flatnonzero(anchors)
+    if len(anchor_idx):
+        angles = np.linspace(0, 2 * np.pi, len(anchor_idx), endpoint=False)
+        pos[anchor_idx] = np.column_stack([np.cos(angles), np.sin(angles)]) * radius
+
+    if len(edges) and len(anchor_idx):
+        # 与战术相连的节点放在所连战术的平均位置附近（多战术节点自然落在战术之间）
+        src, dst = edges[:, 0], edges[:, 1]
+        to_anchor = anchors[dst] & ~anchors[src]
+        from_anchor = anchors[src] & ~anchors[dst]
+        members = np.concatenate([src[to_anchor], dst[from_anchor]])
+        owners = np.concatenate([dst[to_anchor], src[from_anchor]])
+        if len(members):
+            total = np.zeros((n, 2))
+            count = np.zeros(n)
+            np.add.at(total, members, pos[owners])
+            np.add.at(count, members, 1)
+            attached = count > 0
+            jitter = rng.normal(scale=scale, size=(int(attached.sum()), 2))
+            pos[attached] = total[attached] / count[attached, None] * 0.8 + jitter
+
+    return pos, anchors
+
+
+def force_layout(pos, edges, fixed=None, iterations=80, k=None):
+    """
+    向量化的 Fruchterman-Reingold 迭代
+    pos: (n, 2) 初始坐标；fixed: 布尔掩码，为 True 的节点位置保持不变
+    """
+    pos = np.array(pos, dtype=float)
+    n = len(pos)
+    if n < 2:
+        return pos
+    if fixed is None:
+        fixed = np.zeros(n, dtype=bool)
+    movable = ~fixed
+    movable_idx = np.flatnonzero(movable)
+    if not len(movable_idx):
+        return pos
+
+    span = np.ptp(pos, axis=0).max() or 1.0
+    k = k or span / np.sqrt(n)
+    temperature = span / 10
+    cooling = temperature / (iterations + 1)
+    src = edges[:, 0] if len(edges) else np.empty(0, dtype=int)
+    dst = edges[:, 1] if len(edges) else np.empty(0, dtype=int)
+
+    for _ in range(iterations):
+        disp = np.zeros((n, 2))
+
+        # 斥力：k² / d，只对可移动节点计算
+        # Σ_j (p_i - p_j)·w_ij = p_i·Σ_j w_ij - (W @ P)_i，用矩阵乘法代替 n×n×2 的差值张量
+        sq = (pos ** 2).sum(axis=1)
+        for start in range(0, len(movable_idx), BLOCK_SIZE):
+            rows = movable_idx[start:start + BLOCK_SIZE]
+            dist2 = np.maximum(sq[rows, None] + sq[None, :] - 2 * pos[rows] @ pos.T, 1e-4)
+            weight = k * k / dist2
+            weight[np.arange(len(rows)), rows] = 0
+            disp[rows] += pos[rows] * weight.sum(axis=1)[:, None] - weight @ pos
+
+        # 引力：d² / k，沿边作用于两端
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-2)
+            pull = delta * (dist / k)[:, None]
+            np.add.at(disp, src, -pull)
+            np.add.at(disp, dst, pull)
+
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        step = disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        pos[movable] += step[movable]
+        temperature -= cooling
+
+    return pos
+
+
+def _load_graph(session, node_iids=None):
+    """读取节点（内部 ID、类型、已有坐标）和边；node_iids 为空表示整张图"""
+    if node_iids is None:
+        node_result = session.run(f"""
+        MATCH (n) WHERE NOT n:{META_LABEL}
+        RETURN id(n) AS iid, labels(n) AS labels, n.x AS x, n.y AS y
+        """)
+        edge_result_query = """
+        MATCH (n)-[]->(m)
+        RETURN id(n) AS source, id(m) AS target
+        """
+    else:
+        node_result = session.run("""
+        MATCH (n) WHERE id(n) IN $iids
+        RETURN id(n) AS iid, labels(n) AS labels, n.x AS x, n.y AS y
+        """, {"iids": list(node_iids)})
+        edge_result_query = """
+        MATCH (n)-[]->(m)
+        WHERE id(n) IN $iids AND id(m) IN $iids
+        RETURN id(n) AS source, id(m) AS target
+        """
+
+    iids, types, coords = [], [], []
+    for record in node_result:
+        iids.append(record["iid"])
+        labels = record["labels"]
+        types.append(labels[0] if labels else "Node")
+        coords.append((record["x"], record["y"]))
+
+    index = {iid: i for i, iid in enumerate(iids)}
+    edges = [
+        (index[r["source"]], index[r["target"]])
+        for r in session.run(edge_result_query, {"iids": list(node_iids or [])})
+        if r["source"] in index and r["target"] in index
+    ]
+    return iids, types, coords, np.array(edges, dtype=int).reshape(-1, 2)
+
+
+def _save_positions(session, iids, pos):
+    """批量写回坐标"""
+    rows = [{"iid": iid, "x": float(x), "y": float(y)} for iid, (x, y) in zip(iids, pos)]
+    for i in range(0, len(rows), SAVE_BATCH_SIZE):
+        session.run("""
+        UNWIND $rows AS row
+        MATCH (n) WHERE id(n) = row.iid
+        SET n.x = row.x, n.y = row.y
+        """, {"rows": rows[i:i + SAVE_BATCH_SIZE]})
+
+
+def layout_full(driver, iterations=80):
+    """重新计算整张图的布局并写回，返回布局的节点数"""
+    with driver.session() as session:
+        iids, types, _, edges = _load_graph(session)
+        if not iids:
+            return 0
+        pos, anchors = radial_seed(types, edges)
+        pos = force_layout(pos, edges, fixed=anchors, iterations=iterations)
+        _save_positions(session, iids, pos)
+    graph_version.bump(driver)
+    return len(iids)
+
+
+def layout_neighbourhood(driver, node_iids, iterations=40):
+    """
+    局部重排：只移动给定节点及其一跳邻居，二跳邻居作为固定的上下文参与受力
+    用于 update_node / delete_node 之后，无需重算整张图
+    """
+    node_iids = [iid for iid in node_iids if iid is not None]
+    if not node_iids:
+        return 0
+
+    with driver.session() as session:
+        record = session.run("""
+        MATCH (n) WHERE id(n) IN $iids
+        OPTIONAL MATCH (n)--(m)
+        WITH collect(DISTINCT id(n)) + collect(DISTINCT id(m)) AS affected
+        UNWIND affected AS iid
+        MATCH (a) WHERE id(a) = iid
+        OPTIONAL MATCH (a)--(c)
+        RETURN collect(DISTINCT iid) AS affected, collect(DISTINCT id(c)) AS context
+        """, {"iids": list(node_iids)}).single()
+        if not record or not record["affected"]:
+            return 0
+
+        affected = set(record["affected"])
+        iids, types, coords, edges = _load_graph(session, affected | set(record["context"]))
+        pos, anchors = radial_seed(types, edges)
+
+        # 已有坐标的节点沿用原坐标，新节点使用放射状初始位置
+        has_coords = np.array([x is not None and y is not None for x, y in coords], dtype=bool)
+        if has_coords.any():
+            pos[has_coords] = [coords[i] for i in np.flatnonzero(has_coords)]
+
+        movable = np.array([iid in affected for iid in iids], dtype=bool) & ~anchors
+        pos = force_layout(pos, edges, fixed=~movable, iterations=iterations)
+        moved = np.flatnonzero(movable)
+        _save_positions(session, [iids[i] for i in moved], pos[moved])
+    graph_version.bump(driver)
+    return len(moved)
+
+
+def relayout_in_background(driver, node_iids=None):
+    """在后台线程中执行布局，避免阻塞写请求；node_iids 为 None 时重算整张图"""
+    def run():
+        try:
+            if node_iids is None:
+                layout_full(driver)
+            else:
+                layout_neighbourhood(driver, node_iids)
+        except Exception as e:
+            print(f"图布局计算失败: {str(e)}")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
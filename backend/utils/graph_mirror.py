@@ -0,0 +1,169 @@
+"""
+图结构的进程内镜像
+- 只保存拓扑：节点内部 ID / 业务 ID / 标签，关系两端 / 类型 / 关系 ID，不保存属性
+- 邻接关系以 CSR（压缩稀疏行）数组保存，中心性等分析直接在 NumPy 数组上向量化计算
+- 按图版本号重建：版本变化后首次访问时重新从图存储读取，其余访问不访问 Neo4j
+- 路径查询等需要多跳遍历的功能在镜像上计算，Cypher 只用于取回结果节点的属性
+"""
+import threading
+import time
+
+import numpy as np
+
+
+def _csr(keys, n):
+    """按 keys 分组的 CSR 索引：返回 (indptr, order)，order 为稳定排序后的原始下标"""
+    order = np.argsort(keys, kind="stable")
+    counts = np.bincount(keys, minlength=n) if len(keys) else np.zeros(n, dtype=np.int64)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, order
+
+
+class GraphMirror:
+    """某个图版本的拓扑快照，节点以连续下标表示"""
+
+    def __init__(self, version, nodes, relationships):
+        """
+        nodes: [(内部 ID, 业务 ID, 标签列表)]
+        relationships: [(源节点内部 ID, 关系类型, 目标节点内部 ID, 关系 ID)]
+        """
+        self.version = version
+        self.iids = []
+        self.keys = []
+        self.labels = []
+        self.index_by_iid = {}
+        self.index_by_key = {}
+
+        for iid, node_id, labels in nodes:
+            idx = len(self.iids)
+            key = str(node_id or iid)
+            self.iids.append(iid)
+            self.keys.append(key)
+            self.labels.append(labels[0] if labels else "Node")
+            self.index_by_iid[iid] = idx
+            self.index_by_key[key] = idx
+            # 与 _resolve_node_ids 一致：前端也可能传内部 ID
+            self.index_by_key.setdefault(str(iid), idx)
+
+        self.rel_types = []
+        type_index = {}
+        src, dst, types, rids = [], [], [], []
+        for src_iid, rel_type, dst_iid, rid in relationships:
+            s = self.index_by_iid.get(src_iid)
+            d = self.index_by_iid.get(dst_iid)
+            if s is None or d is None:
+                continue
+            if rel_type not in type_index:
+                type_index[rel_type] = len(self.rel_types)
+                self.rel_types.append(rel_type)
+            src.append(s)
+            dst.append(d)
+            types.append(type_index[rel_type])
+            rids.append(rid)
+        self._type_index = type_index
+
+        # 边数组（NumPy），供向量化的分析计算使用
+        n = len(self.iids)
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+        self.types = np.asarray(types, dtype=np.int32)
+
+        # CSR：out_index[out_indptr[i]:out_indptr[i + 1]] 为节点 i 的出边下标，入边同理
+        self.out_indptr, self.out_index = _csr(self.src, n)
+        self.in_indptr, self.in_index = _csr(self.dst, n)
+        # 无向邻接（两个方向各一条），值为邻居节点下标
+        both_src = np.concatenate([self.src, self.dst])
+        both_dst = np.concatenate([self.dst, self.src])
+        self.nbr_indptr, order = _csr(both_src, n)
+        self.nbr_index = both_dst[order]
+
+        # 逐节点遍历（路径搜索）时 Python 列表比 NumPy 标量访问快得多
+        self.edge_src = src
+        self.edge_dst = dst
+        self.edge_type = types
+        self.edge_rid = rids
+        self._out_indptr = self.out_indptr.tolist()
+        self._out_index = self.out_index.tolist()
+        self._in_indptr = self.in_indptr.tolist()
+        self._in_index = self.in_index.tolist()
+
+        # 按需计算的分析结果（如中心性），与镜像同生命周期，图版本变化后随镜像一起丢弃
+        self.analytics = {}
+        self.analytics_lock = threading.Lock()
+
+    @property
+    def node_count(self):
+        return len(self.iids)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_src)
+
+    def out_edges(self, idx):
+        return self._out_index[self._out_indptr[idx]:self._out_indptr[idx + 1]]
+
+    def in_edges(self, idx):
+        return self._in_index[self._in_indptr[idx]:self._in_indptr[idx + 1]]
+
+    def node_index(self, node_id):
+        return self.index_by_key.get(str(node_id))
+
+    def type_ids(self, rel_types):
+        """关系类型名 → 类型下标集合，未出现在图中的类型忽略"""
+        return {self._type_index[t] for t in rel_types if t in self._type_index}
+
+    def other_end(self, edge, idx):
+        src = self.edge_src[edge]
+        return self.edge_dst[edge] if src == idx else src
+
+
+class GraphMirrorCache:
+    """持有当前版本的镜像；版本变化后首次访问时重建，并发访问只重建一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mirror = None
+        self._build_ms = 0.0
+        self._builds = 0
+
+    def get(self, repository, version):
+        """repository 为图存储（utils/graph_repository.py），通过 topology() 读取全图拓扑"""
+        with self._lock:
+            if self._mirror is not None and self._mirror.version == version:
+                return self._mirror
+
+            started = time.perf_counter()
+            nodes, relationships = repository.topology()
+            self._mirror = GraphMirror(version, nodes, relationships)
+            self._build_ms = (time.perf_counter() - started) * 1000
+            self._builds += 1
+            return self._mirror
+
+    def clear(self):
+        with self._lock:
+            self._mirror = None
+
+    def warm_up(self, repository):
+        """后台预先构建镜像（应用启动时调用），首个路径 / 分析请求无需等待"""
+        def run():
+            try:
+                self.get(repository, repository.version())
+            except Exception as e:
+                print(f"图镜像预构建失败: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            mirror = self._mirror
+            return {
+                "version": mirror.version if mirror else None,
+                "nodes": mirror.node_count if mirror else 0,
+                "edges": mirror.edge_count if mirror else 0,
+                "builds": self._builds,
+                "build_ms_last": round(self._build_ms, 2)
+            }
+
+
+graph_mirror = GraphMirrorCache()
@@ -0,0 +1,133 @@
+"""
+图镜像上的路径搜索
+- shortest_path：双向 BFS，从两端同时按层扩展，每次扩展较小的一侧
+- k_shortest_paths：Yen 算法，基于双向 BFS 求第 2..k 条无环路径
+路径以边下标列表表示，节点序列由起点沿边推出
+"""
+import heapq
+
+
+def _neighbours(mirror, idx, forward, directed):
+    """forward=True 沿出边方向，False 沿入边方向；无向模式两者都走"""
+    if not directed or forward:
+        for edge in mirror.out_edges(idx):
+            yield edge, mirror.edge_dst[edge]
+    if not directed or not forward:
+        for edge in mirror.in_edges(idx):
+            yield edge, mirror.edge_src[edge]
+
+
+def shortest_path(mirror, source, target, max_depth, rel_types=None, directed=False,
+                  banned_nodes=frozenset(), banned_edges=frozenset()):
+    """
+    source → target 的一条最短路径（边下标列表），不存在或超过 max_depth 时返回 None
+    rel_types: 允许的关系类型下标集合，None 表示不限
+    """
+    if source == target:
+        return []
+    if source in banned_nodes or target in banned_nodes:
+        return None
+
+    # 节点 → (上一跳节点, 边)，起点 / 终点记为 None
+    parents = ({source: None}, {target: None})
+    frontiers = ([source], [target])
+    depths = [0, 0]
+
+    while frontiers[0] and frontiers[1] and depths[0] + depths[1] < max_depth:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        visited, other = parents[side], parents[1 - side]
+        next_frontier = []
+        best = None
+
+        for u in frontiers[side]:
+            for edge, v in _neighbours(mirror, u, side == 0, directed):
+                if v in visited or v in banned_nodes or edge in banned_edges:
+                    continue
+                if rel_types is not None and mirror.edge_type[edge] not in rel_types:
+                    continue
+                visited[v] = (u, edge)
+                next_frontier.append(v)
+                if v in other and best is None:
+                    best = v
+        depths[side] += 1
+        frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+
+        if best is not None:
+            # 同一层内所有相遇点的路径长度相同，取第一个即可
+            return _join(parents, best)
+
+    return None
+
+
+def _join(parents, meet):
+    """由两侧的父指针拼出完整路径"""
+    head = []
+    node = meet
+    while parents[0][node] is not None:
+        node, edge = parents[0][node]
+        head.append(edge)
+    head.reverse()
+
+    tail = []
+    node = meet
+    while parents[1][node] is not None:
+        node, edge = parents[1][node]
+        tail.append(edge)
+    return head + tail
+
+
+def path_nodes(mirror, source, edges):
+    """边下标列表 → 节点下标序列"""
+    nodes = [source]
+    for edge in edges:
+        nodes.append(mirror.other_end(edge, nodes[-1]))
+    return nodes
+
+
+def k_shortest_paths(mirror, source, target, k, max_depth, rel_types=None, directed=False):
+    """Yen 算法：按长度递增返回至多 k 条无环路径（边下标列表）"""
+    first = shortest_path(mirror, source, target, max_depth, rel_types, directed)
+    if first is None:
+        return []
+
+    found = [first]
+    found_keys = {tuple(first)}
+    candidates = []
+    counter = 0
+
+    while len(found) < k:
+        prev_edges = found[-1]
+        prev_nodes = path_nodes(mirror, source, prev_edges)
+
+        for i in range(len(prev_edges)):
+            spur = prev_nodes[i]
+            root_edges = prev_edges[:i]
+
+            # 与当前路径共享同一前缀的已知路径，其下一条边不能再走
+            banned_edges = {
+                path[i] for path in found
+                if len(path) > i and tuple(path[:i]) == tuple(root_edges)
+            }
+            banned_nodes = frozenset(prev_nodes[:i])
+
+            spur_edges = shortest_path(
+                mirror, spur, target, max_depth - i, rel_types, directed,
+                banned_nodes, banned_edges
+            )
+            if spur_edges is None:
+                continue
+
+            path = root_edges + spur_edges
+            key = tuple(path)
+            if key in found_keys:
+                continue
+            found_keys.add(key)
+            counter += 1
+            heapq.heappush(candidates, (len(path), counter, path))
+
+        if not candidates:
+            break
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+
+    return found
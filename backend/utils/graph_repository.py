@@ -0,0 +1,469 @@
+"""
+图存储接口
+- GraphRepository：路由层使用的图读写接口，不暴露 Cypher
+- Neo4jGraphRepository：基于 Neo4j 的实现（默认）
+- MemoryGraphRepository（utils/memory_graph.py）：从 ATT&CK STIX 文件加载的进程内实现，
+  无需 Neo4j 即可运行、测试和压测图接口
+通过环境变量 GRAPH_BACKEND=neo4j|memory 选择后端；内存后端从 GRAPH_STIX_BUNDLE 指定的文件加载
+全文检索、游标流式导出、批量写入等依赖 Neo4j 的功能在内存后端上返回 501
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from utils.attack_schema import MATRIX_TACTIC_REL, parse_bundles, quote_label
+from utils.graph_layout import relayout_in_background
+from utils.graph_schema import ensure_schema
+from utils.graph_version import META_LABEL, graph_version
+from utils.node_resolver import node_resolver
+
+DEFAULT_STIX_BUNDLE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "..", "KG_data", "cti", "enterprise-attack", "enterprise-attack.json"
+)
+
+# 更新属性时保留的特殊属性
+PROTECTED_PROPERTIES = ["id", "x", "y"]
+
+
+class GraphNode(dict):
+    """
+    图节点：属性字典（可能已按需投影）+ 内部 ID + 标签
+    与 neo4j Node 提供相同的 get / labels / id 接口，便于复用序列化函数
+    """
+
+    def __init__(self, properties, iid, labels):
+        super().__init__(properties or {})
+        self.id = iid
+        self.labels = labels or []
+
+
+def project_properties(properties, projection):
+    """在 Python 中应用属性投影（与 properties_expr 在 Cypher 中的语义一致）"""
+    if projection is None:
+        return dict(properties)
+    mode, keys = projection
+    if mode == "include":
+        return {k: properties[k] for k in keys if properties.get(k) is not None}
+    return {k: v for k, v in properties.items() if k not in keys}
+
+
+# ---------- Cypher 片段 ----------
+
+def properties_expr(var, projection):
+    """
+    生成节点属性的 RETURN 表达式，把投影下推到 Cypher 中
+    投影模式返回 [[key, value], ...]，Neo4j 只序列化需要的属性
+    """
+    if projection is None:
+        return f"properties({var})"
+    mode, _ = projection
+    if mode == "include":
+        return f"[k IN $projection_keys WHERE {var}[k] IS NOT NULL | [k, {var}[k]]]"
+    return f"[k IN keys({var}) WHERE NOT k IN $projection_keys | [k, {var}[k]]]"
+
+
+def edge_return_clause(projection):
+    """子图查询统一的返回列"""
+    return f"""
+    RETURN id(n) AS n_iid, labels(n) AS n_labels, {properties_expr("n", projection)} AS n_props,
+           type(r) AS r_type, id(r) AS rid,
+           id(m) AS m_iid, labels(m) AS m_labels, {properties_expr("m", projection)} AS m_props
+    """
+
+
+def projection_params(projection):
+    return {"projection_keys": list(projection[1])} if projection else {}
+
+
+def label_filter(var, labels):
+    """起点标签过滤条件，labels 为空时不过滤"""
+    if not labels:
+        return ""
+    return " OR ".join(f"{var}:{label}" for label in labels)
+
+
+def domain_filter(n_var="n", r_var="r"):
+    """
+    ATT&CK 领域过滤条件（参数 $domain）：relationship 对象导入的关系看自身的 domains，
+    推出的关系（BELONGS_TO 等）没有 domains，看起点
+    """
+    return f"$domain IN coalesce({r_var}.domains, {n_var}.domains)"
+
+
+def record_nodes(record):
+    """从统一返回列中取出两端节点"""
+    nodes = []
+    for var in ("n", "m"):
+        props = record[f"{var}_props"]
+        if isinstance(props, list):
+            props = dict(props)
+        nodes.append(GraphNode(props, record[f"{var}_iid"], record[f"{var}_labels"]))
+    return nodes
+
+
+class GraphRepository(ABC):
+    """
+    图读写接口
+    节点统一以 GraphNode 返回；node_id 为前端传来的业务 ID 或内部 ID
+    写操作完成后由实现负责递增图版本号
+    各方法均为抽象方法，未实现全部接口的后端在创建实例时即报错
+    """
+
+    name = None
+
+    @abstractmethod
+    def version(self):
+        """当前图版本号，决定快照缓存与 ETag"""
+
+    @abstractmethod
+    def edges(self, labels=None, projection=None, limit=200, domain=None):
+        """子图：[(起点, 关系类型, 关系 ID, 终点)]，labels 限定起点标签，domain 限定 ATT&CK 领域"""
+
+    @abstractmethod
+    def nodes_by_iids(self, iids, projection=None):
+        """按内部 ID 批量取节点，返回 {内部 ID: GraphNode}"""
+
+    @abstractmethod
+    def node_properties(self, node_id, fields):
+        """节点的部分属性，节点不存在时返回 None"""
+
+    @abstractmethod
+    def node_types(self):
+        """返回 (节点标签列表, 关系类型列表)"""
+
+    @abstractmethod
+    def update_node(self, node_id, data):
+        """
+        更新节点：data 可含 properties / type / label(name)，与 PUT /graph/update_node 的请求体一致
+        节点不存在时返回 False
+        """
+
+    @abstractmethod
+    def delete_node(self, node_id):
+        """删除节点及其关系，节点不存在时返回 False"""
+
+    @abstractmethod
+    def prerequisites(self, target_ids, limit):
+        """学习路径：目标节点及其（传递的）PREREQUISITE / DEPENDS_ON 前置节点，返回 [(节点, [前置节点])]"""
+
+    @abstractmethod
+    def topology(self):
+        """全图拓扑（不含属性），供图镜像使用：([(内部 ID, 业务 ID, 标签)], [(源, 类型, 目标, 关系 ID)])"""
+
+    @abstractmethod
+    def matrix_source(self):
+        """
+        ATT&CK 矩阵的原始数据，供 utils/attack_matrix.py 使用：(矩阵, 战术, 技术)
+        - 矩阵 [{id, domains, tactics}]，tactics 按 HAS_TACTIC 的 order 排列
+        - 战术 [{id, external_id, name, shortname, domains, deprecated, revoked}]
+        - 技术 [{id, external_id, name, platform, domains, deprecated, revoked, tactics, parent}]，
+          tactics 为 BELONGS_TO 的战术 id，parent 为 SUB_TECHNIQUE_OF 的父技术 id
+        """
+
+
+class Neo4jGraphRepository(GraphRepository):
+    """基于 Neo4j 的实现"""
+
+    name = "neo4j"
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def version(self):
+        return graph_version.current(self.driver)
+
+    def resolve_node_ids(self, session, node_ids):
+        """
+        将前端传来的节点 ID（业务 id 或内部 ID）批量解析为 elementId，每个请求只解析一次
+        之后的查询统一使用 WHERE elementId(n) = $eid，不再做全库扫描
+        """
+        # 每个进程首次访问时确保约束与索引存在（见 graph_schema.py）
+        ensure_schema(self.driver)
+        return node_resolver.resolve_many(session, node_ids, graph_version.epoch(self.driver))
+
+    def resolve_node_id(self, session, node_id):
+        return self.resolve_node_ids(session, [node_id]).get(str(node_id))
+
+    def edges(self, labels=None, projection=None, limit=200, domain=None):
+        conditions = [f"({c})" for c in (label_filter("n", labels), domain and domain_filter()) if c]
+        cypher = f"""
+        MATCH (n)-[r]->(m)
+        {f"WHERE {' AND '.join(conditions)}" if conditions else ""}
+        {edge_return_clause(projection)}
+        LIMIT $limit
+        """
+        edges = []
+        with self.driver.session() as session:
+            result = session.run(cypher, dict(projection_params(projection), limit=limit, domain=domain))
+            for record in result:
+                n, m = record_nodes(record)
+                edges.append((n, record["r_type"], record["rid"], m))
+        return edges
+
+    def nodes_by_iids(self, iids, projection=None):
+        query = f"""
+        MATCH (n) WHERE id(n) IN $iids
+        RETURN id(n) AS iid, labels(n) AS labels, {properties_expr("n", projection)} AS props
+        """
+        nodes = {}
+        with self.driver.session() as session:
+            result = session.run(query, dict(projection_params(projection), iids=list(iids)))
+            for record in result:
+                props = record["props"]
+                if isinstance(props, list):
+                    props = dict(props)
+                nodes[record["iid"]] = GraphNode(props, record["iid"], record["labels"])
+        return nodes
+
+    def node_properties(self, node_id, fields):
+        query = """
+        MATCH (n) WHERE elementId(n) = $eid
+        RETURN [k IN $fields WHERE n[k] IS NOT NULL | [k, n[k]]] AS props
+        """
+        with self.driver.session() as session:
+            eid = self.resolve_node_id(session, node_id)
+            record = session.run(query, {"eid": eid, "fields": list(fields)}).single() if eid else None
+            return dict(record["props"]) if record else None
+
+    def node_types(self):
+        with self.driver.session() as session:
+            # 获取所有节点标签
+            node_types_query = """
+            CALL db.labels()
+            YIELD label
+            RETURN collect(label) as labels
+            """
+            node_result = session.run(node_types_query)
+            node_labels = []
+            for record in node_result:
+                labels = record.get("labels", [])
+                if labels:
+                    node_labels = labels
+                    break
+
+            # 如果没有获取到,尝试另一种方法
+            if not node_labels:
+                alt_query = """
+                MATCH (n)
+                RETURN DISTINCT labels(n) as labels
+                LIMIT 100
+                """
+                alt_result = session.run(alt_query)
+                all_labels = set()
+                for record in alt_result:
+                    labels = record.get("labels", [])
+                    all_labels.update(labels)
+                node_labels = list(all_labels)
+
+            # 版本号等元数据节点不属于业务图
+            node_labels = [label for label in node_labels if label != META_LABEL]
+
+            # 获取所有关系类型
+            edge_types_query = """
+            CALL db.relationshipTypes()
+            YIELD relationshipType
+            RETURN collect(relationshipType) as types
+            """
+            edge_result = session.run(edge_types_query)
+            edge_types = []
+            for record in edge_result:
+                types = record.get("types", [])
+                if types:
+                    edge_types = types
+                    break
+
+            # 如果没有获取到,尝试另一种方法
+            if not edge_types:
+                alt_edge_query = """
+                MATCH ()-[r]->()
+                RETURN DISTINCT type(r) as relType
+                LIMIT 100
+                """
+                alt_edge_result = session.run(alt_edge_query)
+                all_edge_types = set()
+                for record in alt_edge_result:
+                    rel_type = record.get("relType")
+                    if rel_type:
+                        all_edge_types.add(rel_type)
+                edge_types = list(all_edge_types)
+
+        return node_labels, edge_types
+
+    def update_node(self, node_id, data):
+        with self.driver.session() as session:
+            # 首先找到节点：解析一次 elementId，后续查询都按 elementId 匹配
+            eid = self.resolve_node_id(session, node_id)
+            find_query = """
+            MATCH (n) WHERE elementId(n) = $eid
+            RETURN n, labels(n) as labels
+            """
+            record = session.run(find_query, {"eid": eid}).single() if eid else None
+            if not record:
+                return False
+
+            node = record["n"]
+            current_labels = record["labels"]
+
+            # 更新属性与显示名称：属性作为一个 map 参数 SET n += $props（值为 null 的键随之从节点上移除），
+            # 属性名不拼接进 Cypher
+            props = {
+                key: value for key, value in (data.get("properties") or {}).items()
+                if key not in PROTECTED_PROPERTIES  # 保留这些特殊属性
+            }
+            name = data.get("label") or data.get("name")
+            if name:
+                props["name"] = name
+            if props:
+                session.run("""
+                MATCH (n) WHERE elementId(n) = $eid
+                SET n += $props
+                """, {"eid": eid, "props": props})
+
+            # 更新标签（如果提供了新标签）；标签无法参数化，经 quote_label 转义后拼接
+            relabeled = False
+            new_label = data.get("type")
+            if new_label and new_label not in current_labels:
+                relabeled = True
+                remove_old = "".join(f" REMOVE n:{quote_label(label)}" for label in current_labels)
+                session.run(f"""
+                MATCH (n) WHERE elementId(n) = $eid
+                {remove_old}
+                SET n:{quote_label(new_label)}
+                """, {"eid": eid})
+
+        graph_version.bump(self.driver)
+
+        # 只有类型变化会改变战术锚点，此时才后台重排该节点的局部邻域（重排写回坐标时会再次递增版本号）
+        if relabeled:
+            relayout_in_background(self.driver, [node.id])
+        return True
+
+    def delete_node(self, node_id):
+        # 延迟导入：graph_delete 只在 Neo4j 后端使用
+        from utils.graph_delete import chunked_delete
+
+        with self.driver.session() as session:
+            # 先检查节点是否存在
+            eid = self.resolve_node_id(session, node_id)
+            check_query = """
+            MATCH (n) WHERE elementId(n) = $eid
+            OPTIONAL MATCH (n)--(m)
+            RETURN n, collect(DISTINCT id(m)) AS neighbours
+            """
+            record = session.run(check_query, {"eid": eid}).single() if eid else None
+            if not record:
+                return False
+            neighbours = record["neighbours"]
+
+        # 删除节点及其所有关系：关系分批删除，避免高连接度节点形成超大事务
+        chunked_delete(self.driver, [eid])
+        node_resolver.forget([node_id, eid])
+
+        graph_version.bump(self.driver)
+
+        # 删除后只重排原邻居所在的局部区域
+        relayout_in_background(self.driver, neighbours)
+        return True
+
+    def prerequisites(self, target_ids, limit):
+        # 找到目标知识点及其前置依赖
+        cypher = """
+        MATCH (n)
+        WHERE n.id IN $target_ids
+        OPTIONAL MATCH (n)<-[:PREREQUISITE|DEPENDS_ON*]-(prereq)
+        RETURN DISTINCT n, collect(DISTINCT prereq) as prerequisites
+        LIMIT $limit
+        """
+        rows = []
+        with self.driver.session() as session:
+            result = session.run(cypher, target_ids=list(target_ids), limit=limit)
+            for record in result:
+                n = record["n"]
+                prereqs = [
+                    GraphNode(dict(p), p.id, list(p.labels))
+                    for p in record["prerequisites"] if p
+                ]
+                rows.append((GraphNode(dict(n), n.id, list(n.labels)), prereqs))
+        return rows
+
+    def topology(self):
+        with self.driver.session() as session:
+            nodes = [
+                (record["iid"], record["id"], record["labels"])
+                for record in session.run(f"""
+                MATCH (n) WHERE NOT n:{META_LABEL}
+                RETURN id(n) AS iid, n.id AS id, labels(n) AS labels
+                """)
+            ]
+            relationships = [
+                (record["src"], record["type"], record["dst"], record["rid"])
+                for record in session.run(f"""
+                MATCH (n)-[r]->(m) WHERE NOT n:{META_LABEL} AND NOT m:{META_LABEL}
+                RETURN id(n) AS src, type(r) AS type, id(m) AS dst, id(r) AS rid
+                """)
+            ]
+        return nodes, relationships
+
+    def matrix_source(self):
+        with self.driver.session() as session:
+            matrices = [record.data() for record in session.run(f"""
+            MATCH (m:Matrix)
+            OPTIONAL MATCH (m)-[r:{MATRIX_TACTIC_REL}]->(ta:Tactic)
+            WITH m, r, ta ORDER BY r.order
+            RETURN m.id AS id, m.domains AS domains, collect(ta.id) AS tactics
+            """)]
+            tactics = [record.data() for record in session.run("""
+            MATCH (ta:Tactic)
+            RETURN ta.id AS id, ta.external_id AS external_id, ta.name AS name, ta.shortname AS shortname,
+                   ta.domains AS domains, ta.deprecated AS deprecated, ta.revoked AS revoked
+            """)]
+            techniques = [record.data() for record in session.run("""
+            MATCH (t:Technique)
+            RETURN t.id AS id, t.external_id AS external_id, t.name AS name, t.platform AS platform,
+                   t.domains AS domains, t.deprecated AS deprecated, t.revoked AS revoked,
+                   [(t)-[:BELONGS_TO]->(ta:Tactic) | ta.id] AS tactics,
+                   head([(t)-[:SUB_TECHNIQUE_OF]->(p:Technique) | p.id]) AS parent
+            """)]
+        return matrices, tactics, techniques
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_graph_repository():
+    """
+    返回当前进程使用的图存储（首次调用时按 GRAPH_BACKEND 创建）
+    - neo4j（默认）：使用 neo4j_client 中的驱动
+    - memory：从 GRAPH_STIX_BUNDLE（默认 KG_data 下的 enterprise-attack.json）加载，
+      多个领域的 bundle 用路径分隔符（os.pathsep）分隔
+    """
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                backend = os.environ.get("GRAPH_BACKEND", "neo4j").lower()
+                if backend == "memory":
+                    from utils.memory_graph import MemoryGraphRepository
+                    value = os.environ.get("GRAPH_STIX_BUNDLE", DEFAULT_STIX_BUNDLE)
+                    bundles = parse_bundles([p for p in value.split(os.pathsep) if p])
+                    missing = [path for _, path in bundles if not os.path.exists(path)]
+                    if bundles and not missing:
+                        _repository = MemoryGraphRepository.from_stix_bundles(bundles)
+                    else:
+                        print(f"未找到 STIX 文件，内存图为空: {', '.join(missing) or value}")
+                        _repository = MemoryGraphRepository()
+                elif backend == "neo4j":
+                    from neo4j_client import driver
+                    _repository = Neo4jGraphRepository(driver)
+                else:
+                    raise ValueError(f"未知的图存储后端: {backend}")
+    return _repository
+
+
+def set_graph_repository(repository):
+    """替换当前进程的图存储（测试 / 压测时注入已加载好的实现）"""
+    global _repository
+    with _repository_lock:
+        _repository = repository
@@ -0,0 +1,297 @@
+"""
+Neo4j 约束与索引的版本化迁移
+- MIGRATIONS 按版本号列出 schema 对象（约束 / 索引），均以 IF NOT EXISTS 创建，可重复执行
+- 已应用的版本号保存在 (:GraphMeta {key: 'schema'}) 节点上，清库重导时保留，只执行尚未应用的迁移
+- 每次运行还会对照 SHOW CONSTRAINTS / SHOW INDEXES 检查全部声明的对象：
+  缺失的（如被手工删除）重新创建，标签或属性与声明不一致的（如全文索引建立后新增了节点标签）删除后重建
+- 导入脚本、应用启动与基准脚本都调用 ensure_schema；后端进程内只检查一次
+- index_usage 对热点查询做 EXPLAIN，报告每个查询实际使用的索引，没有走索引的查询会被标出
+
+用法（在 backend 目录下）：
+    python -m utils.graph_schema            # 应用迁移并输出索引使用报告
+    python -m utils.graph_schema --status   # 只查看当前版本与缺失的对象，不做修改
+"""
+import threading
+
+from utils.attack_schema import (
+    DATA_COMPONENT_REL, ID_LABELS, MATRIX_TACTIC_REL, RELATIONSHIP_TYPES, quote_label
+)
+from utils.graph_search import FULLTEXT_INDEX, FULLTEXT_PROPERTIES
+from utils.graph_version import META_LABEL
+
+SCHEMA_KEY = "schema"
+
+
+def _constraint(name, label, prop):
+    return {
+        "kind": "CONSTRAINT", "name": name, "entities": [label], "properties": [prop],
+        "create": f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{quote_label(label)}) REQUIRE n.{prop} IS UNIQUE"
+    }
+
+
+def _node_index(label, prop):
+    name = f"{label.lower()}_{prop}"
+    return {
+        "kind": "INDEX", "name": name, "entities": [label], "properties": [prop],
+        "create": f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{quote_label(label)}) ON (n.{prop})"
+    }
+
+
+def _relationship_index(rel_type, prop):
+    name = f"rel_{rel_type.lower()}_{prop}"
+    return {
+        "kind": "INDEX", "name": name, "entities": [rel_type], "properties": [prop],
+        "create": f"CREATE INDEX {name} IF NOT EXISTS FOR ()-[r:{quote_label(rel_type)}]-() ON (r.{prop})"
+    }
+
+
+def _fulltext_index():
+    labels = "|".join(quote_label(label) for label in ID_LABELS)
+    properties = ", ".join(f"n.{prop}" for prop in FULLTEXT_PROPERTIES)
+    return {
+        "kind": "INDEX", "name": FULLTEXT_INDEX, "entities": list(ID_LABELS), "properties": FULLTEXT_PROPERTIES,
+        "create": f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS FOR (n:{labels}) ON EACH [{properties}]"
+    }
+
+
+# (版本号, 说明, 先执行的删除语句, 声明的 schema 对象)；已发布的迁移不再修改，新的需求追加新版本
+MIGRATIONS = [
+    (1, "业务 id 唯一约束（MERGE 与关系端点的 MATCH 走索引）", [], [
+        _constraint(f"{label.lower()}_id_unique", label, "id") for label in ID_LABELS
+    ]),
+    (2, "external_id / name 索引，战术 shortname 索引（BELONGS_TO 按 shortname 匹配）", [], [
+        _node_index(label, prop) for label in ID_LABELS for prop in ("external_id", "name")
+    ] + [_node_index("Tactic", "shortname")]),
+    # 旧版导入脚本建立的全文索引不含后来新增的标签，IF NOT EXISTS 不会更新，先删除
+    (3, "节点全文索引（名称、外部 ID、描述）", [f"DROP INDEX {FULLTEXT_INDEX} IF EXISTS"], [
+        _fulltext_index()
+    ]),
+    (4, "关系 id 索引（增量更新按 STIX id 删除 / 更新关系）", [], [
+        _relationship_index(rel_type, "id")
+        for rel_type in sorted(set(RELATIONSHIP_TYPES.values()) | {MATRIX_TACTIC_REL, DATA_COMPONENT_REL})
+    ]),
+    (5, "图元数据 key 唯一约束", [], [
+        _constraint("graphmeta_key_unique", META_LABEL, "key")
+    ]),
+    (6, "modified 索引（MySQL 同步按 modified 增量分页读取）", [], [
+        _node_index(label, "modified") for label in ID_LABELS
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# 热点查询：(名称, 查询, 参数)，参数只用于 EXPLAIN 规划，不会执行
+HOT_QUERIES = [
+    ("按业务 id 解析节点", "MATCH (n:Technique) WHERE n.id = $id RETURN n", {"id": ""}),
+    ("按外部 ID 查找技术", "MATCH (t:Technique {external_id: $id}) RETURN t", {"id": ""}),
+    ("按名称查找技术", "MATCH (t:Technique {name: $name}) RETURN t", {"name": ""}),
+    ("导入 BELONGS_TO", """
+        UNWIND $rows AS rel
+        MATCH (t:Technique {id: rel.tech_id})
+        MATCH (ta:Tactic {shortname: rel.phase}) WHERE rel.domain IN ta.domains
+        RETURN count(*)
+    """, {"rows": []}),
+    ("导入关系端点", """
+        UNWIND $rows AS rel
+        MATCH (s:Group {id: rel.source})
+        MATCH (t:Technique {id: rel.target})
+        RETURN count(*)
+    """, {"rows": []}),
+    ("增量更新删除关系", "MATCH ()-[r:USES]->() WHERE r.id IN $ids RETURN count(r)", {"ids": []}),
+    ("全文搜索", f"CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', $query) YIELD node RETURN node",
+     {"query": "x"}),
+    ("图版本号", f"MATCH (m:{META_LABEL} {{key: 'graph'}}) RETURN m.version", {}),
+]
+
+# 说明查询没有走索引的执行计划算子
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan", "DirectedAllRelationshipsScan",
+                  "UndirectedAllRelationshipsScan", "DirectedRelationshipTypeScan",
+                  "UndirectedRelationshipTypeScan")
+
+
+def declared_objects(version=SCHEMA_VERSION):
+    """版本号不超过 version 的迁移声明的全部 schema 对象"""
+    return [obj for v, _, _, objects in MIGRATIONS if v <= version for obj in objects]
+
+
+def read_schema_version(session):
+    record = session.run(
+        f"MATCH (m:{META_LABEL} {{key: $key}}) RETURN m.version AS version", {"key": SCHEMA_KEY}
+    ).single()
+    return (record["version"] or 0) if record else 0
+
+
+def _write_schema_version(session, version):
+    session.run(
+        f"MERGE (m:{META_LABEL} {{key: $key}}) SET m.version = $version, m.updated_at = datetime()",
+        {"key": SCHEMA_KEY, "version": version}
+    )
+
+
+def existing_objects(session):
+    """库中现有的约束与索引 {(类型, 名称): (标签或关系类型, 属性)}"""
+    existing = {}
+    for kind in ("CONSTRAINT", "INDEX"):
+        for record in session.run(f"SHOW {kind}S YIELD name, labelsOrTypes, properties"):
+            existing[(kind, record["name"])] = (sorted(record["labelsOrTypes"] or []),
+                                                sorted(record["properties"] or []))
+    return existing
+
+
+def _drift(obj, existing):
+    """None 表示与声明一致，否则返回 'missing' / 'mismatch'"""
+    found = existing.get((obj["kind"], obj["name"]))
+    if found is None:
+        return "missing"
+    if found != (sorted(obj["entities"]), sorted(obj["properties"])):
+        return "mismatch"
+    return None
+
+
+def schema_status(driver):
+    """当前版本号、目标版本号，以及缺失 / 不一致的对象 [(名称, 状态)]"""
+    with driver.session() as session:
+        version = read_schema_version(session)
+        existing = existing_objects(session)
+    drift = []
+    for obj in declared_objects(version):
+        state = _drift(obj, existing)
+        if state:
+            drift.append((obj["name"], state))
+    return {"version": version, "target": SCHEMA_VERSION, "drift": drift}
+
+
+def apply_migrations(driver, verbose=False):
+    """
+    执行尚未应用的迁移并修复已应用部分的偏差，返回 {"from", "to", "applied": [版本号], "repaired": [名称]}
+    schema 语句逐条以自动提交事务执行：Neo4j 不允许在同一事务中混合 schema 修改与数据写入
+    """
+    log = print if verbose else (lambda *_: None)
+    with driver.session() as session:
+        start = read_schema_version(session)
+        applied = []
+        for version, description, drops, objects in MIGRATIONS:
+            if version <= start:
+                continue
+            log(f"应用 schema 迁移 {version}: {description}")
+            for statement in drops:
+                session.run(statement).consume()
+            for obj in objects:
+                session.run(obj["create"]).consume()
+            # 每个迁移完成后立即记录，中途失败时下次从失败的迁移继续
+            _write_schema_version(session, version)
+            applied.append(version)
+
+        repaired = []
+        existing = existing_objects(session)
+        for obj in declared_objects(max(start, SCHEMA_VERSION)):
+            state = _drift(obj, existing)
+            if state is None:
+                continue
+            log(f"修复 schema 对象 {obj['name']}（{'缺失' if state == 'missing' else '定义不一致'}）")
+            if state == "mismatch":
+                session.run(f"DROP {obj['kind']} {obj['name']} IF EXISTS").consume()
+            session.run(obj["create"]).consume()
+            repaired.append(obj["name"])
+    return {"from": start, "to": max(start, SCHEMA_VERSION), "applied": applied, "repaired": repaired}
+
+
+def _plan_operators(plan):
+    """执行计划树 → [(算子, 详情)]，算子名去掉 @neo4j 等后缀"""
+    operators = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not node:
+            continue
+        operator = node.get("operatorType", "").split("@", 1)[0]
+        args = node.get("args") or node.get("arguments") or {}
+        operators.append((operator, args.get("Details", "")))
+        stack.extend(node.get("children") or [])
+    return operators
+
+
+def index_usage(driver, queries=None):
+    """
+    EXPLAIN 每个热点查询（只规划不执行），返回 [{name, indexes, scans}]
+    indexes 为执行计划中的索引查找 / 扫描算子及其详情，scans 为没有走索引的标签扫描 / 全库扫描
+    """
+    report = []
+    with driver.session() as session:
+        for name, query, params in queries or HOT_QUERIES:
+            try:
+                plan = session.run("EXPLAIN " + query, params).consume().plan
+            except Exception as e:
+                report.append({"name": name, "error": str(e), "indexes": [], "scans": []})
+                continue
+            operators = _plan_operators(plan)
+            report.append({
+                "name": name,
+                # 全文索引查询在计划中是过程调用
+                "indexes": [f"{op} {details}".strip() for op, details in operators
+                            if "Index" in op or "db.index." in details],
+                "scans": [f"{op} {details}".strip() for op, details in operators if op in SCAN_OPERATORS],
+            })
+    return report
+
+
+def print_index_usage(report):
+    for item in report:
+        if item.get("error"):
+            print(f"  {item['name']}: EXPLAIN 失败 - {item['error']}")
+            continue
+        status = "未走索引" if item["scans"] and not item["indexes"] else "索引"
+        print(f"  {item['name']}（{status}）")
+        for line in item["indexes"] + item["scans"]:
+            print(f"    {line}")
+
+
+class SchemaBootstrap:
+    """进程内只执行一次迁移（应用启动或首次访问 Neo4j 时）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._result = None
+
+    def ensure(self, driver, verbose=False):
+        """
+        确保 schema 为最新版本，失败时只输出错误（如存在重复 id 无法建立唯一约束、权限不足），
+        查询仍可执行，只是退化为较慢的扫描
+        """
+        with self._lock:
+            if self._result is not None:
+                return self._result
+            try:
+                self._result = apply_migrations(driver, verbose)
+            except Exception as e:
+                print(f"Neo4j schema 迁移失败: {str(e)}")
+                self._result = {"error": str(e)}
+            return self._result
+
+
+schema_bootstrap = SchemaBootstrap()
+
+
+def ensure_schema(driver, verbose=False):
+    return schema_bootstrap.ensure(driver, verbose)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from neo4j_client import driver as neo4j_driver
+
+    parser = argparse.ArgumentParser(description="Neo4j 约束与索引迁移")
+    parser.add_argument("--status", action="store_true", help="只查看当前版本与缺失的对象，不做修改")
+    args = parser.parse_args()
+
+    if args.status:
+        status = schema_status(neo4j_driver)
+        print(f"schema 版本: {status['version']} / {status['target']}")
+        for name, state in status["drift"]:
+            print(f"  {name}: {'缺失' if state == 'missing' else '定义不一致'}")
+    else:
+        result = apply_migrations(neo4j_driver, verbose=True)
+        print(f"schema 版本: {result['from']} → {result['to']}，修复 {len(result['repaired'])} 个对象")
+        print("热点查询的索引使用情况:")
+        print_index_usage(index_usage(neo4j_driver))
@@ -0,0 +1,148 @@
+"""
+图节点全文搜索
+- 首选 Neo4j 全文索引（由 schema 迁移创建，见 graph_schema.py），覆盖名称、外部 ID 与描述
+- 全文索引不可用时退回进程内的排序搜索，索引按图版本号缓存
+- 命中结果附带高亮片段（已做 HTML 转义，可直接用 v-html 渲染）
+"""
+import html
+import re
+import threading
+
+from utils.graph_version import META_LABEL
+
+FULLTEXT_INDEX = "graph_node_text"
+FULLTEXT_PROPERTIES = ["name", "external_id", "description"]
+
+SNIPPET_RADIUS = 60
+
+# Lucene 查询语法中的特殊字符
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+
+
+def split_terms(query):
+    return [term for term in re.split(r"\s+", query.strip()) if term]
+
+
+def build_lucene_query(terms):
+    """每个词转义后做前缀匹配，名称与外部 ID 命中时加权"""
+    clauses = []
+    for term in terms:
+        escaped = _LUCENE_SPECIAL.sub(r"\\\1", term.lower())
+        clauses.append(f"(name:{escaped}*^3 OR external_id:{escaped}*^5 OR description:{escaped}*)")
+    return " AND ".join(clauses)
+
+
+def highlight(text, terms, radius=SNIPPET_RADIUS):
+    """截取第一个命中词附近的片段，并用 <mark> 标出所有命中词"""
+    if not text:
+        return ""
+    text = str(text)
+    lowered = text.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [pos for pos in positions if pos >= 0]
+
+    if positions:
+        first = min(positions)
+        start = max(first - radius, 0)
+        end = min(first + radius * 2, len(text))
+    else:
+        start, end = 0, min(radius * 2, len(text))
+
+    snippet = text[start:end]
+    # 所有命中词合并为一个正则（长词优先）一次匹配，避免后面的短词匹配到已插入的 <mark> 标签；
+    # 在原文上匹配、逐段转义，命中词也不会落在 &lt; 等转义实体内部
+    words = sorted({term for term in terms if term}, key=len, reverse=True)
+    if words:
+        pattern = re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+        parts, last = [], 0
+        for match in pattern.finditer(snippet):
+            parts.append(html.escape(snippet[last:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            last = match.end()
+        parts.append(html.escape(snippet[last:]))
+        snippet = "".join(parts)
+    else:
+        snippet = html.escape(snippet)
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+
+def fulltext_search(session, terms, labels, limit):
+    """使用 Neo4j 全文索引搜索，返回 [(node, score)]"""
+    result = session.run("""
+    CALL db.index.fulltext.queryNodes($index, $query) YIELD node, score
+    WHERE size($labels) = 0 OR any(label IN labels(node) WHERE label IN $labels)
+    RETURN node, score
+    LIMIT $limit
+    """, {"index": FULLTEXT_INDEX, "query": build_lucene_query(terms), "labels": labels, "limit": limit})
+    return [(record["node"], record["score"]) for record in result]
+
+
+class FallbackSearchIndex:
+    """
+    进程内的排序搜索（无全文索引时使用）
+    节点的可搜索字段按图版本号加载一次，之后的查询不访问 Neo4j
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = []
+
+    def _load(self, session):
+        result = session.run(f"""
+        MATCH (n) WHERE NOT n:{META_LABEL}
+        RETURN n.id AS id, id(n) AS iid, labels(n) AS labels,
+               n.name AS name, n.external_id AS external_id, n.description AS description
+        """)
+        entries = []
+        for record in result:
+            labels = record["labels"] or []
+            entries.append({
+                "id": str(record["id"] or record["iid"]),
+                "type": labels[0] if labels else "Node",
+                "labels": labels,
+                "name": record["name"] or "",
+                "external_id": record["external_id"] or "",
+                "description": record["description"] or "",
+                "_name": (record["name"] or "").lower(),
+                "_external_id": (record["external_id"] or "").lower(),
+                "_description": (record["description"] or "").lower()
+            })
+        return entries
+
+    def search(self, session, version, terms, labels, limit):
+        with self._lock:
+            if self._version != version:
+                self._entries = self._load(session)
+                self._version = version
+            entries = self._entries
+
+        lowered = [term.lower() for term in terms]
+        scored = []
+        for entry in entries:
+            if labels and not any(label in labels for label in entry["labels"]):
+                continue
+            score = 0.0
+            for term in lowered:
+                term_score = 0.0
+                if entry["_external_id"] == term:
+                    term_score += 10
+                elif entry["_external_id"].startswith(term):
+                    term_score += 5
+                if term in entry["_name"]:
+                    term_score += 4 if entry["_name"].startswith(term) else 3
+                if term in entry["_description"]:
+                    term_score += min(entry["_description"].count(term), 5) * 0.2
+                if term_score == 0:
+                    # 所有词都必须命中
+                    break
+                score += term_score
+            else:
+                if score > 0:
+                    scored.append((score, entry))
+
+        scored.sort(key=lambda item: (-item[0], item[1]["name"]))
+        return scored[:limit]
+
+
+fallback_index = FallbackSearchIndex()
@@ -0,0 +1,91 @@
+"""
+图数据版本号
+- 版本号保存在 Neo4j 的 (:GraphMeta {key: 'graph'}) 节点上，导入脚本与后端进程共享
+- 任何修改图数据的操作（导入、节点更新 / 删除、布局写回）都应调用 bump
+- 导入批次号（epoch）只在清库重导时递增，用于失效依赖内部 ID 的缓存
+- 进程内缓存版本号，最多每 VERSION_CHECK_INTERVAL 秒回源一次，读请求基本不访问 Neo4j
+"""
+import threading
+import time
+
+META_LABEL = "GraphMeta"
+META_KEY = "graph"
+
+# 进程内版本号的回源间隔（秒），决定外部导入后多久能被感知
+VERSION_CHECK_INTERVAL = 5.0
+
+
+def read_graph_version(session):
+    """读取当前 (图版本号, 导入批次号)，未初始化时均为 0"""
+    record = session.run(
+        f"MATCH (m:{META_LABEL} {{key: $key}}) RETURN m.version AS version, m.epoch AS epoch",
+        {"key": META_KEY}
+    ).single()
+    if not record:
+        return 0, 0
+    return record["version"] or 0, record["epoch"] or 0
+
+
+def bump_graph_version(session, new_epoch=False):
+    """
+    图版本号加一并返回 (新版本号, 导入批次号)
+    new_epoch=True 表示节点被整体重建（清库重导），内部 ID / elementId 不再可信
+    """
+    record = session.run(
+        f"""
+        MERGE (m:{META_LABEL} {{key: $key}})
+        SET m.version = coalesce(m.version, 0) + 1,
+            m.epoch = coalesce(m.epoch, 0) + CASE WHEN $new_epoch THEN 1 ELSE 0 END,
+            m.updated_at = datetime()
+        RETURN m.version AS version, m.epoch AS epoch
+        """,
+        {"key": META_KEY, "new_epoch": new_epoch}
+    ).single()
+    return record["version"], record["epoch"]
+
+
+class GraphVersion:
+    """进程内的图版本号，带回源间隔"""
+
+    def __init__(self, check_interval=VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._epoch = None
+        self._checked_at = 0.0
+
+    def _refresh(self, driver):
+        """距上次回源超过 check_interval 秒时重新读取版本号"""
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return
+
+        with driver.session() as session:
+            version, epoch = read_graph_version(session)
+
+        with self._lock:
+            self._version, self._epoch = version, epoch
+            self._checked_at = time.monotonic()
+
+    def current(self, driver):
+        """返回当前版本号，距上次回源不足 check_interval 秒时直接使用缓存值"""
+        self._refresh(driver)
+        return self._version
+
+    def epoch(self, driver):
+        """返回当前导入批次号，只在清库重导时变化"""
+        self._refresh(driver)
+        return self._epoch
+
+    def bump(self, driver, new_epoch=False):
+        """写操作之后调用：Neo4j 中的版本号加一，并立即更新本进程的缓存值"""
+        with driver.session() as session:
+            version, epoch = bump_graph_version(session, new_epoch)
+
+        with self._lock:
+            self._version, self._epoch = version, epoch
+            self._checked_at = time.monotonic()
+        return version
+
+
+graph_version = GraphVersion()
@@ -0,0 +1,322 @@
+"""
+Neo4j → MySQL 知识库同步
+- Neo4j 中的 ATT&CK 节点（ID_LABELS）写入 KnowledgeNode（neo4j_id 为节点业务 id），关系写入 KnowledgeRelation，
+  管理页面可以直接读 MySQL，不必访问 Neo4j
+- 节点按标签、按 (modified, id) 键集分页读取（modified 有索引，见 graph_schema 迁移 6），
+  每页以 executemany 的 INSERT ... ON DUPLICATE KEY UPDATE 写入并提交
+- 关系来自两处：本次同步的节点的出边（包括导入脚本推出、没有 modified 的 BELONGS_TO 等），
+  以及 modified 超过关系高水位的 relationship 对象（端点都没有变化时新增 / 更新的关系）
+- 增量同步从上次的高水位继续；高水位在整个同步完成后才保存，中途失败时下次重新同步这部分（写入是幂等的）
+- 同步的节点在 Neo4j 中已没有的出边从 MySQL 删除（只删除由同步写入、neo4j_id 不为空的关系）
+- 图被清库重导（导入批次号变化）或从未同步过时自动执行全量同步；
+  全量同步还会删除起点已不存在的同步关系，已不存在的节点可能被学习路径引用，只统计不删除
+- modified 早于高水位的对象（如之后才导入的其他领域）与管理员在图上的编辑不会被增量同步发现，需要全量同步
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, inspect, text
+
+from models import KnowledgeSyncState, db
+from utils.attack_schema import ID_LABELS, quote_label
+from utils.graph_version import META_LABEL, read_graph_version
+
+SYNC_STATE_NAME = "neo4j"
+DEFAULT_PAGE_SIZE = 1000
+SYNC_SOURCE = "mitre"
+
+NODE_COLUMNS = ["neo4j_id", "name", "category", "description", "source", "created_at", "updated_at"]
+NODE_UPDATE_COLUMNS = ["name", "category", "description", "updated_at"]
+RELATION_COLUMNS = ["neo4j_id", "source_id", "target_id", "relation_type", "description", "created_at"]
+RELATION_UPDATE_COLUMNS = ["source_id", "target_id", "relation_type", "description"]
+
+# 高水位的初始值：比任何 modified / id 都小
+_START = ["", ""]
+
+_sync_lock = threading.Lock()
+
+
+class SyncInProgress(RuntimeError):
+    pass
+
+
+def sync_in_progress():
+    return _sync_lock.locked()
+
+
+def _node_page_query(label):
+    return f"""
+    MATCH (n:{quote_label(label)})
+    WHERE n.modified > $modified OR (n.modified = $modified AND n.id > $id)
+    RETURN n.id AS id, n.name AS name, n.external_id AS external_id,
+           n.description AS description, n.modified AS modified
+    ORDER BY n.modified, n.id
+    LIMIT $limit
+    """
+
+
+def _out_edges_query(label):
+    """按标签查找起点，走 id 唯一约束的索引"""
+    return f"""
+    UNWIND $ids AS node_id
+    MATCH (s:{quote_label(label)} {{id: node_id}})-[r]->(t)
+    WHERE t.id IS NOT NULL AND NOT t:{META_LABEL}
+    RETURN s.id AS source, t.id AS target, type(r) AS type, r.id AS id, r.description AS description
+    """
+
+
+_RELATIONSHIP_PAGE_QUERY = f"""
+MATCH (s)-[r]->(t)
+WHERE r.modified IS NOT NULL AND s.id IS NOT NULL AND t.id IS NOT NULL AND NOT t:{META_LABEL}
+  AND (r.modified > $modified OR (r.modified = $modified AND r.id > $id))
+RETURN s.id AS source, t.id AS target, type(r) AS type, r.id AS id, r.description AS description,
+       r.modified AS modified
+ORDER BY r.modified, r.id
+LIMIT $limit
+"""
+
+_LATEST_RELATIONSHIP_QUERY = """
+MATCH ()-[r]->() WHERE r.modified IS NOT NULL
+RETURN r.modified AS modified, r.id AS id
+ORDER BY r.modified DESC, r.id DESC
+LIMIT 1
+"""
+
+
+def _upsert_statement(table, columns, update_columns):
+    """
+    按唯一键 neo4j_id 批量插入或更新；MySQL 使用 ON DUPLICATE KEY UPDATE，
+    其他数据库（本地开发用的 SQLite 等）使用 ON CONFLICT
+    MySQL 8.0.20 起 VALUES(col) 已弃用，8.0.19 及以上使用行别名（AS new ... new.col）；
+    MariaDB 不支持行别名，与更早的 MySQL 一样使用 VALUES(col)
+    """
+    names = ", ".join(columns)
+    values = ", ".join(f":{c}" for c in columns)
+    dialect = db.engine.dialect
+    if dialect.name in ("mysql", "mariadb"):
+        if not getattr(dialect, "is_mariadb", False) and (dialect.server_version_info or ()) >= (8, 0, 19):
+            updates = ", ".join(f"{c} = new.{c}" for c in update_columns)
+            return text(f"INSERT INTO {table} ({names}) VALUES ({values}) AS new ON DUPLICATE KEY UPDATE {updates}")
+        updates = ", ".join(f"{c} = VALUES({c})" for c in update_columns)
+        return text(f"INSERT INTO {table} ({names}) VALUES ({values}) ON DUPLICATE KEY UPDATE {updates}")
+    updates = ", ".join(f"{c} = excluded.{c}" for c in update_columns)
+    return text(f"INSERT INTO {table} ({names}) VALUES ({values}) ON CONFLICT (neo4j_id) DO UPDATE SET {updates}")
+
+
+def ensure_sync_schema():
+    """
+    建立同步需要的表与唯一键（db.create_all 不会修改已有的表）：
+    knowledge_sync_state 表、knowledge_relations.neo4j_id 列，以及两张表 neo4j_id 上的唯一索引
+    已有重复 neo4j_id 时唯一索引创建失败，需要先清理
+    """
+    db.create_all()
+    if "neo4j_id" not in {c["name"] for c in inspect(db.engine).get_columns("knowledge_relations")}:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE knowledge_relations ADD COLUMN neo4j_id VARCHAR(255) NULL"))
+
+    inspector = inspect(db.engine)
+    for table in ("knowledge_nodes", "knowledge_relations"):
+        unique = any(ix["unique"] and ix["column_names"] == ["neo4j_id"] for ix in inspector.get_indexes(table))
+        unique = unique or any(uc["column_names"] == ["neo4j_id"] for uc in inspector.get_unique_constraints(table))
+        if not unique:
+            with db.engine.begin() as conn:
+                conn.execute(text(f"CREATE UNIQUE INDEX uq_{table}_neo4j_id ON {table} (neo4j_id)"))
+
+
+def sync_state():
+    """当前同步进度（未同步过时返回 None）"""
+    state = db.session.get(KnowledgeSyncState, SYNC_STATE_NAME)
+    return state.to_dict() if state else None
+
+
+class KnowledgeSync:
+    """一次同步；需在 Flask 应用上下文中执行"""
+
+    def __init__(self, driver, page_size=DEFAULT_PAGE_SIZE, progress=None):
+        self.driver = driver
+        self.page_size = page_size
+        self.progress = progress or (lambda **_: None)
+        self._node_sql = None
+        self._relation_sql = None
+
+    def run(self, full=False):
+        """执行同步并返回统计；已有同步在进行时抛出 SyncInProgress"""
+        if not _sync_lock.acquire(blocking=False):
+            raise SyncInProgress("知识库同步正在进行中")
+        try:
+            return self._run(full)
+        finally:
+            _sync_lock.release()
+
+    def _run(self, full):
+        started = time.perf_counter()
+        ensure_sync_schema()
+        self._node_sql = _upsert_statement("knowledge_nodes", NODE_COLUMNS, NODE_UPDATE_COLUMNS)
+        self._relation_sql = _upsert_statement("knowledge_relations", RELATION_COLUMNS, RELATION_UPDATE_COLUMNS)
+
+        with self.driver.session() as session:
+            _, epoch = read_graph_version(session)
+        state = db.session.get(KnowledgeSyncState, SYNC_STATE_NAME)
+        if state is None or state.graph_epoch != epoch:
+            full = True
+        high_water = {} if full else json.loads(state.high_water or "{}")
+
+        stats = {"mode": "full" if full else "incremental", "nodes": 0, "relations": 0,
+                 "skipped_relations": 0, "deleted_relations": 0, "stale_nodes": 0, "by_label": {}}
+        synced_nodes, seen_relations = {}, set()
+
+        # 1. 节点：按标签键集分页
+        for label in ID_LABELS:
+            modified, node_id = high_water.get(label, _START)
+            while True:
+                with self.driver.session() as session:
+                    records = [r.data() for r in session.run(
+                        _node_page_query(label), modified=modified, id=node_id, limit=self.page_size
+                    )]
+                if not records:
+                    break
+                self._write_nodes(label, records)
+                synced_nodes.setdefault(label, []).extend(r["id"] for r in records)
+                modified, node_id = records[-1]["modified"], records[-1]["id"]
+                stats["nodes"] += len(records)
+                stats["by_label"][label] = stats["by_label"].get(label, 0) + len(records)
+                self.progress(phase="nodes", label=label, nodes=stats["nodes"])
+            high_water[label] = [modified, node_id]
+
+        # 2. 本次同步的节点的出边（端点都已写入 MySQL 后再写关系），这些节点在 Neo4j 中已没有的同步关系随之删除
+        for label, ids in synced_nodes.items():
+            for start in range(0, len(ids), self.page_size):
+                chunk = ids[start:start + self.page_size]
+                with self.driver.session() as session:
+                    records = [r.data() for r in session.run(_out_edges_query(label), ids=chunk)]
+                self._write_relations(records, stats, seen_relations)
+                stats["deleted_relations"] += self._delete_relations_from(chunk, seen_relations)
+                self.progress(phase="relations", relations=stats["relations"])
+
+        # 3. 端点未变化但自身新增 / 更新的 relationship 对象；全量同步时第 2 步已覆盖，只记录高水位
+        if full:
+            with self.driver.session() as session:
+                record = session.run(_LATEST_RELATIONSHIP_QUERY).single()
+            if record:
+                high_water["relationships"] = [record["modified"], record["id"]]
+        else:
+            modified, rel_id = high_water.get("relationships", _START)
+            while True:
+                with self.driver.session() as session:
+                    records = [r.data() for r in session.run(
+                        _RELATIONSHIP_PAGE_QUERY, modified=modified, id=rel_id, limit=self.page_size
+                    )]
+                if not records:
+                    break
+                self._write_relations(records, stats, seen_relations)
+                modified, rel_id = records[-1]["modified"], records[-1]["id"]
+                self.progress(phase="relations", relations=stats["relations"])
+            high_water["relationships"] = [modified, rel_id]
+
+        if full:
+            stats["deleted_relations"] += self._delete_stale_relations(seen_relations)
+            stats["stale_nodes"] = self._count_stale_nodes({i for ids in synced_nodes.values() for i in ids})
+
+        stats["seconds"] = round(time.perf_counter() - started, 2)
+        if state is None:
+            state = KnowledgeSyncState(name=SYNC_STATE_NAME)
+            db.session.add(state)
+        state.high_water = json.dumps(high_water)
+        state.graph_epoch = epoch
+        state.last_stats = json.dumps(stats, ensure_ascii=False)
+        if full:
+            state.last_full_at = datetime.utcnow()
+        db.session.commit()
+        return stats
+
+    # ---------- 写入 MySQL ----------
+
+    def _write_nodes(self, label, records):
+        now = datetime.utcnow()
+        rows = [{
+            "neo4j_id": r["id"],
+            "name": (r["name"] or r["external_id"] or r["id"])[:255],
+            "category": label.lower(),
+            "description": r["description"] or "",
+            "source": SYNC_SOURCE,
+            "created_at": now,
+            "updated_at": now,
+        } for r in records]
+        db.session.execute(self._node_sql, rows)
+        db.session.commit()
+
+    def _mysql_ids(self, neo4j_ids):
+        """neo4j_id → KnowledgeNode.id"""
+        if not neo4j_ids:
+            return {}
+        result = db.session.execute(
+            text("SELECT id, neo4j_id FROM knowledge_nodes WHERE neo4j_id IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            {"ids": list(neo4j_ids)}
+        )
+        return {neo4j_id: node_id for node_id, neo4j_id in result}
+
+    def _write_relations(self, records, stats, seen_relations):
+        if not records:
+            return
+        node_ids = self._mysql_ids({r["source"] for r in records} | {r["target"] for r in records})
+        now = datetime.utcnow()
+        rows = {}
+        for r in records:
+            key = r["id"] or f"{r['source']}|{r['type']}|{r['target']}"
+            seen_relations.add(key)
+            source, target = node_ids.get(r["source"]), node_ids.get(r["target"])
+            if source is None or target is None:
+                # 端点不是同步的节点（如管理员新建的其他标签）
+                stats["skipped_relations"] += 1
+                continue
+            rows[key] = {
+                "neo4j_id": key,
+                "source_id": source,
+                "target_id": target,
+                "relation_type": r["type"].lower()[:50],
+                "description": (r["description"] or "")[:255],
+                "created_at": now,
+            }
+        if rows:
+            db.session.execute(self._relation_sql, list(rows.values()))
+            db.session.commit()
+            stats["relations"] += len(rows)
+
+    def _delete_relations(self, rows, seen_relations):
+        """rows 为 [(关系 id, neo4j_id)]，删除其中本次没有出现的；neo4j_id 为空的是管理员手工创建的关系，不在此列"""
+        stale = [rel_id for rel_id, neo4j_id in rows if neo4j_id not in seen_relations]
+        delete = text("DELETE FROM knowledge_relations WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+        for start in range(0, len(stale), self.page_size):
+            db.session.execute(delete, {"ids": stale[start:start + self.page_size]})
+            db.session.commit()
+        return len(stale)
+
+    def _delete_relations_from(self, neo4j_ids, seen_relations):
+        """起点为这些节点、但 Neo4j 中已不存在的同步关系"""
+        node_ids = list(self._mysql_ids(neo4j_ids).values())
+        if not node_ids:
+            return 0
+        rows = db.session.execute(
+            text("SELECT id, neo4j_id FROM knowledge_relations "
+                 "WHERE source_id IN :ids AND neo4j_id IS NOT NULL").bindparams(bindparam("ids", expanding=True)),
+            {"ids": node_ids}
+        ).all()
+        return self._delete_relations(rows, seen_relations)
+
+    def _delete_stale_relations(self, seen_relations):
+        """全量同步后删除 Neo4j 中已不存在的全部同步关系（包括起点节点已被删除的）"""
+        rows = db.session.execute(
+            text("SELECT id, neo4j_id FROM knowledge_relations WHERE neo4j_id IS NOT NULL")
+        ).all()
+        return self._delete_relations(rows, seen_relations)
+
+    def _count_stale_nodes(self, synced_nodes):
+        result = db.session.execute(
+            text("SELECT neo4j_id FROM knowledge_nodes WHERE source = :source AND neo4j_id IS NOT NULL"),
+            {"source": SYNC_SOURCE}
+        )
+        return sum(1 for (neo4j_id,) in result if neo4j_id not in synced_nodes)
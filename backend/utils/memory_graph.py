@@ -0,0 +1,265 @@
+"""
+进程内的图存储实现
+- 从 ATT&CK STIX 文件加载，节点属性与关系的映射与导入脚本（KG_data/proc.py）一致
+- 节点 / 关系以自增整数作为内部 ID，行为与 Neo4j 的 id(n) / id(r) 对应
+- 适合小规模部署、CI 与不同存储后端的性能对比；数据不持久化
+"""
+import threading
+
+from utils.attack_schema import (
+    MATRIX_TACTIC_REL, STIX_TYPE_LABELS, object_relations, parse_bundles, stix_to_properties, tactic_technique_relations
+)
+from utils.graph_repository import GraphNode, GraphRepository, PROTECTED_PROPERTIES, project_properties
+from utils.stix_stream import DomainIndex, iter_bundle_objects
+
+PREREQUISITE_TYPES = ("PREREQUISITE", "DEPENDS_ON")
+
+
+class MemoryGraphRepository(GraphRepository):
+    """内存图：节点表 + 关系表 + 邻接索引"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = 1
+        self._nodes = {}         # 内部 ID → (标签列表, 属性)
+        self._by_key = {}        # 业务 id → 内部 ID
+        self._relationships = {}  # 关系 ID → (源, 类型, 目标)，按创建顺序
+        self._relationship_properties = {}  # 关系 ID → 属性（推出的关系没有属性）
+        self._adjacent = {}      # 内部 ID → {关系 ID}
+        self._next_iid = 0
+        self._next_rid = 0
+
+    @classmethod
+    def from_stix_bundle(cls, path):
+        return cls.from_stix_bundles([path])
+
+    @classmethod
+    def from_stix_bundles(cls, bundles):
+        """
+        按导入脚本的规则加载一个或多个 bundle（见 parse_bundles）：STIX_TYPE_LABELS 中的全部对象、
+        relationship 对象与引用关系，以及技术 → 战术（BELONGS_TO）关系；端点不在 bundle 中的关系被忽略
+        同一 STIX id 只保留一个节点 / 关系，domains 为其出现过的全部领域
+        """
+        bundles = parse_bundles(bundles)
+        domain_index = DomainIndex(bundles)
+        techniques = []
+        tactics = []
+        relations = []
+        seen_relationships = set()
+        repository = cls()
+        for _, obj in iter_bundle_objects(bundles):
+            obj_type = obj.get("type")
+            domains = sorted(domain_index.get(obj.get("id")))
+            if obj_type in STIX_TYPE_LABELS:
+                if obj["id"] in repository._by_key:
+                    continue
+                repository.add_node(STIX_TYPE_LABELS[obj_type], dict(stix_to_properties(obj), domains=domains))
+                if obj_type == "attack-pattern":
+                    techniques.append(obj)
+                elif obj_type == "x-mitre-tactic":
+                    tactics.append(obj)
+                relations.extend(object_relations(obj))
+            elif obj_type == "relationship" and obj["id"] not in seen_relationships:
+                seen_relationships.add(obj["id"])
+                for relation in object_relations(obj):
+                    relation["props"]["domains"] = domains
+                    relations.append(relation)
+
+        for relation in relations:
+            src = repository._by_key.get(relation["source"])
+            dst = repository._by_key.get(relation["target"])
+            if src is not None and dst is not None:
+                repository.add_relationship(src, relation["type"], dst, relation["props"])
+        tactic_domains = {tactic["id"]: domain_index.get(tactic["id"]) for tactic in tactics}
+        for relation in tactic_technique_relations(techniques, tactics, tactic_domains):
+            repository.add_relationship(
+                repository._by_key[relation["tech_id"]], "BELONGS_TO",
+                repository._by_key[relation["tactic_id"]]
+            )
+        return repository
+
+    # ---------- 构建 ----------
+
+    def add_node(self, label, properties):
+        with self._lock:
+            iid = self._next_iid
+            self._next_iid += 1
+            self._nodes[iid] = ([label], dict(properties))
+            self._adjacent[iid] = set()
+            if properties.get("id") is not None:
+                self._by_key[str(properties["id"])] = iid
+            return iid
+
+    def add_relationship(self, src, rel_type, dst, properties=None):
+        with self._lock:
+            rid = self._next_rid
+            self._next_rid += 1
+            self._relationships[rid] = (src, rel_type, dst)
+            if properties:
+                self._relationship_properties[rid] = dict(properties)
+            self._adjacent[src].add(rid)
+            self._adjacent[dst].add(rid)
+            return rid
+
+    # ---------- 内部工具 ----------
+
+    def _resolve(self, node_id):
+        """业务 id 或内部 ID → 内部 ID"""
+        node_id = str(node_id)
+        if node_id in self._by_key:
+            return self._by_key[node_id]
+        if node_id.isdigit() and int(node_id) in self._nodes:
+            return int(node_id)
+        return None
+
+    def _node(self, iid, projection=None):
+        labels, properties = self._nodes[iid]
+        return GraphNode(project_properties(properties, projection), iid, list(labels))
+
+    def _in_domain(self, rid, src, domain):
+        """与 Neo4j 后端的 domain_filter 一致：关系自身的 domains，推出的关系看起点"""
+        domains = self._relationship_properties.get(rid, {}).get("domains")
+        if domains is None:
+            domains = self._nodes[src][1].get("domains") or ()
+        return domain in domains
+
+    def _out_edges(self, iid, rel_type):
+        """节点的某类出边 [(关系 ID, 终点)]"""
+        edges = []
+        for rid in self._adjacent[iid]:
+            src, edge_type, dst = self._relationships[rid]
+            if src == iid and edge_type == rel_type:
+                edges.append((rid, dst))
+        return edges
+
+    def _bump(self):
+        self._version += 1
+
+    # ---------- GraphRepository ----------
+
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def edges(self, labels=None, projection=None, limit=200, domain=None):
+        labels = set(labels or [])
+        edges = []
+        with self._lock:
+            for rid, (src, rel_type, dst) in self._relationships.items():
+                if labels and not labels.intersection(self._nodes[src][0]):
+                    continue
+                if domain and not self._in_domain(rid, src, domain):
+                    continue
+                edges.append((self._node(src, projection), rel_type, rid, self._node(dst, projection)))
+                if len(edges) >= limit:
+                    break
+        return edges
+
+    def nodes_by_iids(self, iids, projection=None):
+        with self._lock:
+            return {iid: self._node(iid, projection) for iid in iids if iid in self._nodes}
+
+    def node_properties(self, node_id, fields):
+        with self._lock:
+            iid = self._resolve(node_id)
+            if iid is None:
+                return None
+            properties = self._nodes[iid][1]
+            return {k: properties[k] for k in fields if properties.get(k) is not None}
+
+    def node_types(self):
+        with self._lock:
+            node_labels = sorted({label for labels, _ in self._nodes.values() for label in labels})
+            edge_types = sorted({rel_type for _, rel_type, _ in self._relationships.values()})
+        return node_labels, edge_types
+
+    def update_node(self, node_id, data):
+        with self._lock:
+            iid = self._resolve(node_id)
+            if iid is None:
+                return False
+            labels, properties = self._nodes[iid]
+
+            for key, value in (data.get("properties") or {}).items():
+                if key not in PROTECTED_PROPERTIES:
+                    properties[key] = value
+
+            new_label = data.get("type")
+            if new_label and new_label not in labels:
+                labels[:] = [new_label]
+
+            if "label" in data or "name" in data:
+                properties["name"] = data.get("label") or data.get("name")
+
+            self._bump()
+            return True
+
+    def delete_node(self, node_id):
+        with self._lock:
+            iid = self._resolve(node_id)
+            if iid is None:
+                return False
+            for rid in list(self._adjacent[iid]):
+                src, _, dst = self._relationships.pop(rid)
+                self._relationship_properties.pop(rid, None)
+                self._adjacent[src].discard(rid)
+                self._adjacent[dst].discard(rid)
+            _, properties = self._nodes.pop(iid)
+            del self._adjacent[iid]
+            if properties.get("id") is not None:
+                self._by_key.pop(str(properties["id"]), None)
+            self._bump()
+            return True
+
+    def prerequisites(self, target_ids, limit):
+        rows = []
+        with self._lock:
+            targets = [self._by_key[str(t)] for t in dict.fromkeys(target_ids) if str(t) in self._by_key]
+            for iid in targets[:limit]:
+                # 沿 PREREQUISITE / DEPENDS_ON 入边的传递闭包
+                seen = set()
+                stack = [iid]
+                while stack:
+                    current = stack.pop()
+                    for rid in self._adjacent[current]:
+                        src, rel_type, dst = self._relationships[rid]
+                        if dst == current and rel_type in PREREQUISITE_TYPES and src not in seen:
+                            seen.add(src)
+                            stack.append(src)
+                seen.discard(iid)
+                rows.append((self._node(iid), [self._node(p) for p in sorted(seen)]))
+        return rows
+
+    def topology(self):
+        with self._lock:
+            nodes = [(iid, properties.get("id"), list(labels)) for iid, (labels, properties) in self._nodes.items()]
+            relationships = [(src, rel_type, dst, rid) for rid, (src, rel_type, dst) in self._relationships.items()]
+        return nodes, relationships
+
+    def matrix_source(self):
+        tactic_fields = ("id", "external_id", "name", "shortname", "domains", "deprecated", "revoked")
+        technique_fields = ("id", "external_id", "name", "platform", "domains", "deprecated", "revoked")
+        matrices, tactics, techniques = [], [], []
+        with self._lock:
+            for iid, (labels, properties) in self._nodes.items():
+                if "Matrix" in labels:
+                    refs = sorted(
+                        (self._relationship_properties.get(rid, {}).get("order", 0), self._nodes[dst][1].get("id"))
+                        for rid, dst in self._out_edges(iid, MATRIX_TACTIC_REL)
+                    )
+                    matrices.append({"id": properties.get("id"), "domains": properties.get("domains"),
+                                     "tactics": [tactic_id for _, tactic_id in refs]})
+                elif "Tactic" in labels:
+                    tactics.append({k: properties.get(k) for k in tactic_fields})
+                elif "Technique" in labels:
+                    parents = [self._nodes[dst][1].get("id") for _, dst in self._out_edges(iid, "SUB_TECHNIQUE_OF")
+                               if "Technique" in self._nodes[dst][0]]
+                    techniques.append(dict(
+                        {k: properties.get(k) for k in technique_fields},
+                        tactics=[self._nodes[dst][1].get("id") for _, dst in self._out_edges(iid, "BELONGS_TO")
+                                 if "Tactic" in self._nodes[dst][0]],
+                        parent=parents[0] if parents else None
+                    ))
+        return matrices, tactics, techniques
@@ -0,0 +1,142 @@
+"""
+节点 ID 解析
+前端传来的节点 ID 可能是业务 id（STIX id 等）或 Neo4j 内部 ID。
+原先的 `WHERE n.id = $node_id OR toString(id(n)) = $node_id` 无法使用索引，每次都是全库扫描。
+这里每个请求只解析一次，得到 elementId 后再按 elementId 精确匹配：
+- 业务 id：按 STIX 前缀推断标签，或在所有带唯一约束的标签上逐个 UNION 查找（均为索引查找）
+- 纯数字：按内部 ID 查找（NodeByIdSeek）
+- elementId：直接按 elementId 查找
+- 以上都找不到时才退回原来的全库扫描，兼容管理员新建的其他标签节点
+最近的解析结果保存在 LRU 中，本进程删除节点时逐项失效，清库重导（导入批次号变化）时整体失效；
+其他进程删除节点后 elementId 可能被新节点复用，因此命中缓存的项在使用前还要按 elementId 查找复核一次，
+节点已不存在或已不是原来的节点时丢弃该项并重新解析
+"""
+import threading
+from collections import OrderedDict
+
+from utils.attack_schema import ID_LABELS, label_for_stix_id
+
+RESOLVER_CACHE_SIZE = 4096
+
+
+def _resolve_query(labels):
+    """生成批量解析查询，每个分支都是索引 / ID 查找"""
+    branches = [
+        f"MATCH (n:{label}) WHERE n.id = node_id RETURN n"
+        for label in labels
+    ]
+    branches.append("MATCH (n) WHERE id(n) = internal_id RETURN n")
+    branches.append("MATCH (n) WHERE elementId(n) = node_id RETURN n")
+    separator = "\n        UNION\n        WITH node_id, internal_id\n        "
+    return f"""
+    UNWIND $rows AS row
+    WITH row.node_id AS node_id, row.internal_id AS internal_id
+    CALL {{
+        WITH node_id, internal_id
+        {separator.join(branches)}
+    }}
+    RETURN node_id, elementId(n) AS eid
+    """
+
+
+# 复核缓存项：按 elementId 查找（NodeByElementIdSeek），并确认仍是同一个 client id 对应的节点
+_VALIDATE_QUERY = """
+UNWIND $rows AS row
+MATCH (n) WHERE elementId(n) = row.eid
+  AND (n.id = row.node_id OR id(n) = row.internal_id OR elementId(n) = row.node_id)
+RETURN row.node_id AS node_id
+"""
+
+_SCAN_QUERY = """
+UNWIND $node_ids AS node_id
+MATCH (n)
+WHERE n.id = node_id OR toString(id(n)) = node_id
+RETURN node_id, elementId(n) AS eid
+"""
+
+
+class NodeResolver:
+    """client id → elementId 的解析器，带 LRU 缓存"""
+
+    def __init__(self, capacity=RESOLVER_CACHE_SIZE):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._epoch = None
+
+    def resolve_many(self, session, node_ids, epoch=None):
+        """
+        批量解析，返回 {node_id: elementId}，找不到的 ID 不在结果中
+        session 可以是会话或事务；epoch 为当前导入批次号，变化时清空缓存
+        """
+        node_ids = [str(node_id) for node_id in node_ids]
+        cached = {}
+        with self._lock:
+            if epoch != self._epoch:
+                self._cache.clear()
+                self._epoch = epoch
+            for node_id in node_ids:
+                if node_id in self._cache:
+                    self._cache.move_to_end(node_id)
+                    cached[node_id] = self._cache[node_id]
+
+        resolved = self._validate(session, cached) if cached else {}
+
+        missing = [node_id for node_id in dict.fromkeys(node_ids) if node_id not in resolved]
+        if not missing:
+            return resolved
+
+        # 能由 STIX 前缀推断标签的只查对应标签，其余在所有带约束的标签上查找
+        by_labels = {}
+        for node_id in missing:
+            label = label_for_stix_id(node_id)
+            by_labels.setdefault((label,) if label else tuple(ID_LABELS), []).append(node_id)
+
+        found = {}
+        for labels, ids in by_labels.items():
+            rows = [{"node_id": node_id, "internal_id": int(node_id) if node_id.isdigit() else -1}
+                    for node_id in ids]
+            for record in session.run(_resolve_query(labels), {"rows": rows}):
+                found.setdefault(record["node_id"], record["eid"])
+
+        remaining = [node_id for node_id in missing if node_id not in found]
+        if remaining:
+            for record in session.run(_SCAN_QUERY, {"node_ids": remaining}):
+                found.setdefault(record["node_id"], record["eid"])
+
+        with self._lock:
+            for node_id, eid in found.items():
+                self._cache[node_id] = eid
+                self._cache.move_to_end(node_id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+        resolved.update(found)
+        return resolved
+
+    def _validate(self, session, cached):
+        """复核命中缓存的项，返回仍然有效的 {node_id: elementId}，失效的项从缓存中移除"""
+        rows = [{"node_id": node_id, "eid": eid, "internal_id": int(node_id) if node_id.isdigit() else -1}
+                for node_id, eid in cached.items()]
+        valid = {record["node_id"] for record in session.run(_VALIDATE_QUERY, {"rows": rows})}
+        stale = [node_id for node_id in cached if node_id not in valid]
+        if stale:
+            with self._lock:
+                for node_id in stale:
+                    if self._cache.get(node_id) == cached[node_id]:
+                        del self._cache[node_id]
+        return {node_id: eid for node_id, eid in cached.items() if node_id in valid}
+
+    def resolve(self, session, node_id, epoch=None):
+        """解析单个节点 ID，找不到时返回 None"""
+        return self.resolve_many(session, [node_id], epoch).get(str(node_id))
+
+    def forget(self, node_ids):
+        """节点被删除后移除对应的缓存项"""
+        node_ids = {str(node_id) for node_id in node_ids}
+        with self._lock:
+            for key in [k for k, eid in self._cache.items() if k in node_ids or eid in node_ids]:
+                del self._cache[key]
+
+
+node_resolver = NodeResolver()
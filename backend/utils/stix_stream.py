@@ -0,0 +1,108 @@
+"""
+STIX bundle 的流式解析
+ATT&CK 的 bundle 文件有几十 MB，json.load 整体读入再过滤，峰值内存是文件大小的数倍。
+这里按块读取文件，用标准库 JSONDecoder.raw_decode 逐个解析 objects 数组中的对象，
+同一时刻只在内存中保留一个读取块和当前对象。
+导入脚本的分批写入见 KG_data/ingest.py。
+"""
+import json
+import re
+
+from utils.attack_schema import STIX_TYPE_LABELS
+
+READ_CHUNK_SIZE = 1 << 20
+
+_OBJECTS_KEY = re.compile(r'"objects"\s*:\s*\[')
+_WHITESPACE = " \t\r\n"
+
+
+def iter_stix_objects(path, chunk_size=READ_CHUNK_SIZE):
+    """逐个产出 bundle 中 objects 数组的元素（dict）"""
+    decoder = json.JSONDecoder()
+
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        eof = False
+
+        def read_more():
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            if chunk:
+                buffer += chunk
+            else:
+                eof = True
+
+        # 定位 "objects": [
+        while True:
+            match = _OBJECTS_KEY.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            if eof:
+                raise ValueError(f"不是 STIX bundle（缺少 objects 数组）: {path}")
+            # 只保留可能是被截断的键名的尾部
+            buffer = buffer[-32:]
+            read_more()
+
+        pos = 0
+        while True:
+            # 跳过空白与逗号
+            while True:
+                while pos < len(buffer) and (buffer[pos] in _WHITESPACE or buffer[pos] == ","):
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer, pos = "", 0
+                read_more()
+
+            if pos >= len(buffer):
+                raise ValueError(f"objects 数组未结束: {path}")
+            if buffer[pos] == "]":
+                return
+
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 当前对象跨越了读取块，读入更多数据后重试
+                if eof:
+                    raise
+                buffer, pos = buffer[pos:], 0
+                read_more()
+                continue
+
+            yield obj
+            pos = end
+            # 丢弃已解析的部分，缓冲区大小保持在一个读取块左右
+            if pos > chunk_size:
+                buffer, pos = buffer[pos:], 0
+
+
+
+def iter_bundle_objects(bundles, chunk_size=READ_CHUNK_SIZE):
+    """依次流式解析多个 bundle，逐个产出 (领域, 对象)；bundles 为 [(领域, 路径)]（见 attack_schema.parse_bundles）"""
+    for domain, path in bundles:
+        for obj in iter_stix_objects(path, chunk_size):
+            yield domain, obj
+
+
+class DomainIndex:
+    """
+    对象 id → 出现过的领域集合
+    多个 bundle 时预先扫描一遍（只记录会写入图谱的节点对象与 relationship 对象），
+    只有一个 bundle 时所有对象都属于该领域，无需扫描
+    """
+
+    def __init__(self, bundles):
+        self.domains = {domain for domain, _ in bundles}
+        self._index = None
+        if len(bundles) > 1:
+            index = {}
+            for domain, obj in iter_bundle_objects(bundles):
+                if obj.get("type") in STIX_TYPE_LABELS or obj.get("type") == "relationship":
+                    index.setdefault(obj["id"], set()).add(domain)
+            self._index = index
+
+    def get(self, obj_id):
+        if self._index is None:
+            return set(self.domains)
+        return set(self._index.get(obj_id, ()))